@@ -0,0 +1,964 @@
+"""フェイクバックエンド上でのベンチマーク
+
+Windows 以外でも実行できるよう、win32gui はインメモリのフェイク実装に差し替えて計測する。
+
+```bash
+python benchmark.py snapshot --depth=3 --breadth=10
+```
+"""
+import asyncio
+import random
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Optional
+from enum import Enum
+
+from fire import Fire
+
+from modules import fake_win32
+
+fake_win32.install()
+
+from modules.window import OPT_IN_FIELDS, Window  # noqa: E402
+from modules.hit_test import HitTestIndex  # noqa: E402
+from modules.desktop import Desktop  # noqa: E402
+from modules.cache import AttributeCache  # noqa: E402
+from modules.messages import MessageBatch  # noqa: E402
+from modules.dispatcher import MessageDispatcher  # noqa: E402
+from modules.utils import Win32Constants  # noqa: E402
+
+
+def _measure(func):
+    fake_desktop = fake_win32.current()
+    fake_desktop.reset_calls()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    return result, fake_desktop.call_count, elapsed
+
+
+def _report(title: str, calls: int, elapsed: float) -> None:
+    print(f"{title:<24} calls={calls:>8}  time={elapsed * 1000:>10.2f} ms")
+
+
+def _synthetic_desktop(
+        apps: int = 1,
+        depth: int = 0,
+        breadth: int = 0,
+        *,
+        desktop: Optional[fake_win32.FakeDesktop] = None,
+        rect: Optional[Callable[[int], tuple]] = None,
+        note: str = ""
+    ) -> tuple:
+    """フェイクデスクトップを登録し、合成アプリを追加して規模を表示する
+
+    Args:
+        apps (int): 追加するアプリ (合成ツリー) の数。2つ以上なら "App {i}" のタイトルを付ける
+        depth (int): 合成ツリーの階層数
+        breadth (int): 合成ツリーの1ノードあたりの子の数
+        desktop (Optional[FakeDesktop]): 登録するデスクトップ。None なら新規作成
+        rect (Optional[Callable[[int], tuple]]): i 番目のアプリの矩形を返す関数
+        note (str): 規模の表示に添える説明
+
+    Returns:
+        tuple[FakeDesktop, list[int]]: 登録したデスクトップと、追加したアプリのルートのハンドル
+    """
+    fake_desktop = fake_win32.install(desktop)
+    roots = []
+    for i in range(apps):
+        kwargs = {"text": f"App {i}"} if apps > 1 else {}
+        if rect is not None:
+            kwargs["rect"] = rect(i)
+        roots.append(fake_desktop.add_synthetic_tree(depth=depth, breadth=breadth, **kwargs))
+    print(f"controls: {len(fake_desktop.windows)}" + (f", {note}" if note else ""))
+    return fake_desktop, roots
+
+
+def snapshot(depth: int = 3, breadth: int = 10, passes: int = 3):
+    """プロパティ都度取得とスナップショット経由の読み出しを比較する"""
+    fake_desktop, (root,) = _synthetic_desktop(1, depth, breadth)
+
+    def read_all(window: Window):
+        for _ in range(passes - 1):
+            [(child.text, child.class_name, child.rect, child.is_visible) for child in window.children]
+        return [child.to_dict() for child in window.children]
+
+    live, calls, elapsed = _measure(lambda: read_all(Window(root)))
+    _report("live properties", calls, elapsed)
+    cached, calls, elapsed = _measure(lambda: read_all(Window(root).with_snapshot()))
+    _report("snapshot", calls, elapsed)
+    assert [d['text'] for d in live] == [d['text'] for d in cached]
+
+
+def hit_test(depth: int = 4, breadth: int = 10, queries: int = 1000, live_queries: int = 3):
+    """座標からの子孫ウィンドウ検索をインデックス経由と都度列挙で比較する"""
+    fake_desktop, (root,) = _synthetic_desktop(1, depth, breadth)
+    points = [(random.randrange(1600), random.randrange(1200)) for _ in range(queries)]
+
+    window = Window(root)
+    index, calls, elapsed = _measure(lambda: HitTestIndex(window.snapshot()))
+    _report("index build", calls, elapsed)
+    _, calls, elapsed = _measure(lambda: [index.query(x, y) for x, y in points])
+    _report(f"index query x{queries}", calls, elapsed)
+    print(f"{'':<24} per query: {elapsed / queries * 1e6:.1f} us")
+    _, calls, elapsed = _measure(lambda: [window.get_children_in_hierarchy_on_coordinate(x, y) for x, y in points[:live_queries]])
+    _report(f"method x{live_queries}", calls, elapsed)
+    _, calls, elapsed = _measure(lambda: [window.get_children_in_hierarchy_on_coordinate(x, y, index) for x, y in points])
+    _report(f"method (index) x{queries}", calls, elapsed)
+
+
+def query(apps: int = 2000):
+    """名前・クラス・PID の複合検索を個別検索の積集合と比較する"""
+    fake_desktop = fake_win32.install()
+    for i in range(apps):
+        fake_desktop.add_window(text=f"App {i} - Notepad", class_name="Notepad" if i % 10 else "Edit", pid=1000 + i % 50)
+    print(f"top-level windows: {apps}")
+    desktop = Desktop()
+
+    def separate():
+        by_pid = {w.hwnd for w in desktop.get_windows_by_pid(1007)}
+        by_class = {w.hwnd for w in desktop.get_windows_by_class("Notepad")}
+        return [w for w in desktop.get_windows_by_name("Notepad") if w.hwnd in by_pid and w.hwnd in by_class]
+
+    expected, calls, elapsed = _measure(separate)
+    _report("3 separate lookups", calls, elapsed)
+    found, calls, elapsed = _measure(lambda: desktop.query(name_contains="Notepad", class_name="Notepad", pid=1007).all())
+    _report("single query", calls, elapsed)
+    assert [w.hwnd for w in found] == [w.hwnd for w in expected]
+    _, calls, elapsed = _measure(lambda: desktop.query(name_contains="Notepad", pid=1007).first())
+    _report("query first()", calls, elapsed)
+
+
+def iterate(apps: int = 5000):
+    """先頭1件だけを使う場合の一覧取得と逐次列挙を比較する"""
+    fake_desktop = fake_win32.install()
+    for i in range(apps):
+        fake_desktop.add_window(text=f"App {i}", class_name="Notepad")
+    print(f"top-level windows: {apps}")
+    desktop = Desktop()
+
+    _, calls, elapsed = _measure(lambda: desktop.get_all_windows()[0])
+    _report("get_all_windows()[0]", calls, elapsed)
+    _, calls, elapsed = _measure(lambda: next(desktop.iter_windows()))
+    _report("next(iter_windows())", calls, elapsed)
+
+
+def _filter_children_naive(window: Window, **kwargs) -> list[Window]:
+    # 旧実装: 条件値ごとに全ての子の属性を読み直す
+    children = window.children
+    for key, value in kwargs.items():
+        if not isinstance(value, list):
+            value = [value]
+        joined_children = []
+        for v in value:
+            joined_children += [child for child in children if v == getattr(child, key)]
+        children = joined_children
+    return children
+
+
+def filtering(depth: int = 3, breadth: int = 17):
+    """get_filtered_children を旧実装と比較する"""
+    fake_desktop, (root,) = _synthetic_desktop(1, depth, breadth)
+    window = Window(root)
+    conditions = {"class_name": ["Button", "Edit", "Static"], "is_visible": True}
+
+    expected, calls, elapsed = _measure(lambda: _filter_children_naive(window, **conditions))
+    _report("naive", calls, elapsed)
+    found, calls, elapsed = _measure(lambda: window.get_filtered_children(**conditions))
+    _report("indexed", calls, elapsed)
+    assert sorted(w.hwnd for w in found) == sorted(w.hwnd for w in expected)
+
+
+def cache(controls: int = 200, ticks: int = 100, interval: float = 0.01, ttl: float = 0.05, latency: float = 0.0):
+    """ポーリングでの属性読み出しをキャッシュの有無で比較する (時刻は仮想時計で進め、呼び出しごとに latency 秒待つ)"""
+    from modules.replay import ReplayDesktop
+
+    desktop = ReplayDesktop(latency=latency) if latency else None
+    note = f"latency: {latency * 1000:.2f} ms per call" if latency else ""
+    fake_desktop, (root,) = _synthetic_desktop(1, 1, controls, desktop=desktop, note=note)
+    clock = [0.0]
+    attribute_cache = AttributeCache(ttl, clock=lambda: clock[0])
+
+    def poll(windows: list[Window]):
+        clock[0] = 0.0
+        for _ in range(ticks):
+            for window in windows:
+                window.text, window.rect, window.class_name
+            clock[0] += interval
+
+    _, calls, elapsed = _measure(lambda: poll(Window(root).children))
+    _report("live", calls, elapsed)
+    cached_windows = Window(root, cache=attribute_cache).children
+    _, calls, elapsed = _measure(lambda: poll(cached_windows))
+    _report(f"cache ttl={ttl}", calls, elapsed)
+    print(f"{'':<24} hit rate: {attribute_cache.hit_rate:.1%}")
+
+
+def messages(controls: int = 1000, updates: int = 5):
+    """テキスト更新の連続送信を個別送信とバッチ送信で比較する"""
+    fake_desktop, (root,) = _synthetic_desktop(1, 1, controls)
+    children = Window(root).children
+
+    def direct():
+        for i in range(updates):
+            for child in children:
+                child.send_keys(f"value {i}")
+
+    def batched():
+        batch = MessageBatch()
+        for i in range(updates):
+            for child in children:
+                batch.set_text(child, f"value {i}")
+        return batch.flush()
+
+    _, calls, elapsed = _measure(direct)
+    _report("Window.send_keys", calls, elapsed)
+    results, calls, elapsed = _measure(batched)
+    _report("MessageBatch", calls, elapsed)
+    assert all(result.error is None for result in results)
+
+
+def dispatch(apps: int = 16, delay: float = 0.05, hung: int = 2, timeout: float = 0.2, workers: int = 8):
+    """遅い/応答なしのアプリを含む送信を、逐次の SendMessage と並行送信で比較する"""
+    fake_desktop = fake_win32.install()
+    roots = [fake_desktop.add_window(text=f"App {i}") for i in range(apps)]
+    for root in roots:
+        fake_desktop.set_delay(root, delay)
+    for root in roots[:hung]:
+        fake_desktop.hang(root)
+    windows = [Window(root) for root in roots]
+
+    _, calls, elapsed = _measure(lambda: [window._send_message(Win32Constants.WM_GETTEXTLENGTH) for window in windows[hung:]])
+    _report(f"serial ({apps - hung} responsive)", calls, elapsed)
+
+    async def concurrent():
+        dispatcher = MessageDispatcher(max_workers=workers, timeout=timeout)
+        try:
+            return await dispatcher.gather_send(windows, Win32Constants.WM_GETTEXTLENGTH)
+        finally:
+            dispatcher.shutdown()
+
+    results, calls, elapsed = _measure(lambda: asyncio.run(concurrent()))
+    _report(f"gather_send ({apps} apps)", calls, elapsed)
+    print(f"{'':<24} timeouts: {sum(isinstance(result, TimeoutError) for result in results)}")
+    for root in roots[:hung]:
+        fake_desktop.unhang(root)
+
+
+_IMPORT_SCRIPT = """
+import sys
+from modules import fake_win32
+fake_win32.install()
+win32con = sys.modules["win32con"]
+for i in range({constants}):
+    setattr(win32con, f"STUB_CONSTANT_{{i}}", i % 512)
+import modules.utils
+modules.utils.Win32Constants.WM_CLOSE
+import modules.window
+import modules.desktop
+print(" ".join(name for name in {gui_modules!r} if name in sys.modules))
+"""
+
+GUI_MODULES = ("matplotlib", "matplotlib.pyplot", "tkinter", "numpy")
+"""コア (`Window` / `Desktop`) の import で読み込まれてはならないモジュール"""
+
+
+def import_time(constants: int = 5000):
+    """コアモジュールの import 時間を、定数の多いスタブ win32con で計測する (`python -X importtime`)
+
+    GUI ライブラリがコアの import で読み込まれていた場合は失敗する。
+    """
+    script = _IMPORT_SCRIPT.format(constants=constants, gui_modules=GUI_MODULES)
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script], capture_output=True, text=True, check=True
+    )
+    for line in process.stderr.splitlines():
+        name = line.split("|")[-1].strip()
+        if name in ("modules.utils", "modules.window", "modules.desktop"):
+            microseconds = int(line.split("|")[1])
+            print(f"{'import ' + name:<24} time={microseconds / 1000:>10.2f} ms  (win32con: {constants} constants)")
+    loaded = process.stdout.split()
+    if loaded:
+        raise SystemExit(f"GUI modules loaded by the core import: {', '.join(loaded)}")
+
+    # 旧実装: import 時に win32con の全定数から Enum を構築していた
+    stub = {f"STUB_CONSTANT_{i}": i % 512 for i in range(constants)}
+    start = time.perf_counter()
+    Enum("Win32Constants", stub)
+    _report("eager Enum build", 0, time.perf_counter() - start)
+
+
+def render(depth: int = 4, breadth: int = 10):
+    """draw_window_obj を Agg バックエンドで描画して計測する"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from modules import rendering
+
+    fake_desktop, (root,) = _synthetic_desktop(1, depth, breadth)
+
+    def draw():
+        figure = rendering.draw_window_obj(Window(root), show=False)
+        figure.canvas.draw()
+        plt.close(figure)
+
+    _, calls, elapsed = _measure(draw)
+    _report("draw_window_obj", calls, elapsed)
+
+
+def viewport(depth: int = 3, breadth: int = 37, frames: int = 60):
+    """Canvas ビューアのレイアウト計算 (表示範囲外の間引き) を計測する"""
+    from modules.viewport import Viewport, ViewportLayout
+
+    fake_desktop, (root,) = _synthetic_desktop(1, depth, breadth)
+    tree = Window(root).snapshot()
+
+    layout, _, elapsed = _measure(lambda: ViewportLayout(tree))
+    _report("layout index build", 0, elapsed)
+    view = Viewport(tree[root].rect, 1024, 768)
+    items, _, elapsed = _measure(lambda: layout.visible_items(view))
+    _report(f"fit ({len(items)} items)", 0, elapsed)
+    view.zoom(16)
+
+    def pan_frames():
+        for _ in range(frames):
+            view.pan(-5, -3)
+            drawn = layout.visible_items(view)
+        return drawn
+
+    items, _, elapsed = _measure(pan_frames)
+    _report(f"zoomed pan x{frames}", 0, elapsed)
+    print(f"{'':<24} per frame: {elapsed / frames * 1000:.2f} ms, {len(items)} items")
+
+
+def diff(apps: int = 20, depth: int = 2, breadth: int = 20, changes: int = 50):
+    """スナップショット差分を、一覧同士の総当たり比較と比較する"""
+    from modules.diff import diff_trees
+
+    fake_desktop, _ = _synthetic_desktop(apps, depth, breadth)
+    desktop = Desktop()
+    before = desktop.snapshot()
+    for hwnd in random.sample(list(fake_desktop.windows), changes):
+        fake_desktop.windows[hwnd].text += " (changed)"
+    after = desktop.snapshot()
+
+    def naive():
+        # 以前の監視スクリプトの方式: 一覧を作ってハンドルごとに線形探索で突き合わせる
+        old, new = list(before), list(after)
+        return [snapshot for snapshot in new if not any(o.hwnd == snapshot.hwnd and o.text == snapshot.text for o in old)]
+
+    found, _, elapsed = _measure(lambda: diff_trees(before, after))
+    _report(f"diff_trees ({len(found)})", 0, elapsed)
+    found, _, elapsed = _measure(naive)
+    _report(f"list comparison ({len(found)})", 0, elapsed)
+
+
+def events(apps: int = 2000, appear_after: float = 0.3, poll_interval: float = 0.5, burst: int = 1000):
+    """ダイアログの出現待ちを、一定間隔のポーリングとイベント待ちで比較する"""
+    from modules.events import EventKind, SimulatedEventSource, WindowEventStream
+
+    fake_desktop = fake_win32.install()
+    for i in range(apps):
+        fake_desktop.add_window(text=f"App {i}")
+    desktop = Desktop()
+    source = SimulatedEventSource()
+
+    def open_dialog():
+        return fake_desktop.add_window(text="Save As")
+
+    def poll():
+        # viewer.py の以前の方式: 一定時間待ってから一覧を取り直す
+        while True:
+            time.sleep(poll_interval)
+            found = desktop.get_windows_by_name("Save As")
+            if found:
+                return found[0]
+
+    threading.Timer(appear_after, open_dialog).start()
+    found, calls, elapsed = _measure(poll)
+    _report("sleep + enumerate", calls, elapsed)
+    fake_desktop.remove_window(found.hwnd)
+
+    source.play([(appear_after, EventKind.CREATED, open_dialog)])
+    found, calls, elapsed = _measure(lambda: desktop.wait_for(timeout=5, stream=WindowEventStream(source), name_contains="Save As"))
+    _report("wait_for (events)", calls, elapsed)
+    assert found is not None
+
+    with WindowEventStream(source, debounce=0.05) as stream:
+        source.play([(0, EventKind.LOCATION_CHANGED, found.hwnd)] * burst, background=False)
+        delivered = []
+        while (event := stream.get(timeout=0.2)) is not None:
+            delivered.append(event)
+    print(f"{'location burst':<24} emitted={burst} delivered={len(delivered)}")
+
+
+def _wait_once(fake_desktop, desktop: Desktop, appear_at: float, poll_interval: float) -> tuple:
+    # appear_at 秒後に現れるウィンドウを固定間隔とバックオフで待ち、それぞれの (遅延, 列挙回数) を返す
+    from modules.query import WindowQuery
+    from modules.waiting import WindowPoller
+
+    clock, hwnd = fake_win32.FakeClock(), None
+
+    def sleep(seconds: float):
+        nonlocal hwnd
+        clock.sleep(seconds)
+        if hwnd is None and clock.now >= appear_at:
+            hwnd = fake_desktop.add_window(text="Dialog")
+
+    # viewer.py の以前の方式を、見つかるまで繰り返すようにしたもの
+    fake_desktop.enumerations = 0
+    while not desktop.get_windows_by_name("Dialog"):
+        sleep(poll_interval)
+    fixed = (clock.now - appear_at, fake_desktop.enumerations)
+    fake_desktop.remove_window(hwnd)
+
+    clock, hwnd = fake_win32.FakeClock(), None
+    poller = WindowPoller(clock=clock, sleep=sleep)
+    found = desktop.wait_for(WindowQuery(name="Dialog"), timeout=appear_at + 60, poller=poller)
+    assert found is not None
+    adaptive = (clock.now - appear_at, poller.metrics.enumerations)
+    fake_desktop.remove_window(hwnd)
+    return fixed, adaptive
+
+
+def wait(apps: int = 500, waiters: int = 8, poll_interval: float = 0.5, trials: int = 200):
+    """ウィンドウの出現待ちを、固定間隔のポーリングと適応的バックオフで比較する (時刻は仮想時計で進める)
+
+    出現時刻ごとの結果は固定間隔の位相で大きく変わるため、一様に選んだ出現時刻 `trials` 回の平均も示す。
+    """
+    from modules.waiting import WindowPoller
+
+    fake_desktop = fake_win32.install()
+    for i in range(apps):
+        fake_desktop.add_window(text=f"App {i}")
+    desktop = Desktop()
+
+    for appear_at in (0.02, 0.3, 3.1, 30.2):
+        fixed, adaptive = _wait_once(fake_desktop, desktop, appear_at, poll_interval)
+        print(f"appear at {appear_at:>5}s   fixed {poll_interval}s: latency={fixed[0]:.3f}s enumerations={fixed[1]}")
+        print(f"{'':<16} adaptive:   latency={adaptive[0]:.3f}s enumerations={adaptive[1]}")
+
+    # 平均は列挙の中身に依らないため、ウィンドウの少ないデスクトップで測る
+    small = fake_win32.FakeDesktop()
+    fake_win32.install(small)
+    rng = random.Random(0)
+    for horizon in (1, 5, 60):
+        results = [_wait_once(small, desktop, rng.uniform(0, horizon), poll_interval) for _ in range(trials)]
+        for label, column in ((f"fixed {poll_interval}s", 0), ("adaptive", 1)):
+            latency = sum(result[column][0] for result in results) / trials
+            enumerations = sum(result[column][1] for result in results) / trials
+            prefix = f"appear in 0-{horizon}s (avg)" if column == 0 else ""
+            print(f"{prefix:<24}{label + ':':<12} latency={latency:.3f}s enumerations={enumerations:.1f}")
+    fake_win32.install(fake_desktop)
+
+    # 複数スレッドの待機で列挙を共有する (実時間)
+    poller = WindowPoller()
+    names = [f"Waiter {i}" for i in range(waiters)]
+    threads = [threading.Thread(target=desktop.wait_for, kwargs=dict(timeout=5, poller=poller, name=name)) for name in names]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    fake_desktop.reset_calls()
+    for name in names:
+        fake_desktop.add_window(text=name)
+    for thread in threads:
+        thread.join()
+    print(f"{waiters} concurrent waiters: {poller.metrics}")
+
+
+def _to_dict_reflection(window: Window) -> dict:
+    # 以前の Window.to_dict: dir() の全ての名前を getattr してからプロパティか判定していた
+    # (当時は無かった OPT_IN_FIELDS は除く)
+    result = {}
+    for name in dir(window):
+        if name in OPT_IN_FIELDS:
+            continue
+        value = getattr(window, name)
+        if not name.startswith('__') and not callable(value) and isinstance(type(window).__dict__.get(name), property):
+            result[name] = value
+    return result
+
+
+def fields(depth: int = 2, breadth: int = 20, samples: int = 50):
+    """to_dict のバックエンド呼び出し数を、以前のリフレクション方式とフィールド指定で比較する"""
+    fake_desktop, (root,) = _synthetic_desktop(1, depth, breadth, note=f"samples: {samples}")
+    windows = [Window(root)] + Window(root).children[:samples - 1]
+
+    old, calls, elapsed = _measure(lambda: [_to_dict_reflection(window) for window in windows])
+    _report("dir() reflection", calls, elapsed)
+    new, calls, elapsed = _measure(lambda: [window.to_dict() for window in windows])
+    _report("registry", calls, elapsed)
+    assert [list(d) for d in old] == [list(d) for d in new]
+    _, calls, elapsed = _measure(lambda: [window.to_dict(recursive=False) for window in windows])
+    _report("recursive=False", calls, elapsed)
+    _, calls, elapsed = _measure(lambda: [window.to_dict(["text", "class_name", "rect"]) for window in windows])
+    _report("fields=text,class,rect", calls, elapsed)
+
+
+def records(apps: int = 5, depth: int = 2, breadth: int = 30):
+    """デスクトップ全体の取得を、Window.to_dict の一覧と列指向レコードでメモリ・速度比較する"""
+    import tracemalloc
+
+    fake_desktop, _ = _synthetic_desktop(apps, depth, breadth)
+    desktop = Desktop()
+
+    def dump_dicts():
+        # 以前の監査スクリプトの方式
+        return [window.to_dict() for app in desktop.get_all_windows() for window in [app] + app.children]
+
+    for title, func in (("to_dict list", dump_dicts), ("WindowRecords", desktop.records)):
+        tracemalloc.start()
+        result, calls, elapsed = _measure(func)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        _report(title, calls, elapsed)
+        print(f"{'':<24} rows={len(result)}  peak memory={peak / 1024 ** 2:.1f} MiB")
+
+
+def export(apps: int = 5, depth: int = 2, breadth: int = 30):
+    """デスクトップ全体の書き出しを、to_dict の一覧の json.dump と NDJSON の逐次書き出しで比較する"""
+    import json
+    import tempfile
+    import tracemalloc
+    from pathlib import Path
+    from modules.export import load_tree
+
+    fake_desktop, _ = _synthetic_desktop(apps, depth, breadth)
+    desktop = Desktop()
+
+    with tempfile.TemporaryDirectory() as directory:
+        def dump_json():
+            # 以前の棚卸しスクリプトの方式
+            inventory = [
+                window.to_dict(recursive=False) for app in desktop.get_all_windows() for window in [app] + app.children
+            ]
+            with open(Path(directory, "inventory.json"), "w", encoding="utf-8") as file:
+                json.dump(inventory, file, ensure_ascii=False)
+            return len(inventory)
+
+        for title, path, func in (
+            ("json.dump(to_dict)", "inventory.json", dump_json),
+            ("export ndjson", "inventory.ndjson", lambda: desktop.export(Path(directory, "inventory.ndjson"))),
+            ("export ndjson.gz", "inventory.ndjson.gz", lambda: desktop.export(Path(directory, "inventory.ndjson.gz"))),
+        ):
+            tracemalloc.start()
+            rows, calls, elapsed = _measure(func)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            _report(title, calls, elapsed)
+            size = Path(directory, path).stat().st_size
+            print(f"{'':<24} rows={rows}  peak memory={peak / 1024 ** 2:.2f} MiB  file={size / 1024:.0f} KiB")
+
+        tree, _, elapsed = _measure(lambda: load_tree(Path(directory, "inventory.ndjson.gz")))
+        _report("load_tree", 0, elapsed)
+        assert list(tree) == list(desktop.snapshot())
+
+
+def replay(apps: int = 20, depth: int = 2, breadth: int = 10, latency: float = 0.0002):
+    """フェイクバックエンドでの操作を記録し、記録ファイルからの再生と結果・呼び出し数を比較する"""
+    import tempfile
+    from pathlib import Path
+    from modules.replay import Recorder, ReplayDesktop
+
+    fake_desktop, _ = _synthetic_desktop(apps, depth, breadth)
+
+    def workload():
+        desktop = Desktop()
+        app = desktop.query(name_contains="App 1").first()
+        return (
+            [window.hwnd for window in desktop.get_windows_by_name("App")],
+            [window.hwnd for window in app.get_filtered_children(class_name="Button")],
+            [window.hwnd for window in app.get_children_in_hierarchy_on_coordinate(100, 100)],
+            app.to_dict(recursive=False),
+        )
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory, "session.json.gz")
+        with Recorder() as recorder:
+            recorder.capture_tree()
+            expected, calls, elapsed = _measure(workload)
+        recorder.save(path)
+        _report("recorded (fake)", calls, elapsed)
+        print(f"{'':<24} file={path.stat().st_size / 1024:.0f} KiB, {len(recorder.calls)} calls, {len(recorder.windows)} windows")
+
+        for mode in (None, "recorded", latency):
+            clock = fake_win32.FakeClock()
+            fake_win32.install(ReplayDesktop.load(path, latency=mode, sleep=clock.sleep))
+            result, calls, elapsed = _measure(workload)
+            assert result == expected
+            _report(f"replay latency={mode}", calls, elapsed)
+            print(f"{'':<24} replayed={fake_win32.current().replayed}  simulated backend time={clock.slept * 1000:.2f} ms")
+
+
+def hover(apps: int = 10, depth: int = 3, breadth: int = 8, events: int = 2000, mouse_hz: float = 1000.0):
+    """ドラッグ中のホバー判定を、イベントごとの取得・判定とキャッシュ・間引きありで比較する (時刻は仮想時計で進める)"""
+    from modules.hover import HoverTracker
+
+    fake_desktop, _ = _synthetic_desktop(
+        apps, depth, breadth,
+        rect=lambda i: (i * 40, i * 30, 1600 + i * 40, 1200 + i * 30),
+        note=f"{events} motion events at {mouse_hz:.0f} Hz",
+    )
+    desktop = Desktop()
+    rng = random.Random(0)
+    path, x, y = [], 800, 600
+    for _ in range(events):
+        x, y = x + rng.randint(-4, 4), y + rng.randint(-4, 4)
+        path.append((x, y))
+
+    # _on_drop の処理をマウス移動のたびに行った場合 (全件は遅すぎるので先頭の一部から見積もる)
+    sample = path[:50]
+    _, calls, elapsed = _measure(lambda: [HitTestIndex(desktop.snapshot(visible_only=True)).deepest(x, y) for x, y in sample])
+    _report("capture per event (est)", calls * len(path) // len(sample), elapsed * len(path) / len(sample))
+
+    clock = fake_win32.FakeClock()
+    tracker = HoverTracker(lambda: desktop.snapshot(visible_only=True), clock=clock)
+    _, calls, elapsed = _measure(tracker.refresh)
+    _report("background refresh (1x)", calls, elapsed)
+
+    def tracked():
+        for x, y in path:
+            tracker.request(x, y)
+            tracker.poll()
+            clock.sleep(1 / mouse_hz)
+
+    _, calls, elapsed = _measure(tracked)
+    _report("HoverTracker", calls, elapsed)
+    print(f"{'':<24} {dict(tracker.stats)}, {elapsed / max(tracker.stats['resolves'], 1) * 1000:.3f} ms per frame")
+
+
+def tree(depth: int = 4, breadth: int = 12, height: int = 25, scrolls: int = 500):
+    """ピッカーの階層ペインを、全件の行を作る方式と遅延展開・行の再利用で比較する"""
+    from modules.tree_view import LazyWindowTree, RowRecycler
+
+    fake_desktop, (root,) = _synthetic_desktop(1, depth, breadth, note=f"{height} visible rows")
+    leaf_path = [root]
+    while fake_desktop.windows[leaf_path[-1]].children:
+        leaf_path.append(fake_desktop.windows[leaf_path[-1]].children[-1])
+
+    # 以前の OptionMenu / info_table のように全てのウィンドウの行を作る
+    def eager():
+        window = Window(root)
+        return [f"{child.hwnd} [{child.class_name}] {child.text}" for child in [window] + window.children]
+
+    rows, calls, elapsed = _measure(eager)
+    _report("eager rows", calls, elapsed)
+    print(f"{'':<24} rows written={len(rows)}")
+
+    written = []
+    model = LazyWindowTree([root])
+    view = RowRecycler(model, height, lambda slot, row: written.append(slot))
+
+    def open_leaf():
+        view.ensure_visible(model.reveal(leaf_path))
+
+    _, calls, elapsed = _measure(open_leaf)
+    _report("lazy open (reveal leaf)", calls, elapsed)
+    print(f"{'':<24} rows written={len(written)}, visible rows={len(model)}")
+
+    # 全ノードを展開して、2万行のうち表示範囲だけを描画する
+    stack = [root]
+    while stack:
+        hwnd = stack.pop()
+        model.expand(hwnd)
+        stack.extend(fake_desktop.windows[hwnd].children)
+    view.update()
+    print(f"{'':<24} expanded all: visible rows={len(model)}")
+
+    def timed(action, count):
+        times = []
+        fake_desktop.reset_calls()
+        del written[:]
+        for i in range(count):
+            start = time.perf_counter()
+            action(i)
+            times.append(time.perf_counter() - start)
+        calls = fake_desktop.call_count
+        print(
+            f"{action.__name__:<24} calls={calls / count:>8.1f}  mean={sum(times) / count * 1000:>8.3f} ms  "
+            f"max={max(times) * 1000:>8.3f} ms  rows written={len(written) / count:.1f} (per op)"
+        )
+
+    rng = random.Random(0)
+
+    def scroll(i):
+        view.scroll(height if i % 2 == 0 else -height // 2)
+
+    def jump(i):
+        view.scroll_to(rng.randrange(len(model)))
+
+    nodes = fake_desktop.windows[root].children
+
+    def toggle(i):
+        # 先頭付近のノードを畳む・展開する (後ろの約2万行がずれる)
+        model.toggle(nodes[i % 2])
+        view.update()
+
+    timed(scroll, scrolls)
+    timed(jump, scrolls)
+    timed(toggle, 50)
+
+
+def locator(apps: int = 50, depth: int = 3, breadth: int = 6, locators: int = 300, removed: int = 10):
+    """ロケーターの解決を、1件ずつの解決と1回の走査でのまとめての解決・キャッシュで比較する"""
+    from modules.locator import LocatorResolver
+    from modules.snapshot import WindowTree
+
+    fake_desktop, _ = _synthetic_desktop(apps, depth, breadth, note=f"{locators} locators")
+    rng = random.Random(0)
+    targets = rng.sample(sorted(hwnd for hwnd, window in fake_desktop.windows.items() if window.parent), locators)
+    texts, calls, elapsed = _measure(lambda: [str(LocatorResolver().locate(hwnd)) for hwnd in targets])
+    _report("locate one by one", calls, elapsed)
+    resolver = LocatorResolver()
+    _, calls, elapsed = _measure(lambda: [resolver.locate(hwnd) for hwnd in targets])
+    _report("locate (shared)", calls, elapsed)
+    _, calls, elapsed = _measure(lambda: [resolver.locate(hwnd) for hwnd in targets])
+    _report("locate (cached)", calls, elapsed)
+    tree = WindowTree.capture_desktop()
+    resolver = LocatorResolver()
+    snapshot_texts, calls, elapsed = _measure(lambda: [str(resolver.locate(hwnd, tree=tree)) for hwnd in targets])
+    _report("locate (snapshot)", calls, elapsed)
+    assert snapshot_texts == texts
+
+    # 以前のコメントアウトされていた実装: ウィンドウごとに親を GetParent でたどる
+    def walk_parents():
+        paths = []
+        for hwnd in targets:
+            parents = []
+            parent = Window(hwnd).parent_hwnd
+            while parent is not None:
+                parents.append(parent)
+                parent = Window(parent).parent_hwnd
+            paths.append("/".join(str(parent) for parent in parents[::-1] + [hwnd]))
+        return paths
+
+    resolver = LocatorResolver()
+    old_paths, calls, elapsed = _measure(walk_parents)
+    _report("hwnd_path (GetParent)", calls, elapsed)
+    new_paths, calls, elapsed = _measure(lambda: [resolver.hwnd_path(hwnd) for hwnd in targets])
+    _report("hwnd_path (memoized)", calls, elapsed)
+    assert old_paths == new_paths
+
+    one_by_one, calls, elapsed = _measure(lambda: [LocatorResolver().resolve(text) for text in texts])
+    _report("resolve one by one", calls, elapsed)
+    resolver = LocatorResolver()
+    batched, calls, elapsed = _measure(lambda: resolver.resolve_many(texts))
+    _report("resolve_many (1 pass)", calls, elapsed)
+    assert one_by_one == targets and [batched[text] for text in texts] == targets
+    _, calls, elapsed = _measure(lambda: resolver.resolve_many(texts))
+    _report("resolve_many (cached)", calls, elapsed)
+
+    for hwnd in rng.sample(targets, removed):
+        fake_desktop.remove_window(hwnd)
+    result, calls, elapsed = _measure(lambda: resolver.resolve_many(texts))
+    _report(f"after {removed} destroyed", calls, elapsed)
+    print(f"{'':<24} {dict(resolver.stats)}, unresolved={sum(hwnd is None for hwnd in result.values())}")
+
+
+def collect(apps: int = 24, depth: int = 2, breadth: int = 5, latency: float = 0.0005, workers: str = "1,2,4,8,16"):
+    """複数アプリケーションの階層の取得を、逐次の to_dict と並列の collect で比較する (呼び出しごとに latency 秒待つ)"""
+    from modules.replay import ReplayDesktop
+
+    fake_desktop, roots = _synthetic_desktop(
+        apps, depth, breadth, desktop=ReplayDesktop(latency=latency), note=f"latency: {latency * 1000:.2f} ms per call"
+    )
+    pids = [fake_desktop.windows[root].pid for root in roots]
+    desktop = Desktop()
+
+    # 以前の方法: PID ごとに検索し、子ウィンドウを1つずつ to_dict する
+    def serial_to_dict():
+        return [
+            window.to_dict(recursive=False)
+            for pid in pids for app in desktop.get_windows_by_pid(pid) for window in [app] + app.children
+        ]
+
+    _, calls, elapsed = _measure(serial_to_dict)
+    _report("by_pid + to_dict", calls, elapsed)
+
+    # Fire は "1,2,4" をタプルとして渡す
+    counts = [int(value) for value in (workers if isinstance(workers, (tuple, list)) else str(workers).split(","))]
+    expected = None
+    for count in counts:
+        records, calls, elapsed = _measure(lambda: desktop.collect(pids=pids, workers=count))
+        _report(f"collect workers={count}", calls, elapsed)
+        expected = expected or list(records)
+        assert list(records) == expected
+    records, _, elapsed = _measure(lambda: desktop.collect(pids=pids, workers=count, processes=True))
+    print(f"{'collect processes':<24} {'':>14}  time={elapsed * 1000:>10.2f} ms  (calls are made in the worker processes)")
+    assert list(records) == expected
+    # 全アプリケーションが対象なので、逐次の records と同じ並びになる
+    assert expected == list(desktop.records())
+
+
+def worker(latency: float = 0.002, picks: int = 5, frame: float = 0.016):
+    """ウィンドウ選択時の属性読み出しを、GUI スレッドでの直接実行とバックグラウンド実行で比較する"""
+    from modules.replay import ReplayDesktop
+    from modules.worker import BackgroundWorker
+
+    # 呼び出しごとに latency 秒かかるバックエンド
+    fake_desktop, (root,) = _synthetic_desktop(1, 2, 10, desktop=ReplayDesktop(latency=latency))
+    targets = [root] + fake_desktop.windows[root].children[:picks - 1]
+
+    start = time.perf_counter()
+    Window(targets[-1]).to_dict()
+    print(f"{'to_dict on GUI thread':<24} blocked={(time.perf_counter() - start) * 1000:>8.2f} ms (one pick)")
+
+    def iter_properties(handle):
+        window = Window(handle)
+        for key in Window.field_names(recursive=False):
+            yield key, getattr(window, key)
+
+    background = BackgroundWorker()
+    rows = []
+    start = time.perf_counter()
+    for hwnd in targets:
+        # ユーザーが選択し直すたびに前の読み出しは取り消される
+        background.submit("properties", iter_properties, hwnd, on_item=rows.append, on_done=lambda _: None)
+    longest, first_row = 0.0, None
+    while background.stats["done"] == 0:
+        tick = time.perf_counter()
+        background.drain()
+        longest = max(longest, time.perf_counter() - tick)
+        if rows and first_row is None:
+            first_row = time.perf_counter() - start
+        time.sleep(frame)
+    total = time.perf_counter() - start
+    background.shutdown()
+    assert [key for key, _ in rows] == list(Window.field_names(recursive=False))
+    print(f"{'BackgroundWorker':<24} blocked={longest * 1000:>8.2f} ms (longest drain), first row {first_row * 1000:.1f} ms, all rows {total * 1000:.1f} ms")
+    print(f"{'':<24} {dict(background.stats)}")
+
+
+def _suite_cases(apps: int, depth: int, breadth: int, include_render: bool) -> dict:
+    # 計測対象の操作。各関数はフェイクデスクトップ構築後に何度呼んでも同じ結果になるようにする
+    fake_desktop, roots = _synthetic_desktop(apps, depth, breadth, rect=lambda i: (0, 0, 1600, 1200))
+    desktop = Desktop()
+    app = Window(roots[apps // 2])
+    sample = [app] + app.children[:99]
+    points = [(x, y) for x in range(50, 1600, 300) for y in range(50, 1200, 300)]
+
+    def picker_drop():
+        # WindowPicker._on_drop と同じ処理
+        index = HitTestIndex(desktop.snapshot(visible_only=True))
+        return [index.tree.window(hit.hwnd) for hit in index.query(800, 600)]
+
+    cases = {
+        "get_windows_by_name": lambda: desktop.get_windows_by_name(f"App {apps - 1}"),
+        "get_windows_by_class": lambda: desktop.get_windows_by_class("SyntheticApp"),
+        "get_windows_by_pid": lambda: desktop.get_windows_by_pid(1000),
+        "get_all_top_visible": desktop.get_all_top_visibile_windows,
+        "filtered_children": lambda: app.get_filtered_children(class_name="Button"),
+        "filtered_children multi": lambda: app.get_filtered_children(class_name=["Button", "Edit"], is_visible=True),
+        "hierarchy_on_coordinate": lambda: [app.get_children_in_hierarchy_on_coordinate(x, y) for x, y in points],
+        "hierarchy_on_coord index": lambda: [
+            app.get_children_in_hierarchy_on_coordinate(x, y, index) for index in [app.hit_test_index()] for x, y in points
+        ],
+        "to_dict": lambda: [window.to_dict() for window in sample],
+        "to_dict recursive=False": lambda: [window.to_dict(recursive=False) for window in sample],
+        "picker _on_drop": picker_drop,
+    }
+    if include_render:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        from modules import rendering
+
+        def draw():
+            figure = rendering.draw_window_obj(app, show=False)
+            figure.canvas.draw()
+            plt.close(figure)
+
+        cases["draw_window_obj (Agg)"] = draw
+    return cases
+
+
+def suite(
+        apps: int = 20,
+        depth: int = 3,
+        breadth: int = 8,
+        repeat: int = 5,
+        include_render: bool = True,
+        save: str = None,
+        baseline: str = None,
+        threshold: float = 0.25,
+        min_delta_ms: float = 1.0
+    ):
+    """主要な操作の呼び出し数と時間をまとめて計測し、基準値と比較する
+
+    ```bash
+    python benchmark.py suite --save=baseline.json      # 基準値を保存
+    python benchmark.py suite --baseline=baseline.json  # 基準値より遅くなっていれば終了コード1
+    ```
+
+    呼び出し数は決定的なので基準値より1回でも多ければ、時間は中央値が `threshold` の割合かつ
+    `min_delta_ms` 以上遅くなっていれば劣化とみなす。
+    """
+    import json
+    import statistics
+
+    params = {"apps": apps, "depth": depth, "breadth": breadth, "include_render": include_render}
+    cases = _suite_cases(apps, depth, breadth, include_render)
+    results = {}
+    for name, func in cases.items():
+        func()  # キャッシュや遅延 import の影響を除く
+        timings = []
+        for _ in range(repeat):
+            _, calls, elapsed = _measure(func)
+            timings.append(elapsed)
+        results[name] = {"calls": calls, "time": statistics.median(timings)}
+        _report(name, calls, results[name]["time"])
+
+    if save:
+        with open(save, "w", encoding="utf-8") as file:
+            json.dump({"params": params, "results": results}, file, ensure_ascii=False, indent=2)
+        print(f"saved: {save}")
+    if not baseline:
+        return
+    with open(baseline, encoding="utf-8") as file:
+        expected = json.load(file)
+    if expected["params"] != params:
+        raise SystemExit(f"baseline was measured with different parameters: {expected['params']}")
+    regressions = []
+    for name, result in results.items():
+        base = expected["results"].get(name)
+        if base is None:
+            continue
+        if result["calls"] > base["calls"]:
+            regressions.append(f"{name}: calls {base['calls']} -> {result['calls']}")
+        delta = result["time"] - base["time"]
+        if delta > base["time"] * threshold and delta * 1000 > min_delta_ms:
+            regressions.append(f"{name}: time {base['time'] * 1000:.2f} ms -> {result['time'] * 1000:.2f} ms")
+    if regressions:
+        raise SystemExit("regressions:\n  " + "\n  ".join(regressions))
+    print(f"no regressions against {baseline}")
+
+
+if __name__ == "__main__":
+    Fire({
+        "snapshot": snapshot,
+        "hit_test": hit_test,
+        "query": query,
+        "iterate": iterate,
+        "filtering": filtering,
+        "cache": cache,
+        "messages": messages,
+        "dispatch": dispatch,
+        "import_time": import_time,
+        "render": render,
+        "viewport": viewport,
+        "diff": diff,
+        "events": events,
+        "wait": wait,
+        "records": records,
+        "fields": fields,
+        "export": export,
+        "replay": replay,
+        "hover": hover,
+        "tree": tree,
+        "locator": locator,
+        "worker": worker,
+        "collect": collect,
+        "suite": suite,
+    })
@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+if TYPE_CHECKING:
+    from .events import WindowEvent
+
+
+DEFAULT_TTLS = {
+    "class_name": 1.0,
+}
+"""属性ごとの既定の有効期限 (秒)。
+
+クラス名はウィンドウの生存中に変わらないため長めにするが、破棄されたウィンドウのハンドルは再利用されるため無期限にはしない。
+"""
+
+EVENT_ATTRIBUTES: dict[str, Optional[tuple]] = {
+    "CREATED": None,
+    "DESTROYED": None,
+    "NAME_CHANGED": ("text",),
+    "LOCATION_CHANGED": ("rect", "client_rect", "is_iconic"),
+    "SHOWN": ("is_visible",),
+    "HIDDEN": ("is_visible",),
+}
+"""イベントの種類 (`EventKind` の名前) ごとに `on_event` が捨てる属性。None なら全ての属性
+
+作成・破棄ではハンドルが再利用され得るため、そのハンドルのキャッシュを全て捨てる。
+"""
+
+
+class AttributeCache:
+    """ウィンドウ属性の有効期限付きキャッシュ
+
+    ハンドルごとに属性値と取得時刻を保持し、有効期限内なら win32 呼び出しを省略する。
+    保持するハンドル数が `max_handles` を超えると最も長く使われていないハンドルから破棄する。
+    複数の `Window` で共有でき、スレッドセーフである (ただしヒット・ミスの集計はロックを取らないため、
+    複数のスレッドから同時に読み出すと少なく数えられることがある)。
+
+    有効期限は格納時に期限の時刻として記録するため、`ttl` / `ttls` の変更はその後に格納した値から適用される。
+    イベントの発生源を購読させると、イベントが影響する属性 (`EVENT_ATTRIBUTES`) のキャッシュを有効期限を待たずに捨てる。
+
+        cache = AttributeCache()
+        source.subscribe(cache.on_event)
+    """
+
+    def __init__(
+            self,
+            ttl: float = 0.05,
+            *,
+            ttls: Optional[dict[str, float]] = None,
+            max_handles: int = 1024,
+            clock: Callable[[], float] = time.monotonic
+        ):
+        """
+        Args:
+            ttl (float): 既定の有効期限 (秒)
+            ttls (Optional[dict[str, float]]): 属性ごとの有効期限 (秒)。`DEFAULT_TTLS` を上書きする
+            max_handles (int): 保持するハンドル数の上限
+            clock (Callable[[], float]): 現在時刻 (秒) を返す関数
+        """
+        self.ttl = ttl
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.max_handles = max_handles
+        self.clock = clock
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self.evictions: int = 0
+        # ハンドル → 属性名 → (値, 期限の時刻)
+        self.__entries: OrderedDict[int, dict[str, tuple[Any, float]]] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """キャッシュヒット率
+
+        Returns:
+            float: 全属性合計のヒット率 (0.0 - 1.0)
+        """
+        hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    def ttl_of(self, name: str) -> float:
+        """属性の有効期限を取得する
+
+        Args:
+            name (str): 属性名
+
+        Returns:
+            float: 有効期限 (秒)
+        """
+        return self.ttls.get(name, self.ttl)
+
+    def get(self, hwnd: int, name: str, fetch: Callable[[], Any]) -> Any:
+        """キャッシュから属性値を取得し、期限切れなら `fetch` で取得し直す
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+            name (str): 属性名
+            fetch (Callable[[], Any]): 属性値を win32 から取得する関数
+
+        Returns:
+            Any: 属性値
+        """
+        now = self.clock()
+        # ヒットした場合はロックを取らない (dict の参照は GIL の下で不可分であり、値と期限は1つのタプルで入れ替わる)
+        entry = self.__entries.get(hwnd)
+        cached = entry.get(name) if entry is not None else None
+        if cached is not None and now < cached[1]:
+            try:
+                self.__entries.move_to_end(hwnd)
+            except KeyError:
+                # 他のスレッドで破棄された
+                pass
+            self.hits[name] += 1
+            return cached[0]
+        self.misses[name] += 1
+        value = fetch()
+        self.put(hwnd, name, value, now)
+        return value
+
+    def put(self, hwnd: int, name: str, value: Any, timestamp: Optional[float] = None) -> None:
+        """属性値をキャッシュに格納する
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+            name (str): 属性名
+            value (Any): 属性値
+            timestamp (Optional[float]): 取得時刻。None なら現在時刻
+        """
+        if timestamp is None:
+            timestamp = self.clock()
+        expires = timestamp + self.ttl_of(name)
+        with self.__lock:
+            entry = self.__entries.get(hwnd)
+            if entry is None:
+                entry = self.__entries[hwnd] = {}
+                while len(self.__entries) > self.max_handles:
+                    self.__entries.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self.__entries.move_to_end(hwnd)
+            entry[name] = (value, expires)
+
+    def invalidate(self, hwnd: Optional[int] = None, *names: str) -> None:
+        """キャッシュを破棄する
+
+        Args:
+            hwnd (Optional[int]): 対象のハンドル。None なら全てのハンドル
+            *names (str): 対象の属性名。省略時は全ての属性
+        """
+        with self.__lock:
+            if hwnd is None:
+                targets = list(self.__entries.values())
+                if not names:
+                    self.__entries.clear()
+                    return
+            else:
+                if not names:
+                    self.__entries.pop(hwnd, None)
+                    return
+                targets = [self.__entries[hwnd]] if hwnd in self.__entries else []
+            for entry in targets:
+                for name in names:
+                    entry.pop(name, None)
+
+    def on_event(self, event: "WindowEvent") -> None:
+        """イベントを受け取り、影響する属性のキャッシュを捨てる (`EventSource.subscribe` に渡す)
+
+        Args:
+            event (WindowEvent): ウィンドウイベント
+        """
+        if event.kind.name not in EVENT_ATTRIBUTES:
+            return
+        names = EVENT_ATTRIBUTES[event.kind.name]
+        self.invalidate(event.hwnd, *(names or ()))
+
+    def reset_stats(self) -> None:
+        """ヒット・ミス・破棄の各カウンタをリセットする"""
+        self.hits.clear()
+        self.misses.clear()
+        self.evictions = 0
@@ -0,0 +1,106 @@
+"""複数アプリケーションの階層の並列取得
+
+トップレベルウィンドウをプロセスIDごとにまとめ、アプリケーション単位の階層の取得をスレッドまたはプロセスのプールに
+振り分ける。各ワーカーは `WindowRecords` (pickle できる列指向レコード) を返し、呼び出し側で
+トップレベルウィンドウの列挙順に連結するため、結果の並びは逐次取得 (`WindowRecords.capture_desktop`) と同じになる。
+
+Win32 API の呼び出し中は GIL が解放されるため、待ち時間の長いアプリケーションが多いほどスレッドでも並列化が効く。
+
+    records = Desktop().collect(pids=[1234, 5678], workers=8)
+"""
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterable, Optional, Sequence
+
+import win32gui
+import win32process
+
+from .records import WindowRecords
+
+
+def capture_roots(roots: Sequence[int]) -> list[WindowRecords]:
+    """トップレベルウィンドウごとに階層を取得する
+
+    プロセスプールから呼び出せるよう、モジュール直下に置いている。
+
+    Args:
+        roots (Sequence[int]): トップレベルウィンドウのハンドル
+
+    Returns:
+        list[WindowRecords]: `roots` の順に並んだレコード (取得中に破棄されたウィンドウとその子孫は含まない)
+    """
+    parts = []
+    for root in roots:
+        try:
+            parts.append(WindowRecords.capture(root))
+        except win32gui.error:
+            # 子の列挙前にルートが破棄された
+            parts.append(WindowRecords())
+    return parts
+
+
+def group_by_pid(roots: Iterable[int]) -> dict[int, list[int]]:
+    """トップレベルウィンドウをプロセスIDごとにまとめる
+
+    Args:
+        roots (Iterable[int]): トップレベルウィンドウのハンドル
+
+    Returns:
+        dict[int, list[int]]: プロセスIDとそのトップレベルウィンドウ (列挙順) の dict。最初のウィンドウの列挙順に並ぶ
+    """
+    groups: dict[int, list[int]] = {}
+    for root in roots:
+        _, pid = win32process.GetWindowThreadProcessId(root)
+        groups.setdefault(pid, []).append(root)
+    return groups
+
+
+def collect_applications(
+        pids: Optional[Iterable[int]] = None,
+        *,
+        workers: int = 4,
+        processes: bool = False,
+        visible_only: bool = False,
+        executor: Optional[Executor] = None
+    ) -> WindowRecords:
+    """アプリケーションごとの階層を並列に取得し、1つのレコードにまとめる
+
+    Args:
+        pids (Optional[Iterable[int]]): 対象のプロセスID。None なら全て
+        workers (int): ワーカー数。1以下なら呼び出したスレッドで逐次取得する
+        processes (bool): スレッドの代わりにプロセスのプールを使うか
+        visible_only (bool): 表示されているトップレベルウィンドウのみを対象にするか
+        executor (Optional[Executor]): 使用するプール。指定した場合は `workers` と `processes` を無視し、終了もしない
+
+    Returns:
+        WindowRecords: トップレベルウィンドウの列挙順 (ルートごとに前順) に並んだレコード
+    """
+    roots = []
+    win32gui.EnumWindows(lambda hwnd, roots: roots.append(hwnd), roots)
+    if visible_only:
+        roots = [root for root in roots if win32gui.IsWindowVisible(root)]
+    groups = group_by_pid(roots)
+    if pids is not None:
+        pids = set(pids)
+        pid_of = {root: pid for pid, group in groups.items() for root in group}
+        groups = {pid: group for pid, group in groups.items() if pid in pids}
+        # プロセスごとにまとめ直さず、列挙順のまま絞り込む
+        roots = [root for root in roots if pid_of[root] in pids]
+
+    if executor is None and workers <= 1:
+        results = {pid: capture_roots(group) for pid, group in groups.items()}
+    else:
+        pool = executor
+        if pool is None:
+            pool = (ProcessPoolExecutor if processes else ThreadPoolExecutor)(max_workers=workers)
+        try:
+            futures = {pid: pool.submit(capture_roots, group) for pid, group in groups.items()}
+            results = {pid: future.result() for pid, future in futures.items()}
+        finally:
+            if executor is None:
+                pool.shutdown()
+
+    # ワーカーの完了順によらず、トップレベルウィンドウの列挙順に連結する
+    parts = {}
+    for pid, group in groups.items():
+        parts.update(zip(group, results[pid]))
+    return WindowRecords.merge(parts[root] for root in roots)
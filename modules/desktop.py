@@ -1,10 +1,26 @@
-from typing import Optional
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
 from logging import Logger
 
+import win32con
 import win32gui
-import win32process
 
 from .window import Window
+from .snapshot import WindowTree
+from .records import WindowRecords
+from .export import Target, export_windows
+from .query import WindowQuery
+from .enumeration import iter_enum
+from .diff import WindowChange, watch
+from .events import EventKind, WindowEventStream
+from .locator import LocatorLike, LocatorResolver, default_resolver
+
+if TYPE_CHECKING:
+    from .dispatcher import MessageDispatcher
+    from .waiting import WindowPoller
+
+
+_APPEAR_EVENTS = (EventKind.CREATED, EventKind.SHOWN, EventKind.NAME_CHANGED)
+"""ウィンドウが検索条件を満たすようになり得るイベント"""
 
 class Desktop:
     def __init__(self, logger: Optional[Logger] = None):
@@ -15,35 +31,231 @@ class Desktop:
         win32gui.EnumWindows(lambda hwnd, results: results.append(Window(hwnd)), results)
         return results
 
+    def iter_windows(self) -> Iterator[Window]:
+        """トップレベルウィンドウを列挙しながら逐次取得する
+
+        途中でイテレーションをやめると列挙も打ち切られる。
+
+        Yields:
+            Window: トップレベルウィンドウ
+        """
+        for hwnd in iter_enum(win32gui.EnumWindows):
+            yield Window(hwnd)
+
+    def query(self, **kwargs) -> WindowQuery:
+        """複数条件を1回の列挙で評価するクエリを作成する
+
+        Args:
+            **kwargs: `WindowQuery` の検索条件 (name_contains, class_name, pid, visible, regex, limit など)
+
+        Returns:
+            WindowQuery: 検索クエリ
+        """
+        return WindowQuery(**kwargs)
+
+    def locate(
+            self,
+            locator: LocatorLike,
+            *,
+            resolver: Optional[LocatorResolver] = None,
+            refresh: bool = False
+        ) -> Optional[Window]:
+        """ロケーター ("Notepad/Edit[0]" など) でウィンドウを取得する
+
+        Args:
+            locator (str | Locator): ロケーター
+            resolver (Optional[LocatorResolver]): 使用するリゾルバー。None なら共有のもの
+            refresh (bool): キャッシュを使わずに解決し直すか
+
+        Returns:
+            Optional[Window]: 見つからなければ None
+        """
+        return self.locate_many([locator], resolver=resolver, refresh=refresh)[locator]
+
+    def locate_many(
+            self,
+            locators: Iterable[LocatorLike],
+            *,
+            resolver: Optional[LocatorResolver] = None,
+            refresh: bool = False
+        ) -> dict:
+        """複数のロケーターを1回の走査でまとめて解決する
+
+        Args:
+            locators (Iterable[str | Locator]): ロケーター
+            resolver (Optional[LocatorResolver]): 使用するリゾルバー。None なら共有のもの
+            refresh (bool): キャッシュを使わずに解決し直すか
+
+        Returns:
+            dict[str | Locator, Optional[Window]]: 指定したロケーターとウィンドウ (見つからなければ None) の dict
+        """
+        resolver = resolver or default_resolver()
+        resolved = resolver.resolve_many(locators, refresh=refresh)
+        return {key: Window(hwnd) if hwnd is not None else None for key, hwnd in resolved.items()}
+
     def get_windows_by_name(self, name) -> list[Window]:
-        def _callback(hwnd, results):
-            if name in win32gui.GetWindowText(hwnd):
-                results.append(Window(hwnd))
-        results = []
-        win32gui.EnumWindows(_callback, results)
-        return results
+        return self.query(name_contains=name).all()
 
     def get_windows_by_class(self, class_name) -> list[Window]:
-        def _callback(hwnd, results):
-            if class_name in win32gui.GetClassName(hwnd):
-                results.append(Window(hwnd))
-        results = []
-        win32gui.EnumWindows(_callback, results)
-        return results
+        return self.query(class_contains=class_name).all()
 
     def get_windows_by_pid(self, pid) -> list[Window]:
-        def _callback(hwnd, results):
-            _, process_id = win32process.GetWindowThreadProcessId(hwnd)
-            if process_id == pid:
-                results.append(Window(hwnd))
-        results = []
-        win32gui.EnumWindows(_callback, results)
-        return results
+        return self.query(pid=pid).all()
 
     def get_all_top_visibile_windows(self) -> list[Window]:
-        def callback(hwnd, results):
-            if win32gui.IsWindowVisible(hwnd):
-                results.append(Window(hwnd))
-        results = []
-        win32gui.EnumWindows(callback, results)
-        return results
\ No newline at end of file
+        return self.query(visible=True).all()
+
+    async def gather_send(self, targets: Iterable, act, *, dispatcher: Optional["MessageDispatcher"] = None, **kwargs) -> list:
+        """複数のウィンドウに同じメッセージを並行して送信する
+
+        Args:
+            targets (Iterable[Window | int]): 送信先
+            act (Win32Constants | str | int): メッセージ
+            dispatcher (Optional[MessageDispatcher]): 使用するディスパッチャー。None なら共有のもの
+            **kwargs: `MessageDispatcher.gather_send` のオプション (word_param, long_param, timeout など)
+
+        Returns:
+            list: 送信先の順に並んだ戻り値 (タイムアウトなどで失敗した場合は例外)
+        """
+        from .dispatcher import default_dispatcher
+        dispatcher = dispatcher or default_dispatcher()
+        return await dispatcher.gather_send(targets, act, **kwargs)
+
+    def snapshot(self, visible_only: bool = False) -> WindowTree:
+        """デスクトップ全体の階層を1回の列挙で取得する
+
+        Args:
+            visible_only (bool): 表示されているトップレベルウィンドウのみを対象にするか
+
+        Returns:
+            WindowTree: トップレベルウィンドウをルートとするスナップショット
+        """
+        return WindowTree.capture_desktop(visible_only)
+
+    def records(self, visible_only: bool = False) -> WindowRecords:
+        """デスクトップ全体の階層を列指向のレコードとして取得する
+
+        数万コントロールを一括で取得・保存する用途向けで、`Window` はレコードから必要な分だけ生成する。
+
+        Args:
+            visible_only (bool): 表示されているトップレベルウィンドウのみを対象にするか
+
+        Returns:
+            WindowRecords: トップレベルウィンドウをルートとするレコード
+        """
+        return WindowRecords.capture_desktop(visible_only)
+
+    def collect(
+            self,
+            pids: Optional[Iterable[int]] = None,
+            *,
+            workers: int = 4,
+            processes: bool = False,
+            visible_only: bool = False
+        ) -> WindowRecords:
+        """アプリケーションごとの階層をワーカーに振り分けて並列に取得する
+
+        結果の並びは `records` と同じ (トップレベルウィンドウの列挙順、ルートごとに前順)。
+
+        Args:
+            pids (Optional[Iterable[int]]): 対象のプロセスID。None なら全て
+            workers (int): ワーカー数。1以下なら逐次取得する
+            processes (bool): スレッドの代わりにプロセスのプールを使うか
+            visible_only (bool): 表示されているトップレベルウィンドウのみを対象にするか
+
+        Returns:
+            WindowRecords: 全アプリケーションの階層をまとめたレコード
+        """
+        from .collect import collect_applications
+        return collect_applications(pids, workers=workers, processes=processes, visible_only=visible_only)
+
+    def export(self, target: Target, *, visible_only: bool = False, **kwargs) -> int:
+        """デスクトップ全体の階層を1行1ウィンドウで逐次書き出す
+
+            desktop.export("inventory.ndjson.gz")
+
+        Args:
+            target (str | os.PathLike | IO): 書き出し先 (`.gz` なら gzip 圧縮、`.parquet` なら Parquet)
+            visible_only (bool): 表示されているトップレベルウィンドウのみを対象にするか
+            **kwargs: `modules.export.export_windows` のオプション (format, compress, batch_size)
+
+        Returns:
+            int: 書き出した行数
+        """
+        roots = []
+        win32gui.EnumWindows(lambda hwnd, roots: roots.append(hwnd), roots)
+        if visible_only:
+            roots = [hwnd for hwnd in roots if win32gui.IsWindowVisible(hwnd)]
+        return export_windows(roots, target, **kwargs)
+
+    def watch(self, interval: float = 0.5, visible_only: bool = False, **kwargs) -> Iterator[list[WindowChange]]:
+        """デスクトップ全体を定期的に取得し、変化があったときだけ差分を返す
+
+        Args:
+            interval (float): 取得間隔 (秒)
+            visible_only (bool): 表示されているトップレベルウィンドウのみを対象にするか
+            **kwargs: `modules.diff.watch` のオプション
+
+        Yields:
+            list[WindowChange]: 前回の取得からの変化
+        """
+        return watch(lambda: self.snapshot(visible_only), interval, **kwargs)
+
+    def wait_for(
+            self,
+            query: Optional[WindowQuery] = None,
+            timeout: Optional[float] = None,
+            *,
+            stream: Optional[WindowEventStream] = None,
+            poller: Optional["WindowPoller"] = None,
+            **kwargs
+        ) -> Optional[Window]:
+        """条件に合致するウィンドウが現れるまで待つ
+
+        `stream` を指定した場合は最初に1度だけ列挙し、以降は作成・表示・タイトル変更のイベントが届いたトップレベルウィンドウだけを判定する。
+        指定しない場合は `poller` で間隔を伸ばしながらポーリングする (同じポーラーで待つ他の待機と列挙を共有する)。
+
+            dialog = desktop.wait_for(timeout=10, name_contains="保存")
+
+        Args:
+            query (Optional[WindowQuery]): 検索条件。None なら `kwargs` から作る
+            timeout (Optional[float]): 待機する最大秒数。None なら無期限
+            stream (Optional[WindowEventStream]): 使用するイベントストリーム。開いていなければここで開き、戻る前に閉じる
+            poller (Optional[WindowPoller]): ポーリングに使うポーラー。None なら共有のもの
+            **kwargs: `WindowQuery` の検索条件 (name_contains, class_name, pid, visible, regex など)
+
+        Returns:
+            Optional[Window]: 合致したウィンドウ。タイムアウトした場合は None
+        """
+        query = query if query is not None else self.query(**kwargs)
+        if stream is None:
+            from .waiting import default_poller
+            return (poller or default_poller()).wait_for_window(query, timeout)
+
+        # 列挙中に現れたウィンドウを取りこぼさないよう、先に購読を始める (ここで開いた場合は閉じて返す)
+        opened = not stream.is_open
+        stream.open()
+        try:
+            found = query.first()
+            if found is not None:
+                return found
+
+            desktop_hwnd = win32gui.GetDesktopWindow()
+
+            def _predicate(event) -> bool:
+                if event.kind not in _APPEAR_EVENTS:
+                    return False
+                try:
+                    # ポーリングや `query` と同じく、トップレベルウィンドウ (親がデスクトップ) だけを対象にする
+                    if win32gui.GetAncestor(event.hwnd, win32con.GA_PARENT) != desktop_hwnd:
+                        return False
+                    return query.matches(event.hwnd)
+                except win32gui.error:
+                    # 判定前に破棄された
+                    return False
+
+            event = stream.wait_for(_predicate, timeout)
+            return None if event is None else Window(event.hwnd)
+        finally:
+            if opened:
+                stream.close()
@@ -0,0 +1,116 @@
+import time
+from enum import Enum
+from typing import Callable, Iterator, NamedTuple, Optional
+
+from .snapshot import WindowSnapshot, WindowTree
+
+
+class ChangeKind(Enum):
+    """### スナップショット間のウィンドウの変化の種類
+
+    Values:
+        - CREATED: ウィンドウが作成された
+        - DESTROYED: ウィンドウが破棄された
+        - TITLE_CHANGED: タイトルが変わった
+        - MOVED: 位置が変わった
+        - RESIZED: 大きさが変わった
+        - SHOWN: 表示された
+        - HIDDEN: 非表示になった
+    """
+
+    CREATED = "created"
+    DESTROYED = "destroyed"
+    TITLE_CHANGED = "title_changed"
+    MOVED = "moved"
+    RESIZED = "resized"
+    SHOWN = "shown"
+    HIDDEN = "hidden"
+
+
+class WindowChange(NamedTuple):
+    """ウィンドウ1つ分の変化
+
+    Attributes:
+        kind (ChangeKind): 変化の種類
+        hwnd (int): ウィンドウハンドル
+        before (Optional[WindowSnapshot]): 変化前の状態 (作成時は None)
+        after (Optional[WindowSnapshot]): 変化後の状態 (破棄時は None)
+    """
+    kind: ChangeKind
+    hwnd: int
+    before: Optional[WindowSnapshot]
+    after: Optional[WindowSnapshot]
+
+
+def _compare(before: WindowSnapshot, after: WindowSnapshot) -> list[WindowChange]:
+    hwnd = after.hwnd
+    if before.class_name != after.class_name:
+        # ハンドルが破棄後に別のウィンドウへ再利用された
+        return [
+            WindowChange(ChangeKind.DESTROYED, hwnd, before, None),
+            WindowChange(ChangeKind.CREATED, hwnd, None, after),
+        ]
+    changes = []
+    if before.text != after.text:
+        changes.append(WindowChange(ChangeKind.TITLE_CHANGED, hwnd, before, after))
+    bx1, by1, bx2, by2 = before.rect
+    ax1, ay1, ax2, ay2 = after.rect
+    if (bx1, by1) != (ax1, ay1):
+        changes.append(WindowChange(ChangeKind.MOVED, hwnd, before, after))
+    if (bx2 - bx1, by2 - by1) != (ax2 - ax1, ay2 - ay1):
+        changes.append(WindowChange(ChangeKind.RESIZED, hwnd, before, after))
+    if before.is_visible != after.is_visible:
+        kind = ChangeKind.SHOWN if after.is_visible else ChangeKind.HIDDEN
+        changes.append(WindowChange(kind, hwnd, before, after))
+    return changes
+
+
+def diff_trees(before: WindowTree, after: WindowTree) -> list[WindowChange]:
+    """2つのスナップショットの差分を取得する
+
+    ハンドルをキーに突き合わせるため、ウィンドウ数に対して線形時間で求まる。
+
+    Args:
+        before (WindowTree): 変化前のスナップショット
+        after (WindowTree): 変化後のスナップショット
+
+    Returns:
+        list[WindowChange]: 破棄 → 作成・変更 (変化後の前順) の順に並んだ変化一覧
+    """
+    changes = [
+        WindowChange(ChangeKind.DESTROYED, snapshot.hwnd, snapshot, None)
+        for snapshot in before if snapshot.hwnd not in after
+    ]
+    for snapshot in after:
+        previous = before.get(snapshot.hwnd)
+        if previous is None:
+            changes.append(WindowChange(ChangeKind.CREATED, snapshot.hwnd, None, snapshot))
+        elif previous != snapshot:
+            changes.extend(_compare(previous, snapshot))
+    return changes
+
+
+def watch(
+        capture: Callable[[], WindowTree],
+        interval: float = 0.5,
+        *,
+        sleep: Callable[[float], None] = time.sleep
+    ) -> Iterator[list[WindowChange]]:
+    """定期的にスナップショットを取得し、変化があったときだけ差分を返す
+
+    Args:
+        capture (Callable[[], WindowTree]): スナップショットを取得する関数
+        interval (float): 取得間隔 (秒)
+        sleep (Callable[[float], None]): 待機に使う関数
+
+    Yields:
+        list[WindowChange]: 前回の取得からの変化 (空の場合は yield しない)
+    """
+    previous = capture()
+    while True:
+        sleep(interval)
+        current = capture()
+        changes = diff_trees(previous, current)
+        previous = current
+        if changes:
+            yield changes
@@ -0,0 +1,171 @@
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+import win32con
+import win32gui
+import win32process
+
+from .messages import resolve_message
+
+
+TIMEOUT_ERRORS = (0, 1460)
+"""SendMessageTimeout が応答なし/タイムアウトで失敗したときのエラーコード (0, ERROR_TIMEOUT)"""
+
+
+class MessageDispatcher:
+    """ブロッキングする SendMessage をスレッドプールで実行する asyncio 向けのフロントエンド
+
+    各呼び出しは `SendMessageTimeout` で行うため、応答しないウィンドウがあってもワーカースレッドは
+    タイムアウト後に解放される。送信先プロセスごとに同時実行数を制限し、1つのアプリが固まっても
+    他のアプリへの送信が巻き込まれないようにする。
+    送信を取り消しても実行中の `SendMessageTimeout` は止められないため、その送信が終わるまで
+    同じプロセスへの次の送信は待たせる。
+
+        dispatcher = MessageDispatcher(max_workers=8, timeout=1.0)
+        result = await dispatcher.send(window, Win32Constants.WM_GETTEXTLENGTH)
+    """
+
+    def __init__(
+            self,
+            *,
+            max_workers: int = 8,
+            per_process: int = 1,
+            timeout: float = 5.0,
+            abort_if_hung: bool = True
+        ):
+        """
+        Args:
+            max_workers (int): スレッドプールのワーカー数
+            per_process (int): 送信先プロセスごとの同時送信数の上限
+            timeout (float): 1回の送信のタイムアウト秒数
+            abort_if_hung (bool): 応答なしと判定されているウィンドウには待たずに失敗させるか (SMTO_ABORTIFHUNG)
+        """
+        self.per_process = per_process
+        self.timeout = timeout
+        self.flags = win32con.SMTO_ABORTIFHUNG if abort_if_hung else win32con.SMTO_NORMAL
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="win32-send")
+        # 送信中・待機中の送信がなくなったプロセスのセマフォは自動的に消える
+        self.__limits: weakref.WeakValueDictionary[int, asyncio.Semaphore] = weakref.WeakValueDictionary()
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __limit_for(self, pid: int) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop is not self.__loop:
+            # セマフォはイベントループに紐づくため、ループが変わったら作り直す
+            self.__loop = loop
+            self.__limits = weakref.WeakValueDictionary()
+        limit = self.__limits.get(pid)
+        if limit is None:
+            limit = self.__limits[pid] = asyncio.Semaphore(self.per_process)
+        return limit
+
+    def _send_blocking(self, hwnd: int, msg: int, word_param, long_param, timeout: float):
+        try:
+            _, result = win32gui.SendMessageTimeout(hwnd, msg, word_param, long_param, self.flags, int(timeout * 1000))
+        except win32gui.error as e:
+            if e.winerror in TIMEOUT_ERRORS:
+                raise TimeoutError(f"SendMessage to {hwnd} timed out after {timeout}s") from e
+            raise
+        return result
+
+    async def send(
+            self,
+            target,
+            act,
+            *,
+            word_param: Optional[int] = None,
+            long_param=None,
+            timeout: Optional[float] = None
+        ):
+        """メッセージを送信し、応答を待つ
+
+        Args:
+            target (Window | int): 送信先
+            act (Win32Constants | str | int): メッセージ
+            word_param (Optional[int], optional): Defaults to None.
+            long_param (optional): Defaults to None.
+            timeout (Optional[float]): タイムアウト秒数。None ならディスパッチャーの既定値
+
+        Raises:
+            TimeoutError: 送信先が時間内に応答しなかった場合
+
+        Returns:
+            メッセージの戻り値
+        """
+        hwnd = getattr(target, "hwnd", target)
+        msg = resolve_message(act)
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        # 送信用のワーカーが応答待ちで埋まっていても待たされないよう、既定のスレッドプールで引く
+        _, pid = await loop.run_in_executor(None, win32process.GetWindowThreadProcessId, hwnd)
+        limit = self.__limit_for(pid)
+        await limit.acquire()
+        try:
+            future = self.__executor.submit(self._send_blocking, hwnd, msg, word_param, long_param, timeout)
+        except BaseException:
+            limit.release()
+            raise
+        # 取り消された場合も、送信が実際に終わるまでセマフォを手放さない
+        future.add_done_callback(lambda _: self.__release(loop, limit))
+        return await asyncio.wrap_future(future)
+
+    @staticmethod
+    def __release(loop: asyncio.AbstractEventLoop, limit: asyncio.Semaphore) -> None:
+        try:
+            loop.call_soon_threadsafe(limit.release)
+        except RuntimeError:
+            # イベントループが既に閉じられている
+            pass
+
+    async def gather_send(
+            self,
+            targets: Iterable,
+            act,
+            *,
+            word_param: Optional[int] = None,
+            long_param=None,
+            timeout: Optional[float] = None,
+            return_exceptions: bool = True
+        ) -> list:
+        """複数のウィンドウに同じメッセージを並行して送信する
+
+        Args:
+            targets (Iterable[Window | int]): 送信先
+            act (Win32Constants | str | int): メッセージ
+            word_param (Optional[int], optional): Defaults to None.
+            long_param (optional): Defaults to None.
+            timeout (Optional[float]): 1回の送信のタイムアウト秒数
+            return_exceptions (bool): 失敗した送信の例外を結果として返すか
+
+        Returns:
+            list: 送信先の順に並んだ戻り値 (または例外)
+        """
+        return await asyncio.gather(
+            *(self.send(target, act, word_param=word_param, long_param=long_param, timeout=timeout) for target in targets),
+            return_exceptions=return_exceptions,
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        """スレッドプールを停止する
+
+        Args:
+            wait (bool): 実行中の送信の完了を待つか
+        """
+        self.__executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_default_dispatcher: Optional[MessageDispatcher] = None
+
+
+def default_dispatcher() -> MessageDispatcher:
+    """`Window.asend` などが既定で使うディスパッチャーを取得する
+
+    Returns:
+        MessageDispatcher: 共有のディスパッチャー
+    """
+    global _default_dispatcher
+    if _default_dispatcher is None:
+        _default_dispatcher = MessageDispatcher()
+    return _default_dispatcher
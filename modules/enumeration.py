@@ -0,0 +1,124 @@
+import queue
+import threading
+from typing import Callable, Iterator, Optional
+
+import win32con
+import win32gui
+
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def iter_enum(enum_function: Callable, *args, buffer_size: int = 64) -> Iterator[int]:
+    """`EnumWindows` / `EnumChildWindows` のコールバックが受け取ったハンドルを逐次 yield する
+
+    列挙は別スレッドで実行し、コールバックが発火するたびに上限付きキューを経由して呼び出し側へ渡す。
+    呼び出し側がイテレーションを途中でやめると、次のコールバックが False を返して列挙を打ち切る。
+
+    Args:
+        enum_function (Callable): `win32gui.EnumWindows` などの列挙関数
+        *args: コールバックより前に渡す引数 (`EnumChildWindows` の親ハンドルなど)
+        buffer_size (int): 列挙スレッドが先行して読み込むハンドル数の上限
+
+    Yields:
+        int: 列挙されたウィンドウハンドル
+    """
+    handles = queue.Queue(maxsize=buffer_size)
+    stop = threading.Event()
+
+    def _put(item) -> bool:
+        while not stop.is_set():
+            try:
+                handles.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _callback(hwnd, _):
+        return _put(hwnd)
+
+    def _run():
+        try:
+            enum_function(*args, _callback, None)
+        except win32gui.error as e:
+            # コールバックで列挙を打ち切ると pywin32 が例外を送出することがある
+            if not stop.is_set():
+                _put(_Failure(e))
+        except BaseException as e:
+            _put(_Failure(e))
+        _put(_DONE)
+
+    thread = threading.Thread(target=_run, name="win32-enum", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = handles.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        while True:
+            try:
+                handles.get_nowait()
+            except queue.Empty:
+                break
+        thread.join()
+
+
+def iter_child_hwnds(hwnd: int) -> Iterator[int]:
+    """直下の子ウィンドウのハンドルを z オーダー順に列挙する
+
+    `EnumChildWindows` と違い子孫全体は列挙しないため、呼び出し回数は子の数に比例する。
+
+    Args:
+        hwnd (int): ウィンドウハンドル
+
+    Yields:
+        int: 子ウィンドウのハンドル
+    """
+    child = win32gui.GetWindow(hwnd, win32con.GW_CHILD)
+    while child:
+        yield child
+        child = win32gui.GetWindow(child, win32con.GW_HWNDNEXT)
+
+
+def iter_descendant_hwnds(hwnd: int, max_depth: Optional[int] = None) -> Iterator[tuple[int, int]]:
+    """子孫ウィンドウのハンドルを `EnumChildWindows` と同じ前順で、深さを指定して列挙する
+
+    子を `GetWindow` で1段ずつたどるため、`max_depth` より深い階層には呼び出しが発生しない。
+    列挙中に破棄されたウィンドウは、その子孫ごと飛ばす。
+
+    Args:
+        hwnd (int): ウィンドウハンドル
+        max_depth (Optional[int]): 自身から数えた最大の深さ (1 なら直下の子のみ)。None なら制限なし
+
+    Yields:
+        tuple[int, int]: 子孫ウィンドウのハンドルと、自身から数えた深さ
+    """
+    def _children(parent: int) -> Iterator[int]:
+        try:
+            return iter(tuple(iter_child_hwnds(parent)))
+        except win32gui.error:
+            return iter(())
+
+    if max_depth is not None and max_depth < 1:
+        return
+    # 深い階層で再帰上限に当たらないよう、階層ごとの子の列挙をスタックに積む
+    stack = [_children(hwnd)]
+    while stack:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+            continue
+        yield child, len(stack)
+        if max_depth is None or len(stack) < max_depth:
+            stack.append(_children(child))
@@ -0,0 +1,422 @@
+"""ウィンドウイベントのストリーム
+
+イベントの発生源 (`EventSource`) と、それを受け取って利用者に届ける `WindowEventStream` からなる。
+Windows では `WinEventHookSource` が WinEvent フックから、テストやオフライン環境では
+`SimulatedEventSource` がスクリプトからイベントを供給する。
+"""
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+
+
+class EventKind(Enum):
+    """### ウィンドウイベントの種類
+
+    値は対応する WinEvent の定数。
+
+    Values:
+        - CREATED: ウィンドウが作成された (EVENT_OBJECT_CREATE)
+        - DESTROYED: ウィンドウが破棄された (EVENT_OBJECT_DESTROY)
+        - SHOWN: ウィンドウが表示された (EVENT_OBJECT_SHOW)
+        - HIDDEN: ウィンドウが非表示になった (EVENT_OBJECT_HIDE)
+        - LOCATION_CHANGED: 位置・大きさが変わった (EVENT_OBJECT_LOCATIONCHANGE)
+        - NAME_CHANGED: タイトルが変わった (EVENT_OBJECT_NAMECHANGE)
+        - FOREGROUND: フォアグラウンドになった (EVENT_SYSTEM_FOREGROUND)
+    """
+
+    CREATED = 0x8000
+    DESTROYED = 0x8001
+    SHOWN = 0x8002
+    HIDDEN = 0x8003
+    LOCATION_CHANGED = 0x800B
+    NAME_CHANGED = 0x800C
+    FOREGROUND = 0x0003
+
+
+class WindowEvent(NamedTuple):
+    """ウィンドウイベント1件
+
+    Attributes:
+        kind (EventKind): イベントの種類
+        hwnd (int): ウィンドウハンドル
+        timestamp (float): 発生時刻 (`time.monotonic` 基準の秒)
+    """
+    kind: EventKind
+    hwnd: int
+    timestamp: float
+
+
+class EventSource:
+    """イベントの発生源の基底クラス
+
+    購読者が1つ以上いる間だけ `_start` でイベントの取得を開始し、最後の購読者が外れたら `_stop` で停止する。
+    サブクラスは取得したイベントを `_emit` で購読者に配る。
+    """
+
+    def __init__(self):
+        self.__listeners: list[Callable[[WindowEvent], None]] = []
+        self.__lock = threading.Lock()
+
+    def subscribe(self, listener: Callable[[WindowEvent], None]) -> None:
+        """イベントの購読を開始する
+
+        Args:
+            listener (Callable[[WindowEvent], None]): イベントを受け取る関数 (任意のスレッドから呼ばれる)
+        """
+        with self.__lock:
+            self.__listeners.append(listener)
+            if len(self.__listeners) == 1:
+                try:
+                    self._start()
+                except BaseException:
+                    # 開始できなかった購読は登録しない
+                    self.__listeners.remove(listener)
+                    raise
+
+    def unsubscribe(self, listener: Callable[[WindowEvent], None]) -> None:
+        """イベントの購読をやめる
+
+        Args:
+            listener (Callable[[WindowEvent], None]): `subscribe` に渡した関数
+        """
+        with self.__lock:
+            if listener in self.__listeners:
+                self.__listeners.remove(listener)
+                if not self.__listeners:
+                    self._stop()
+
+    def _emit(self, event: WindowEvent) -> None:
+        for listener in list(self.__listeners):
+            listener(event)
+
+    def _start(self) -> None:
+        pass
+
+    def _stop(self) -> None:
+        pass
+
+
+class SimulatedEventSource(EventSource):
+    """スクリプトや呼び出しでイベントを発生させる発生源
+
+    フェイクバックエンドと組み合わせて、Windows 以外でイベント駆動の処理を検証するために使う。
+
+        source = SimulatedEventSource()
+        source.play([
+            (0.1, EventKind.CREATED, lambda: fake.add_window(text="Dialog")),
+        ])
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        super().__init__()
+        self.clock = clock
+
+    def emit(self, kind: EventKind, hwnd: int) -> None:
+        """イベントを発生させる
+
+        Args:
+            kind (EventKind): イベントの種類
+            hwnd (int): ウィンドウハンドル
+        """
+        self._emit(WindowEvent(kind, hwnd, self.clock()))
+
+    def play(
+            self,
+            steps: Iterable[tuple],
+            *,
+            sleep: Callable[[float], None] = time.sleep,
+            background: bool = True
+        ) -> Optional[threading.Thread]:
+        """スクリプトに従ってイベントを発生させる
+
+        Args:
+            steps (Iterable[tuple]): (前のステップからの待ち秒数, EventKind, hwnd) の並び。
+                hwnd に関数を渡すと発生時に呼び出し、その戻り値をハンドルとする (フェイクの状態変更に使う)
+            sleep (Callable[[float], None]): 待機に使う関数
+            background (bool): 別スレッドで再生するか
+
+        Returns:
+            Optional[threading.Thread]: 再生スレッド (background が False の場合は None)
+        """
+        def _run():
+            for delay, kind, hwnd in steps:
+                if delay:
+                    sleep(delay)
+                self.emit(kind, hwnd() if callable(hwnd) else hwnd)
+
+        if not background:
+            _run()
+            return None
+        thread = threading.Thread(target=_run, name="simulated-events", daemon=True)
+        thread.start()
+        return thread
+
+
+class WinEventHookSource(EventSource):
+    """SetWinEventHook でデスクトップ全体のウィンドウイベントを受け取る発生源 (Windows 専用)
+
+    専用スレッドでフックを登録し、そのスレッドのメッセージループでコールバックを受け取る。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.__thread: Optional[threading.Thread] = None
+        self.__thread_id: Optional[int] = None
+        self.__ready = threading.Event()
+        self.__error: Optional[BaseException] = None
+
+    def _start(self) -> None:
+        self.__ready.clear()
+        self.__error = None
+        self.__thread = threading.Thread(target=self.__run, name="win-event-hook", daemon=True)
+        self.__thread.start()
+        self.__ready.wait()
+        if self.__error is not None:
+            # フックの登録に失敗したスレッドは終了している
+            error, self.__error = self.__error, None
+            self.__thread.join()
+            self.__thread = self.__thread_id = None
+            raise error
+
+    def _stop(self) -> None:
+        import ctypes
+        WM_QUIT = 0x0012
+        if self.__thread_id is not None:
+            ctypes.windll.user32.PostThreadMessageW(self.__thread_id, WM_QUIT, 0, 0)
+        if self.__thread is not None:
+            self.__thread.join()
+        self.__thread = self.__thread_id = None
+
+    def __run(self) -> None:
+        hooks = []
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            user32 = ctypes.windll.user32
+            WINEVENT_OUTOFCONTEXT = 0x0000
+            OBJID_WINDOW = 0
+            CHILDID_SELF = 0
+            kinds = {kind.value: kind for kind in EventKind}
+
+            @ctypes.WINFUNCTYPE(
+                None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND, wintypes.LONG, wintypes.LONG,
+                wintypes.DWORD, wintypes.DWORD,
+            )
+            def _callback(hook, event, hwnd, id_object, id_child, thread, event_time):
+                if hwnd and id_object == OBJID_WINDOW and id_child == CHILDID_SELF and event in kinds:
+                    self._emit(WindowEvent(kinds[event], hwnd, time.monotonic()))
+
+            for first, last in (
+                (EventKind.FOREGROUND.value, EventKind.FOREGROUND.value),
+                (EventKind.CREATED.value, EventKind.NAME_CHANGED.value),
+            ):
+                hook = user32.SetWinEventHook(first, last, 0, _callback, 0, 0, WINEVENT_OUTOFCONTEXT)
+                if not hook:
+                    raise ctypes.WinError()
+                hooks.append(hook)
+            self.__thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        except BaseException as e:
+            # 呼び出し元 (_start) で送出する
+            self.__error = e
+            for hook in hooks:
+                user32.UnhookWinEvent(hook)
+            return
+        finally:
+            # 失敗した場合も待機している _start を起こす
+            self.__ready.set()
+
+        msg = wintypes.MSG()
+        try:
+            while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            for hook in hooks:
+                user32.UnhookWinEvent(hook)
+
+
+class WindowEventStream:
+    """ウィンドウイベントを順に受け取るストリーム
+
+    短時間に大量に発生する `LOCATION_CHANGED` は、ウィンドウごとに `debounce` 秒の間新しいイベントが来なくなるまで
+    保留し、最後の1件にまとめて届ける。ストリーム1つにつき利用者は1つを想定しており、
+    複数の利用者がいる場合は同じ発生源からストリームをそれぞれ作る。
+
+        with WindowEventStream(source) as stream:
+            for event in stream:
+                ...
+    """
+
+    def __init__(
+            self,
+            source: Optional[EventSource] = None,
+            *,
+            debounce: float = 0.05,
+            clock: Callable[[], float] = time.monotonic
+        ):
+        """
+        Args:
+            source (Optional[EventSource]): イベントの発生源。None なら `WinEventHookSource`
+            debounce (float): `LOCATION_CHANGED` をまとめる秒数
+            clock (Callable[[], float]): 現在時刻 (秒) を返す関数
+        """
+        self.source = source if source is not None else WinEventHookSource()
+        self.debounce = debounce
+        self.clock = clock
+        self.__events: deque[WindowEvent] = deque()
+        self.__pending_locations: dict[int, tuple[WindowEvent, float]] = {}
+        self.__condition = threading.Condition()
+        self.__open = False
+
+    def __enter__(self) -> "WindowEventStream":
+        self.open()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @property
+    def is_open(self) -> bool:
+        """発生源を購読しているか
+
+        Returns:
+            bool: 購読しているか
+        """
+        return self.__open
+
+    def open(self) -> None:
+        """発生源の購読を開始する"""
+        if not self.__open:
+            self.source.subscribe(self._push)
+            self.__open = True
+
+    def close(self) -> None:
+        """発生源の購読をやめる"""
+        if self.__open:
+            self.__open = False
+            self.source.unsubscribe(self._push)
+            with self.__condition:
+                self.__condition.notify_all()
+
+    def _push(self, event: WindowEvent) -> None:
+        with self.__condition:
+            if event.kind is EventKind.LOCATION_CHANGED and self.debounce > 0:
+                self.__pending_locations[event.hwnd] = (event, self.clock() + self.debounce)
+            else:
+                if event.kind is EventKind.DESTROYED:
+                    self.__pending_locations.pop(event.hwnd, None)
+                self.__events.append(event)
+            self.__condition.notify_all()
+
+    def __release_due_locations(self) -> Optional[float]:
+        # 期限の来た位置変更を配送キューへ移し、次の期限を返す
+        now = self.clock()
+        next_deadline = None
+        for hwnd, (event, deadline) in list(self.__pending_locations.items()):
+            if deadline <= now:
+                del self.__pending_locations[hwnd]
+                self.__events.append(event)
+            elif next_deadline is None or deadline < next_deadline:
+                next_deadline = deadline
+        return next_deadline
+
+    def get(self, timeout: Optional[float] = None) -> Optional[WindowEvent]:
+        """次のイベントを取得する
+
+        Args:
+            timeout (Optional[float]): 待機する最大秒数。None なら無期限
+
+        Returns:
+            Optional[WindowEvent]: イベント。タイムアウトまたはストリームが閉じられた場合は None
+        """
+        return self.__get(timeout)
+
+    def __get(
+            self,
+            timeout: Optional[float],
+            cancelled: Optional[threading.Event] = None,
+            taken: Optional[list] = None
+        ) -> Optional[WindowEvent]:
+        # cancelled がセットされたら取り出さずに戻る。取り出したイベントは taken に残し、取り消し側で戻せるようにする
+        deadline = None if timeout is None else self.clock() + timeout
+        with self.__condition:
+            while True:
+                if cancelled is not None and cancelled.is_set():
+                    return None
+                next_location = self.__release_due_locations()
+                if self.__events:
+                    event = self.__events.popleft()
+                    if taken is not None:
+                        taken.append(event)
+                    return event
+                if not self.__open:
+                    return None
+                now = self.clock()
+                if deadline is not None and now >= deadline:
+                    return None
+                waits = [t - now for t in (deadline, next_location) if t is not None]
+                self.__condition.wait(min(waits) if waits else None)
+
+    def __iter__(self) -> Iterator[WindowEvent]:
+        while True:
+            event = self.get()
+            if event is None:
+                return
+            yield event
+
+    async def aget(self, timeout: Optional[float] = None) -> Optional[WindowEvent]:
+        """次のイベントを asyncio のイベントループを塞がずに取得する
+
+        取り消された場合は待機しているスレッドをすぐに起こして終了させ、取り出し済みのイベントはキューの先頭に戻す。
+
+        Args:
+            timeout (Optional[float]): 待機する最大秒数。None なら無期限
+
+        Returns:
+            Optional[WindowEvent]: イベント。タイムアウトまたはストリームが閉じられた場合は None
+        """
+        import asyncio
+        cancelled = threading.Event()
+        taken: list[WindowEvent] = []
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, self.__get, timeout, cancelled, taken)
+        except asyncio.CancelledError:
+            with self.__condition:
+                cancelled.set()
+                if taken:
+                    self.__events.appendleft(taken.pop())
+                self.__condition.notify_all()
+            raise
+
+    async def __aiter__(self):
+        while True:
+            event = await self.aget()
+            if event is None:
+                return
+            yield event
+
+    def wait_for(
+            self,
+            predicate: Callable[[WindowEvent], bool],
+            timeout: Optional[float] = None
+        ) -> Optional[WindowEvent]:
+        """条件を満たすイベントが届くまで待つ
+
+        Args:
+            predicate (Callable[[WindowEvent], bool]): イベントに対する条件
+            timeout (Optional[float]): 待機する最大秒数。None なら無期限
+
+        Returns:
+            Optional[WindowEvent]: 条件を満たしたイベント。タイムアウトした場合は None
+        """
+        deadline = None if timeout is None else self.clock() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - self.clock())
+            event = self.get(remaining)
+            if event is None:
+                return None
+            if predicate(event):
+                return event
@@ -0,0 +1,264 @@
+"""ウィンドウ階層の書き出しと読み込み
+
+階層を1行1ウィンドウの NDJSON (gzip 可) または Parquet に逐次書き出す。全体をメモリに載せないため、
+デスクトップ全体でも使用メモリはトップレベルウィンドウ1つ分の列挙結果程度に収まる。
+書き出したファイルは Win32 のない環境でも `load_tree` で読み込み、`WindowTree` として参照できる。
+
+    Desktop().export("inventory.ndjson.gz")
+    tree = load_tree("inventory.ndjson.gz")
+"""
+import gzip
+import json
+import os
+from typing import IO, Iterable, Iterator, Optional, Union
+
+try:
+    import win32gui
+except ImportError:
+    # 読み込みだけなら Win32 は不要
+    win32gui = None
+
+from .snapshot import WindowTree, _read_attributes
+
+
+FIELDS = ("hwnd", "parent_hwnd", "depth", "text", "class_name", "rect", "client_rect", "is_visible", "is_iconic")
+"""1行に書き出すフィールド"""
+
+Target = Union[str, os.PathLike, IO]
+
+
+def iter_rows(roots: Iterable[int]) -> Iterator[dict]:
+    """ルートごとに階層を列挙し、1ウィンドウずつ行を生成する
+
+    Args:
+        roots (Iterable[int]): 列挙のルートとするウィンドウハンドル
+
+    Yields:
+        dict: `FIELDS` をキーとする行 (ルートごとに前順。取得中に破棄されたウィンドウとその子孫は含まない)
+    """
+    for root in roots:
+        hwnds = []
+        try:
+            win32gui.EnumChildWindows(root, lambda child, hwnds: hwnds.append(child), hwnds)
+        except win32gui.error:
+            # 列挙前に破棄された (ルートの属性も読めないため下で除かれる)
+            pass
+        depths = {root: 0}
+        # 列挙後に破棄され属性を読めなかったウィンドウ。その子孫も書き出さない
+        dead = set()
+        for hwnd in [root] + hwnds:
+            try:
+                parent, text, class_name, rect, client_rect, is_visible, is_iconic = _read_attributes(hwnd)
+            except win32gui.error:
+                dead.add(hwnd)
+                if hwnd == root:
+                    break
+                continue
+            if parent in dead:
+                # 前順に並んでいるため、破棄された親は子より先に判定済み
+                dead.add(hwnd)
+                continue
+            # 親がたどれない場合 (列挙中に破棄された等) はルートの直下として扱う
+            depth = 0 if hwnd == root else depths.get(parent, 0) + 1
+            depths[hwnd] = depth
+            yield {
+                "hwnd": hwnd,
+                "parent_hwnd": parent,
+                "depth": depth,
+                "text": text,
+                "class_name": class_name,
+                "rect": rect,
+                "client_rect": client_rect,
+                "is_visible": is_visible,
+                "is_iconic": is_iconic,
+            }
+
+
+def _detect_format(target: Target, format: Optional[str]) -> str:
+    if format is not None:
+        return format
+    name = os.fspath(target) if isinstance(target, (str, os.PathLike)) else getattr(target, "name", "")
+    return "parquet" if str(name).endswith(".parquet") else "ndjson"
+
+
+def _open_text(target: Target, mode: str, compress: Optional[bool]):
+    path = os.fspath(target)
+    if compress is None:
+        compress = str(path).endswith(".gz")
+    if compress:
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="\n")
+    return open(path, mode, encoding="utf-8", newline="\n")
+
+
+def write_ndjson(rows: Iterable[dict], target: Target, *, compress: Optional[bool] = None) -> int:
+    """行を NDJSON として逐次書き出す
+
+    Args:
+        rows (Iterable[dict]): 書き出す行
+        target (str | os.PathLike | IO): 書き出し先のパス、またはテキストファイルオブジェクト
+        compress (Optional[bool]): gzip 圧縮するか。None ならパスが `.gz` で終わるかで決める
+
+    Returns:
+        int: 書き出した行数
+    """
+    if not isinstance(target, (str, os.PathLike)):
+        count = 0
+        for row in rows:
+            target.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += 1
+        return count
+    with _open_text(target, "w", compress) as file:
+        return write_ndjson(rows, file)
+
+
+def _parquet_schema():
+    import pyarrow as pa
+    rect = pa.list_(pa.int32(), 4)
+    return pa.schema([
+        ("hwnd", pa.int64()),
+        ("parent_hwnd", pa.int64()),
+        ("depth", pa.int32()),
+        ("text", pa.string()),
+        ("class_name", pa.string()),
+        ("rect", rect),
+        ("client_rect", rect),
+        ("is_visible", pa.bool_()),
+        ("is_iconic", pa.bool_()),
+    ])
+
+
+def write_parquet(rows: Iterable[dict], target: Target, *, batch_size: int = 10000) -> int:
+    """行を Parquet として `batch_size` 行ずつ書き出す (pyarrow が必要)
+
+    Args:
+        rows (Iterable[dict]): 書き出す行
+        target (str | os.PathLike | IO): 書き出し先のパス、またはバイナリファイルオブジェクト
+        batch_size (int): 1つの行グループにまとめる行数
+
+    Returns:
+        int: 書き出した行数
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema()
+    count = 0
+    batch = []
+    with pq.ParquetWriter(target, schema) as writer:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+
+def export_windows(
+        roots: Iterable[int],
+        target: Target,
+        *,
+        format: Optional[str] = None,
+        compress: Optional[bool] = None,
+        batch_size: int = 10000
+    ) -> int:
+    """ルート以下の階層を書き出す
+
+    Args:
+        roots (Iterable[int]): 列挙のルートとするウィンドウハンドル
+        target (str | os.PathLike | IO): 書き出し先
+        format (Optional[str]): "ndjson" または "parquet"。None なら拡張子で決める (既定は NDJSON)
+        compress (Optional[bool]): NDJSON を gzip 圧縮するか。None ならパスが `.gz` で終わるかで決める
+        batch_size (int): Parquet の1つの行グループにまとめる行数
+
+    Returns:
+        int: 書き出した行数
+    """
+    rows = iter_rows(roots)
+    if _detect_format(target, format) == "parquet":
+        return write_parquet(rows, target, batch_size=batch_size)
+    return write_ndjson(rows, target, compress=compress)
+
+
+def iter_ndjson(source: Target, *, compress: Optional[bool] = None) -> Iterator[dict]:
+    """NDJSON を1行ずつ読み込む
+
+    Args:
+        source (str | os.PathLike | IO): 読み込むパス、またはテキストファイルオブジェクト
+        compress (Optional[bool]): gzip 圧縮されているか。None ならパスが `.gz` で終わるかで決める
+
+    Yields:
+        dict: 行
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+        return
+    with _open_text(source, "r", compress) as file:
+        yield from iter_ndjson(file)
+
+
+def iter_parquet(source: Target, *, batch_size: int = 10000) -> Iterator[dict]:
+    """Parquet を行グループごとに読み込む (pyarrow が必要)
+
+    Args:
+        source (str | os.PathLike | IO): 読み込むパス、またはバイナリファイルオブジェクト
+        batch_size (int): 1度に読み込む行数
+
+    Yields:
+        dict: 行
+    """
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(source).iter_batches(batch_size=batch_size):
+        yield from batch.to_pylist()
+
+
+def load_tree(source: Target, *, format: Optional[str] = None, compress: Optional[bool] = None) -> WindowTree:
+    """書き出した階層を読み込み、読み取り専用のツリーを組み立てる
+
+    Win32 のない環境でも使える。深さ0の行をルートとし、それ以外の行は `parent_hwnd` の子としてファイル順に並べる。
+
+    Args:
+        source (str | os.PathLike | IO): 読み込むパス、またはファイルオブジェクト
+        format (Optional[str]): "ndjson" または "parquet"。None なら拡張子で決める
+        compress (Optional[bool]): NDJSON が gzip 圧縮されているか。None ならパスが `.gz` で終わるかで決める
+
+    Raises:
+        ValueError: 深さ0の行より前に、親の行がない行が現れた場合
+
+    Returns:
+        WindowTree: 読み込んだツリー (行がなければ空のツリー)
+    """
+    if _detect_format(source, format) == "parquet":
+        rows = iter_parquet(source)
+    else:
+        rows = iter_ndjson(source, compress=compress)
+    roots = []
+    records = {}
+    links: dict[int, list[int]] = {}
+    for row in rows:
+        hwnd = row["hwnd"]
+        records[hwnd] = (
+            row["parent_hwnd"],
+            row["text"],
+            row["class_name"],
+            tuple(row["rect"]),
+            tuple(row["client_rect"]),
+            row["is_visible"],
+            row["is_iconic"],
+        )
+        if row["depth"] == 0:
+            roots.append(hwnd)
+            continue
+        parent = row["parent_hwnd"]
+        if parent not in records:
+            # 親の行がない場合は直前のルートにぶら下げる
+            if not roots:
+                raise ValueError(f"row for hwnd {hwnd} has no parent row and no preceding root (depth 0) row")
+            parent = roots[-1]
+        links.setdefault(parent, []).append(hwnd)
+    return WindowTree(roots, records, links)
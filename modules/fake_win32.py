@@ -0,0 +1,570 @@
+"""win32gui / win32process / win32con のインメモリ代替実装
+
+Windows 以外の環境(Linux の CI など)で `Window` / `Desktop` を動かすためのフェイクバックエンド。
+`install()` を呼ぶと `sys.modules` にフェイクモジュールが登録され、以降の `import win32gui` が
+ここで定義した `FakeDesktop` を参照するようになる。
+
+    from modules import fake_win32
+    desktop = fake_win32.install()
+    app = desktop.add_window(text="Notepad", class_name="Notepad", rect=(0, 0, 800, 600))
+
+    from modules.window import Window  # install() より後に import する
+"""
+import sys
+import threading
+import time
+import types
+import heapq
+from collections import Counter
+from typing import Callable, Optional
+
+
+WIN32CON_CONSTANTS = {
+    "WM_SETTEXT": 0x000C,
+    "WM_GETTEXT": 0x000D,
+    "WM_GETTEXTLENGTH": 0x000E,
+    "WM_CLOSE": 0x0010,
+    "WM_KEYDOWN": 0x0100,
+    "WM_KEYUP": 0x0101,
+    "WM_CHAR": 0x0102,
+    "WM_COMMAND": 0x0111,
+    "WM_LBUTTONDOWN": 0x0201,
+    "WM_LBUTTONUP": 0x0202,
+    "WM_RBUTTONDOWN": 0x0204,
+    "WM_RBUTTONUP": 0x0205,
+    "BM_CLICK": 0x00F5,
+    "SW_HIDE": 0,
+    "SW_SHOWNORMAL": 1,
+    "SW_NORMAL": 1,
+    "SW_SHOWMINIMIZED": 2,
+    "SW_MAXIMIZE": 3,
+    "SW_SHOWMAXIMIZED": 3,
+    "SW_SHOW": 5,
+    "SW_MINIMIZE": 6,
+    "SW_RESTORE": 9,
+    "GW_HWNDNEXT": 2,
+    "GW_CHILD": 5,
+    "GA_PARENT": 1,
+    "GA_ROOT": 2,
+    "SMTO_NORMAL": 0x0000,
+    "SMTO_BLOCK": 0x0001,
+    "SMTO_ABORTIFHUNG": 0x0002,
+}
+"""フェイク win32con に載せる定数 (実際の win32con の一部)"""
+
+DESKTOP_HWND = 0x0010
+"""`GetDesktopWindow` が返すデスクトップウィンドウのハンドル (フェイクのウィンドウには割り当てない)"""
+
+SYNTHETIC_CLASS_NAMES = ("Button", "Edit", "Static", "ComboBox", "ListBox", "SysListView32")
+"""合成ツリーで子ウィンドウに割り当てるクラス名"""
+
+
+class FakeWin32Error(Exception):
+    """pywintypes.error の代替
+
+    Attributes:
+        winerror (int): エラーコード
+        funcname (str): 失敗した API 名
+        strerror (str): エラーメッセージ
+    """
+
+    def __init__(self, winerror: int, funcname: str, strerror: str):
+        super().__init__(winerror, funcname, strerror)
+        self.winerror = winerror
+        self.funcname = funcname
+        self.strerror = strerror
+
+
+class FakeWindow:
+    """フェイクデスクトップ上のウィンドウ1つ分の状態"""
+
+    def __init__(
+            self,
+            hwnd: int,
+            parent: int,
+            text: str,
+            class_name: str,
+            rect: tuple,
+            visible: bool,
+            iconic: bool,
+            pid: int
+        ):
+        self.hwnd = hwnd
+        self.parent = parent
+        self.text = text
+        self.class_name = class_name
+        self.rect = tuple(rect)
+        self.visible = visible
+        self.iconic = iconic
+        self.pid = pid
+        self.children: list[int] = []
+
+
+class FakeClock:
+    """手動で進める時計
+
+    `clock` / `sleep` 引数を取るクラスに渡すと、実時間を待たずに時間経過を再現できる。
+
+        clock = FakeClock()
+        poller = WindowPoller(clock=clock, sleep=clock.sleep)
+    """
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+        self.slept = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        """待つ代わりに時計を進める
+
+        Args:
+            seconds (float): 進める秒数
+        """
+        self.now += max(0.0, seconds)
+        self.slept += max(0.0, seconds)
+
+
+class FakeDesktop:
+    """win32gui の関数群をインメモリのウィンドウツリーで実装したもの
+
+    API 呼び出しごとに `calls` にカウントが積まれるので、ベンチマークでシステムコール数の比較に使える。
+    子ウィンドウのリストは z オーダー順 (先頭が最前面) で保持する。
+    """
+
+    def __init__(self):
+        self.windows: dict[int, FakeWindow] = {}
+        self.top_level: list[int] = []
+        self.foreground: int = 0
+        self.focus: int = 0
+        self.calls: Counter = Counter()
+        self.messages: list[tuple] = []
+        self.logger = None
+        self.delays: dict[int, float] = {}
+        self.hung: dict[int, threading.Event] = {}
+        self.enumerations: int = 0
+        self._deferred: list[tuple[int, int, Callable[[], object]]] = []
+        self._next_hwnd = 0x10000
+
+    @property
+    def call_count(self) -> int:
+        """これまでに呼ばれた API の総数"""
+        return sum(self.calls.values())
+
+    def reset_calls(self) -> None:
+        """API 呼び出しカウンタをリセットする"""
+        self.calls.clear()
+
+    def add_window(
+            self,
+            parent: Optional[int] = None,
+            *,
+            text: str = "",
+            class_name: str = "Static",
+            rect: tuple = (0, 0, 100, 100),
+            visible: bool = True,
+            iconic: bool = False,
+            pid: Optional[int] = None,
+            hwnd: Optional[int] = None
+        ) -> int:
+        """ウィンドウを追加する
+
+        Args:
+            parent (Optional[int]): 親ウィンドウのハンドル。None ならトップレベル
+            text (str): ウィンドウタイトル
+            class_name (str): ウィンドウクラス名
+            rect (tuple): スクリーン座標の (left, top, right, bottom)
+            visible (bool): 表示フラグ
+            iconic (bool): 最小化フラグ
+            pid (Optional[int]): プロセスID。None なら親から引き継ぐ
+            hwnd (Optional[int]): 明示的に割り当てるハンドル
+
+        Returns:
+            int: 追加したウィンドウのハンドル
+        """
+        if hwnd is None:
+            hwnd = self._next_hwnd
+        self._next_hwnd = max(self._next_hwnd, hwnd) + 1
+        if pid is None:
+            pid = self.windows[parent].pid if parent else 1000 + len(self.top_level)
+        self.windows[hwnd] = FakeWindow(hwnd, parent or 0, text, class_name, rect, visible, iconic, pid)
+        if parent:
+            self.windows[parent].children.append(hwnd)
+        else:
+            self.top_level.append(hwnd)
+        return hwnd
+
+    def remove_window(self, hwnd: int) -> None:
+        """ウィンドウを子孫ごと破棄する
+
+        Args:
+            hwnd (int): 破棄するウィンドウのハンドル
+        """
+        window = self.windows.pop(hwnd, None)
+        if window is None:
+            return
+        for child in list(window.children):
+            self.remove_window(child)
+        siblings = self.windows[window.parent].children if window.parent in self.windows else self.top_level
+        if hwnd in siblings:
+            siblings.remove(hwnd)
+
+    def add_synthetic_tree(
+            self,
+            parent: Optional[int] = None,
+            *,
+            depth: int = 3,
+            breadth: int = 5,
+            text: str = "Synthetic",
+            rect: tuple = (0, 0, 1600, 1200),
+            pid: Optional[int] = None
+        ) -> int:
+        """合成ウィンドウツリーを追加する
+
+        各ノードの子は親の矩形を格子状に分割した位置に配置される。
+
+        Args:
+            parent (Optional[int]): ツリーを追加する親。None ならトップレベルとして追加
+            depth (int): ルートを除く階層数
+            breadth (int): 1ノードあたりの子の数
+            text (str): ルートウィンドウのタイトル
+            rect (tuple): ルートウィンドウの矩形
+            pid (Optional[int]): プロセスID
+
+        Returns:
+            int: ルートウィンドウのハンドル
+        """
+        root = self.add_window(parent, text=text, class_name="SyntheticApp", rect=rect, pid=pid)
+        self._add_synthetic_children(root, depth, breadth)
+        return root
+
+    def _add_synthetic_children(self, parent: int, depth: int, breadth: int) -> None:
+        if depth <= 0:
+            return
+        x1, y1, x2, y2 = self.windows[parent].rect
+        columns = max(1, int(breadth ** 0.5 + 0.5))
+        rows = (breadth + columns - 1) // columns
+        cell_w = max(1, (x2 - x1) // columns)
+        cell_h = max(1, (y2 - y1) // rows)
+        for i in range(breadth):
+            cx = x1 + (i % columns) * cell_w
+            cy = y1 + (i // columns) * cell_h
+            class_name = SYNTHETIC_CLASS_NAMES[(depth + i) % len(SYNTHETIC_CLASS_NAMES)]
+            child = self.add_window(
+                parent,
+                text=f"{class_name}{i}",
+                class_name=class_name,
+                rect=(cx + 1, cy + 1, cx + cell_w - 1, cy + cell_h - 1),
+            )
+            self._add_synthetic_children(child, depth - 1, breadth)
+
+    def after_enumerations(self, count: int, action: Callable[[], object]) -> None:
+        """トップレベルの列挙が指定回数行われた時点で処理を実行する
+
+        ポーリングの検証で「N 回目の列挙で初めて見えるウィンドウ」を作るのに使う。
+
+            desktop.after_enumerations(3, lambda: desktop.add_window(text="Dialog"))
+
+        Args:
+            count (int): 何回後の EnumWindows の直前で実行するか (1 なら次回)
+            action (Callable[[], object]): 実行する処理
+        """
+        heapq.heappush(self._deferred, (self.enumerations + count, len(self._deferred), action))
+
+    def set_delay(self, hwnd: int, seconds: float) -> None:
+        """ウィンドウへの SendMessage が応答するまでの時間を設定する
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+            seconds (float): 応答までの秒数
+        """
+        self.delays[hwnd] = seconds
+
+    def hang(self, hwnd: int) -> None:
+        """ウィンドウを応答なし状態にする。`unhang` を呼ぶまで SendMessage が戻らない
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+        """
+        self.hung.setdefault(hwnd, threading.Event())
+
+    def unhang(self, hwnd: int) -> None:
+        """応答なし状態を解除し、待たされている SendMessage を戻す
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+        """
+        event = self.hung.pop(hwnd, None)
+        if event is not None:
+            event.set()
+
+    def _wait_response(self, hwnd: int, timeout: Optional[float] = None) -> bool:
+        # 応答までの待ち時間を再現する。timeout 内に応答しなければ False
+        hung = self.hung.get(hwnd)
+        if hung is not None:
+            return hung.wait(timeout)
+        delay = self.delays.get(hwnd, 0.0)
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            return False
+        if delay:
+            time.sleep(delay)
+        return True
+
+    def _iter_descendants(self, hwnd: int):
+        for child in list(self.windows[hwnd].children):
+            if child in self.windows:
+                yield child
+                yield from self._iter_descendants(child)
+
+    def _get(self, hwnd: int, funcname: str) -> FakeWindow:
+        window = self.windows.get(hwnd)
+        if window is None:
+            raise FakeWin32Error(1400, funcname, "無効なウィンドウ ハンドルです。")
+        return window
+
+    # --- win32gui ---
+
+    def set_logger(self, logger) -> None:
+        self.logger = logger
+
+    def EnumWindows(self, callback, extra) -> None:
+        self.calls["EnumWindows"] += 1
+        self.enumerations += 1
+        while self._deferred and self._deferred[0][0] <= self.enumerations:
+            heapq.heappop(self._deferred)[2]()
+        for hwnd in list(self.top_level):
+            result = callback(hwnd, extra)
+            if result is not None and not result:
+                return
+
+    def EnumChildWindows(self, hwnd, callback, extra) -> None:
+        self.calls["EnumChildWindows"] += 1
+        parent = self.windows.get(hwnd)
+        if parent is None:
+            return
+        for child in list(self._iter_descendants(hwnd)):
+            result = callback(child, extra)
+            if result is not None and not result:
+                return
+
+    def GetWindowText(self, hwnd) -> str:
+        self.calls["GetWindowText"] += 1
+        window = self.windows.get(hwnd)
+        return window.text if window else ""
+
+    def GetClassName(self, hwnd) -> str:
+        self.calls["GetClassName"] += 1
+        return self._get(hwnd, "GetClassName").class_name
+
+    def GetWindowRect(self, hwnd) -> tuple:
+        self.calls["GetWindowRect"] += 1
+        return self._get(hwnd, "GetWindowRect").rect
+
+    def GetClientRect(self, hwnd) -> tuple:
+        self.calls["GetClientRect"] += 1
+        x1, y1, x2, y2 = self._get(hwnd, "GetClientRect").rect
+        return (0, 0, x2 - x1, y2 - y1)
+
+    def IsIconic(self, hwnd) -> int:
+        self.calls["IsIconic"] += 1
+        window = self.windows.get(hwnd)
+        return int(bool(window and window.iconic))
+
+    def IsWindowVisible(self, hwnd) -> int:
+        self.calls["IsWindowVisible"] += 1
+        window = self.windows.get(hwnd)
+        return int(bool(window and window.visible))
+
+    def IsWindow(self, hwnd) -> int:
+        self.calls["IsWindow"] += 1
+        return int(hwnd in self.windows)
+
+    def GetParent(self, hwnd) -> int:
+        self.calls["GetParent"] += 1
+        window = self.windows.get(hwnd)
+        return window.parent if window else 0
+
+    def GetAncestor(self, hwnd, flags) -> int:
+        self.calls["GetAncestor"] += 1
+        window = self.windows.get(hwnd)
+        if window is None:
+            return 0
+        if flags == WIN32CON_CONSTANTS["GA_PARENT"]:
+            return window.parent or DESKTOP_HWND
+        if flags == WIN32CON_CONSTANTS["GA_ROOT"]:
+            while window.parent:
+                hwnd, window = window.parent, self.windows[window.parent]
+            return hwnd
+        raise FakeWin32Error(87, "GetAncestor", "パラメーターが間違っています。")
+
+    def GetDesktopWindow(self) -> int:
+        self.calls["GetDesktopWindow"] += 1
+        return DESKTOP_HWND
+
+    def GetWindow(self, hwnd, command) -> int:
+        self.calls["GetWindow"] += 1
+        window = self._get(hwnd, "GetWindow")
+        if command == WIN32CON_CONSTANTS["GW_CHILD"]:
+            return window.children[0] if window.children else 0
+        if command == WIN32CON_CONSTANTS["GW_HWNDNEXT"]:
+            siblings = self.windows[window.parent].children if window.parent in self.windows else self.top_level
+            position = siblings.index(hwnd) + 1
+            return siblings[position] if position < len(siblings) else 0
+        raise FakeWin32Error(87, "GetWindow", "パラメーターが間違っています。")
+
+    def GetForegroundWindow(self) -> int:
+        self.calls["GetForegroundWindow"] += 1
+        return self.foreground
+
+    def SetForegroundWindow(self, hwnd) -> None:
+        self.calls["SetForegroundWindow"] += 1
+        self._get(hwnd, "SetForegroundWindow")
+        self.foreground = hwnd
+
+    def SetFocus(self, hwnd) -> None:
+        self.calls["SetFocus"] += 1
+        self._get(hwnd, "SetFocus")
+        self.focus = hwnd
+
+    def SetWindowText(self, hwnd, text) -> None:
+        self.calls["SetWindowText"] += 1
+        self._get(hwnd, "SetWindowText").text = text
+
+    def SetWindowPos(self, hwnd, insert_after, x, y, w, h, flags) -> None:
+        self.calls["SetWindowPos"] += 1
+        window = self._get(hwnd, "SetWindowPos")
+        x1, y1, x2, y2 = window.rect
+        if not flags & 0x0002:  # SWP_NOMOVE
+            x2, y2 = x2 - x1 + x, y2 - y1 + y
+            x1, y1 = x, y
+        if not flags & 0x0001:  # SWP_NOSIZE
+            x2, y2 = x1 + w, y1 + h
+        window.rect = (x1, y1, x2, y2)
+        if flags & 0x0040:  # SWP_SHOWWINDOW
+            window.visible = True
+        if flags & 0x0080:  # SWP_HIDEWINDOW
+            window.visible = False
+
+    def ShowWindow(self, hwnd, cmd) -> int:
+        self.calls["ShowWindow"] += 1
+        window = self._get(hwnd, "ShowWindow")
+        was_visible = window.visible
+        window.visible = cmd != 0
+        window.iconic = cmd in (2, 6, 7)
+        return int(was_visible)
+
+    def WindowFromPoint(self, point) -> int:
+        self.calls["WindowFromPoint"] += 1
+        x, y = point
+        candidates = self.top_level
+        found = 0
+        while True:
+            for hwnd in candidates:
+                window = self.windows[hwnd]
+                x1, y1, x2, y2 = window.rect
+                if window.visible and x1 <= x < x2 and y1 <= y < y2:
+                    found = hwnd
+                    candidates = window.children
+                    break
+            else:
+                return found
+
+    def SendMessage(self, hwnd, msg, wparam=None, lparam=None) -> int:
+        self.calls["SendMessage"] += 1
+        self._get(hwnd, "SendMessage")
+        self._wait_response(hwnd)
+        return self._dispatch(hwnd, msg, wparam, lparam)
+
+    def SendMessageTimeout(self, hwnd, msg, wparam, lparam, flags, timeout) -> tuple:
+        self.calls["SendMessageTimeout"] += 1
+        self._get(hwnd, "SendMessageTimeout")
+        if flags & WIN32CON_CONSTANTS["SMTO_ABORTIFHUNG"] and hwnd in self.hung:
+            raise FakeWin32Error(0, "SendMessageTimeout", "応答なしのため中断しました。")
+        if not self._wait_response(hwnd, timeout / 1000):
+            raise FakeWin32Error(1460, "SendMessageTimeout", "タイムアウト期間が経過したため、この操作は終了しました。")
+        return (1, self._dispatch(hwnd, msg, wparam, lparam))
+
+    def _dispatch(self, hwnd, msg, wparam, lparam) -> int:
+        window = self._get(hwnd, "SendMessage")
+        self.messages.append(("send", hwnd, msg, wparam, lparam))
+        if msg == WIN32CON_CONSTANTS["WM_SETTEXT"]:
+            window.text = lparam
+            return 1
+        if msg == WIN32CON_CONSTANTS["WM_CLOSE"]:
+            self.remove_window(hwnd)
+        return 0
+
+    def PostMessage(self, hwnd, msg, wparam=None, lparam=None) -> int:
+        self.calls["PostMessage"] += 1
+        self._get(hwnd, "PostMessage")
+        self.messages.append(("post", hwnd, msg, wparam, lparam))
+        return 1
+
+    # --- win32process ---
+
+    def GetWindowThreadProcessId(self, hwnd) -> tuple:
+        self.calls["GetWindowThreadProcessId"] += 1
+        window = self.windows.get(hwnd)
+        if window is None:
+            return (0, 0)
+        return (window.pid + 1, window.pid)
+
+
+WIN32GUI_FUNCTIONS = (
+    "set_logger", "EnumWindows", "EnumChildWindows", "GetWindowText", "GetClassName", "GetWindowRect",
+    "GetClientRect", "IsIconic", "IsWindowVisible", "IsWindow", "GetParent", "GetAncestor", "GetDesktopWindow",
+    "GetWindow", "GetForegroundWindow",
+    "SetForegroundWindow", "SetFocus", "SetWindowText", "SetWindowPos", "ShowWindow", "WindowFromPoint",
+    "SendMessage", "SendMessageTimeout", "PostMessage",
+)
+"""フェイク win32gui モジュールに公開する関数名"""
+
+WIN32PROCESS_FUNCTIONS = ("GetWindowThreadProcessId",)
+"""フェイク win32process モジュールに公開する関数名"""
+
+_current: Optional[FakeDesktop] = None
+
+
+def current() -> FakeDesktop:
+    """フェイクモジュールが現在参照している `FakeDesktop` を返す"""
+    if _current is None:
+        raise RuntimeError("fake_win32.install() has not been called")
+    return _current
+
+
+def _make_module(name: str, functions: tuple) -> types.ModuleType:
+    module = types.ModuleType(name)
+    for function_name in functions:
+        def _dispatch(*args, __name=function_name):
+            return getattr(current(), __name)(*args)
+        _dispatch.__name__ = function_name
+        setattr(module, function_name, _dispatch)
+    module.error = FakeWin32Error
+    return module
+
+
+def install(desktop: Optional[FakeDesktop] = None) -> FakeDesktop:
+    """フェイクモジュールを `sys.modules` に登録する
+
+    既に登録済みの場合は参照先のデスクトップだけを差し替えるので、何度呼んでもよい。
+
+    Args:
+        desktop (Optional[FakeDesktop]): 使用するデスクトップ。None なら新規作成
+
+    Returns:
+        FakeDesktop: フェイクモジュールが参照するデスクトップ
+    """
+    global _current
+    _current = desktop or FakeDesktop()
+    if not getattr(sys.modules.get("win32gui"), "__fake__", False):
+        win32gui = _make_module("win32gui", WIN32GUI_FUNCTIONS)
+        win32process = _make_module("win32process", WIN32PROCESS_FUNCTIONS)
+        win32con = types.ModuleType("win32con")
+        for name, value in WIN32CON_CONSTANTS.items():
+            setattr(win32con, name, value)
+        for module in (win32gui, win32process, win32con):
+            module.__fake__ = True
+            sys.modules[module.__name__] = module
+    return _current
@@ -0,0 +1,152 @@
+import re
+from typing import Any, Iterable
+
+import win32gui
+
+
+class Prefix:
+    """前方一致のフィルター条件
+
+    `window.get_filtered_children(text=Prefix("OK"))` のように使う。
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+
+    def __call__(self, value) -> bool:
+        return isinstance(value, str) and value.startswith(self.prefix)
+
+    def __repr__(self) -> str:
+        return f"Prefix({self.prefix!r})"
+
+
+_DEAD = object()
+"""読み出し中に破棄されたウィンドウの属性値の代わりに格納する値"""
+
+
+def _hashable_key(value):
+    # rect などの list を tuple と同一視して引けるようにする
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+def _is_hashable(value) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def _matches(value, condition) -> bool:
+    if isinstance(condition, (list, set, frozenset)):
+        return value in condition
+    if isinstance(condition, re.Pattern):
+        return isinstance(value, str) and bool(condition.search(value))
+    if callable(condition):
+        return bool(condition(value))
+    return value == condition
+
+
+def _is_indexable(condition) -> bool:
+    if isinstance(condition, (list, set, frozenset)):
+        return all(_is_hashable(value) for value in condition)
+    return not isinstance(condition, re.Pattern) and not callable(condition) and _is_hashable(condition)
+
+
+class AttributeIndex:
+    """ウィンドウ一覧に対する属性インデックス
+
+    フィルターに必要な属性だけを、ウィンドウごとに高々1度ずつ読み出してキャッシュする。
+    最初の条件が完全一致・集合条件なら属性値をキーにしたハッシュインデックスで候補を引き、
+    以降の条件は残った候補についてだけ属性を読み出して判定する。
+    読み出した属性とインデックスは同じインスタンスでの以降のフィルターで使い回される。
+    属性を読み出せなかった (読み出し中に破棄された) ウィンドウは以降どの条件にも一致しない。
+
+    フィルター条件には次のものを指定できる。
+        - 値: 完全一致
+        - list / set / frozenset: いずれかに一致 (tuple は rect などの値として完全一致で扱う)
+        - `Prefix`: 文字列の前方一致
+        - `re.Pattern`: 文字列に対する `re.search`
+        - 呼び出し可能オブジェクト: 属性値を受け取り真偽値を返す述語
+    """
+
+    def __init__(self, windows: Iterable):
+        self.__windows: list = list(windows)
+        self.__values: dict[str, dict[int, Any]] = {}
+        self.__hash_indexes: dict[str, dict[Any, list[int]]] = {}
+        self.__dead: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.__windows)
+
+    def value(self, key: str, position: int):
+        """ウィンドウの属性値を取得する
+
+        Args:
+            key (str): 属性名
+            position (int): ウィンドウの位置
+
+        Returns:
+            Any: 属性値。読み出し中にウィンドウが破棄された場合は `_DEAD`
+        """
+        values = self.__values.setdefault(key, {})
+        if position not in values:
+            try:
+                values[position] = getattr(self.__windows[position], key)
+            except win32gui.error:
+                values[position] = _DEAD
+                self.__dead.add(position)
+        return values[position]
+
+    def hash_index(self, key: str) -> dict[Any, list[int]]:
+        """属性値から該当するウィンドウ位置を引くインデックスを取得する
+
+        Args:
+            key (str): 属性名
+
+        Returns:
+            dict[Any, list[int]]: 属性値 → ウィンドウ位置 (昇順) の辞書
+        """
+        if key not in self.__hash_indexes:
+            index: dict[Any, list[int]] = {}
+            for position in range(len(self.__windows)):
+                value = self.value(key, position)
+                if value is not _DEAD:
+                    index.setdefault(_hashable_key(value), []).append(position)
+            self.__hash_indexes[key] = index
+        return self.__hash_indexes[key]
+
+    def __lookup(self, key: str, condition) -> set[int]:
+        index = self.hash_index(key)
+        values = condition if isinstance(condition, (list, set, frozenset)) else [condition]
+        positions = set()
+        for value in values:
+            positions.update(index.get(_hashable_key(value), ()))
+        return positions
+
+    def __matches(self, key: str, position: int, condition) -> bool:
+        value = self.value(key, position)
+        return value is not _DEAD and _matches(value, condition)
+
+    def filter(self, **conditions) -> list:
+        """全ての条件を満たすウィンドウを取得する
+
+        Args:
+            **conditions: 属性名 → フィルター条件
+
+        Returns:
+            list: 条件を満たすウィンドウ一覧 (重複なし、元の順序を保持)
+        """
+        positions = range(len(self.__windows))
+        for i, (key, condition) in enumerate(conditions.items()):
+            if _is_indexable(condition) and (i == 0 or key in self.__hash_indexes):
+                matched = self.__lookup(key, condition)
+                positions = [position for position in positions if position in matched]
+            else:
+                positions = [position for position in positions if self.__matches(key, position, condition)]
+            if not positions:
+                return []
+        # 以前のフィルターの読み出しで破棄がわかったものも除く
+        return [self.__windows[position] for position in positions if position not in self.__dead]
@@ -0,0 +1,131 @@
+from typing import Iterable, Optional
+
+from .snapshot import WindowSnapshot, WindowTree
+
+
+class HitTestIndex:
+    """座標からウィンドウを引くための格子状の空間インデックス
+
+    `WindowTree` を1度走査して各ウィンドウの矩形を一定サイズのセルに振り分けておき、
+    座標の問い合わせではそのセルに属する候補だけを判定する。
+    多数のセルにまたがる大きなウィンドウ (トップレベルなど) はセルに振り分けず、常に判定対象とする。
+    """
+
+    def __init__(
+            self,
+            tree: WindowTree,
+            cell_size: int = 64,
+            max_cells: int = 64,
+            visible_only: bool = False,
+            snapshots: Optional[Iterable[WindowSnapshot]] = None
+        ):
+        """
+        Args:
+            tree (WindowTree): 対象とするスナップショット
+            cell_size (int): セル1辺のピクセル数
+            max_cells (int): これを超える数のセルにまたがるウィンドウは常時判定の対象とする
+            visible_only (bool): 表示されているウィンドウのみを対象にするか
+            snapshots (Optional[Iterable[WindowSnapshot]]): ツリーの一部だけを対象にする場合のウィンドウ一覧 (前順)
+        """
+        self.__tree = tree
+        self.__cell_size = cell_size
+        self.__snapshots: list[WindowSnapshot] = []
+        self.__cells: dict[tuple, list[int]] = {}
+        self.__large: list[int] = []
+
+        for snapshot in tree if snapshots is None else snapshots:
+            if visible_only and not snapshot.is_visible:
+                continue
+            index = len(self.__snapshots)
+            self.__snapshots.append(snapshot)
+            x1, y1, x2, y2 = snapshot.rect
+            if x2 < x1 or y2 < y1:
+                continue
+            cx1, cy1, cx2, cy2 = x1 // cell_size, y1 // cell_size, x2 // cell_size, y2 // cell_size
+            if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > max_cells:
+                self.__large.append(index)
+                continue
+            for cx in range(cx1, cx2 + 1):
+                for cy in range(cy1, cy2 + 1):
+                    self.__cells.setdefault((cx, cy), []).append(index)
+
+    def __len__(self) -> int:
+        return len(self.__snapshots)
+
+    @property
+    def tree(self) -> WindowTree:
+        """インデックスの元になったスナップショット
+
+        Returns:
+            WindowTree: スナップショット
+        """
+        return self.__tree
+
+    def query(self, x: int, y: int) -> list[WindowSnapshot]:
+        """座標を含むウィンドウを取得する
+
+        結果は前順 (親が子より先、兄弟間では z オーダーの前面が先) に並ぶ。
+
+        Args:
+            x (int): スクリーン座標のx
+            y (int): スクリーン座標のy
+
+        Returns:
+            list[WindowSnapshot]: 座標を含むウィンドウ一覧
+        """
+        cell = (x // self.__cell_size, y // self.__cell_size)
+        candidates = self.__cells.get(cell, [])
+        if self.__large:
+            candidates = sorted(self.__large + candidates)
+        hits = []
+        for index in candidates:
+            snapshot = self.__snapshots[index]
+            x1, y1, x2, y2 = snapshot.rect
+            if x1 <= x <= x2 and y1 <= y <= y2:
+                hits.append(snapshot)
+        return hits
+
+    def query_rect(self, x1: int, y1: int, x2: int, y2: int) -> list[WindowSnapshot]:
+        """矩形と重なるウィンドウを取得する
+
+        Args:
+            x1 (int): 矩形の左
+            y1 (int): 矩形の上
+            x2 (int): 矩形の右
+            y2 (int): 矩形の下
+
+        Returns:
+            list[WindowSnapshot]: 矩形と重なるウィンドウ一覧 (前順)
+        """
+        size = self.__cell_size
+        cx1, cy1, cx2, cy2 = int(x1 // size), int(y1 // size), int(x2 // size), int(y2 // size)
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self.__snapshots):
+            candidates = range(len(self.__snapshots))
+        else:
+            found = set(self.__large)
+            for cx in range(cx1, cx2 + 1):
+                for cy in range(cy1, cy2 + 1):
+                    found.update(self.__cells.get((cx, cy), ()))
+            candidates = sorted(found)
+        hits = []
+        for index in candidates:
+            snapshot = self.__snapshots[index]
+            rx1, ry1, rx2, ry2 = snapshot.rect
+            if rx1 <= x2 and x1 <= rx2 and ry1 <= y2 and y1 <= ry2:
+                hits.append(snapshot)
+        return hits
+
+    def deepest(self, x: int, y: int) -> Optional[WindowSnapshot]:
+        """座標を含むウィンドウのうち最も深い階層のものを取得する
+
+        Args:
+            x (int): スクリーン座標のx
+            y (int): スクリーン座標のy
+
+        Returns:
+            Optional[WindowSnapshot]: 該当するウィンドウがなければ None
+        """
+        hits = self.query(x, y)
+        if not hits:
+            return None
+        return max(hits, key=lambda snapshot: snapshot.depth)
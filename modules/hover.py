@@ -0,0 +1,252 @@
+"""ポインタ直下のウィンドウを追跡するホバー判定
+
+Tk に依存しないため、`WindowPicker` のホバーモードの判定・間引きをヘッドレスで検証できる。
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Callable, Iterable, NamedTuple, Optional
+
+from .hit_test import HitTestIndex
+from .snapshot import WindowSnapshot, WindowTree
+
+_logger = logging.getLogger(__name__)
+
+
+class HoverResult(NamedTuple):
+    """ホバー判定の結果
+
+    Attributes:
+        x (int): スクリーン座標のx
+        y (int): スクリーン座標のy
+        hits (tuple[WindowSnapshot, ...]): 座標を含むウィンドウ (前順)
+        target (Optional[WindowSnapshot]): 最も深い階層のウィンドウ (強調表示の対象)
+        reused (bool): 前回の結果を再利用したか
+    """
+    x: int
+    y: int
+    hits: tuple
+    target: Optional[WindowSnapshot]
+    reused: bool
+
+
+class HoverTracker:
+    """ポインタ直下のウィンドウをキャッシュした階層から引く
+
+    - 階層は `refresh` で取得し、`start` するとバックグラウンドで `refresh_interval` 秒ごとに取り直す
+    - `request` はポインタ位置を記録するだけで、判定は `poll` で最大 `frame_interval` 秒に1回だけ行う
+    - 前回の判定結果と同じウィンドウの組み合わせになる範囲内にポインタがある間は、前回の結果を返す
+    - `resolve` は前回の結果を更新するため1つのスレッド (UI スレッド) から呼び、他のスレッドでは `lookup` を使う
+
+        tracker = HoverTracker(lambda: desktop.snapshot(visible_only=True))
+        tracker.request(x, y)   # マウス移動のたびに
+        result = tracker.poll() # 描画フレームごとに
+    """
+
+    def __init__(
+            self,
+            capture: Callable[[], WindowTree],
+            *,
+            refresh_interval: float = 1.0,
+            frame_interval: float = 1 / 60,
+            exclude: Callable[[], Iterable[int]] = tuple,
+            clock: Callable[[], float] = time.monotonic
+        ):
+        """
+        Args:
+            capture (Callable[[], WindowTree]): 階層を取得する関数
+            refresh_interval (float): バックグラウンドで階層を取り直す間隔 (秒)
+            frame_interval (float): 判定の最小間隔 (秒)
+            exclude (Callable[[], Iterable[int]]): 判定から除くトップレベルウィンドウ (ピッカー自身など) を返す関数
+            clock (Callable[[], float]): 現在時刻 (秒) を返す関数
+        """
+        self.capture = capture
+        self.refresh_interval = refresh_interval
+        self.frame_interval = frame_interval
+        self.exclude = exclude
+        self.clock = clock
+        self.stats: Counter = Counter()
+        self.__index: Optional[HitTestIndex] = None
+        self.__lock = threading.Lock()
+        self.__state_lock = threading.Lock()
+        self.__pending: Optional[tuple] = None
+        self.__last: Optional[HoverResult] = None
+        self.__last_index: Optional[HitTestIndex] = None
+        self.__stable_rect: Optional[tuple] = None
+        self.__last_run = -float("inf")
+        self.__stop = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+
+    @property
+    def index(self) -> Optional[HitTestIndex]:
+        """判定に使っている空間インデックス (まだ取得していなければ None)
+
+        Returns:
+            Optional[HitTestIndex]: 空間インデックス
+        """
+        return self.__index
+
+    def refresh(self) -> None:
+        """階層を取得し直す"""
+        tree = self.capture()
+        excluded = set()
+        for hwnd in self.exclude():
+            if hwnd in tree:
+                excluded.add(hwnd)
+                excluded.update(tree.descendant_hwnds_of(hwnd))
+        snapshots = [snapshot for snapshot in tree if snapshot.hwnd not in excluded and snapshot.is_visible]
+        index = HitTestIndex(tree, snapshots=snapshots)
+        with self.__lock:
+            self.__index = index
+            self.stats["refreshes"] += 1
+
+    def start(self) -> None:
+        """バックグラウンドでの階層の取り直しを開始する"""
+        if self.__thread is not None:
+            return
+        # 待たずに停止したスレッドが再開しないよう、開始ごとに停止の合図を作り直す
+        stop = self.__stop = threading.Event()
+
+        def _run():
+            while not stop.is_set():
+                try:
+                    self.refresh()
+                except Exception:
+                    # 取得に失敗しても前回の階層で判定を続け、次の間隔で取り直す
+                    _logger.exception("ホバー判定用の階層の取得に失敗しました")
+                    with self.__lock:
+                        self.stats["refresh_errors"] += 1
+                stop.wait(self.refresh_interval)
+
+        self.__thread = threading.Thread(target=_run, name="hover-refresh", daemon=True)
+        self.__thread.start()
+
+    def stop(self, wait: bool = True) -> None:
+        """バックグラウンドでの階層の取り直しを停止する
+
+        階層の取得はこのプロセスのウィンドウの属性も読むため、そのウィンドウのメッセージループを回すスレッド
+        (Tk のスレッドなど) からは `wait=False` で呼ぶ。待つと WM_GETTEXT などの応答待ちと互いに待ち合って止まる。
+
+        Args:
+            wait (bool): 取得中の階層の取り直しが終わるまで待つか
+        """
+        if self.__thread is None:
+            return
+        self.__stop.set()
+        if wait:
+            self.__thread.join()
+        self.__thread = None
+
+    def request(self, x: int, y: int) -> None:
+        """ポインタ位置を記録する (判定は `poll` まで遅らせ、最新の位置だけを判定する)
+
+        Args:
+            x (int): スクリーン座標のx
+            y (int): スクリーン座標のy
+        """
+        self.__pending = (x, y)
+        self.stats["requests"] += 1
+
+    def poll(self) -> Optional[HoverResult]:
+        """記録されたポインタ位置を判定する
+
+        Returns:
+            Optional[HoverResult]: 判定結果。未判定の位置がない場合や、前回の判定から `frame_interval` 秒経っていない場合は None
+        """
+        if self.__pending is None:
+            return None
+        now = self.clock()
+        if now - self.__last_run < self.frame_interval:
+            return None
+        self.__last_run = now
+        (x, y), self.__pending = self.__pending, None
+        return self.resolve(x, y)
+
+    def __current_index(self) -> HitTestIndex:
+        with self.__lock:
+            index = self.__index
+        if index is None:
+            self.refresh()
+            with self.__lock:
+                index = self.__index
+        return index
+
+    @staticmethod
+    def __query(index: HitTestIndex, x: int, y: int) -> HoverResult:
+        hits = tuple(index.query(x, y))
+        target = max(hits, key=lambda snapshot: snapshot.depth) if hits else None
+        return HoverResult(x, y, hits, target, False)
+
+    def lookup(self, x: int, y: int) -> tuple[HoverResult, HitTestIndex]:
+        """座標を判定する
+
+        前回の結果の再利用も更新もしないため、`resolve` を呼ぶスレッドと並行して任意のスレッドから呼べる。
+
+        Args:
+            x (int): スクリーン座標のx
+            y (int): スクリーン座標のy
+
+        Returns:
+            tuple[HoverResult, HitTestIndex]: 判定結果と、判定に使った空間インデックス
+        """
+        index = self.__current_index()
+        return self.__query(index, x, y), index
+
+    def resolve(self, x: int, y: int) -> HoverResult:
+        """座標を今すぐ判定する
+
+        Args:
+            x (int): スクリーン座標のx
+            y (int): スクリーン座標のy
+
+        Returns:
+            HoverResult: 判定結果
+        """
+        index = self.__current_index()
+        with self.__state_lock:
+            self.stats["resolves"] += 1
+
+            stable = self.__stable_rect
+            if index is self.__last_index and stable is not None:
+                x1, y1, x2, y2 = stable
+                if x1 <= x <= x2 and y1 <= y <= y2:
+                    self.stats["reused"] += 1
+                    self.__last = self.__last._replace(x=x, y=y, reused=True)
+                    return self.__last
+
+            self.__last = self.__query(index, x, y)
+            self.__last_index = index
+            self.__stable_rect = self.__compute_stable_rect(index, x, y, self.__last.hits)
+            return self.__last
+
+    @staticmethod
+    def __compute_stable_rect(index: HitTestIndex, x: int, y: int, hits: tuple) -> Optional[tuple]:
+        # 全ての該当ウィンドウの矩形の共通部分から、座標を含まない他のウィンドウと重なる部分を削った範囲では
+        # 判定結果が変わらない
+        if not hits:
+            return None
+        x1, y1, x2, y2 = hits[0].rect
+        for snapshot in hits[1:]:
+            rx1, ry1, rx2, ry2 = snapshot.rect
+            x1, y1, x2, y2 = max(x1, rx1), max(y1, ry1), min(x2, rx2), min(y2, ry2)
+        hit_hwnds = {snapshot.hwnd for snapshot in hits}
+        for snapshot in index.query_rect(x1, y1, x2, y2):
+            if snapshot.hwnd in hit_hwnds:
+                continue
+            rx1, ry1, rx2, ry2 = snapshot.rect
+            if rx1 > x2 or rx2 < x1 or ry1 > y2 or ry2 < y1:
+                # 既に削った範囲の外
+                continue
+            # 座標を残したまま重なりを除く切り方のうち、最も広い範囲が残るものを選ぶ
+            cuts = []
+            if rx1 > x:
+                cuts.append((x1, y1, rx1 - 1, y2))
+            if rx2 < x:
+                cuts.append((rx2 + 1, y1, x2, y2))
+            if ry1 > y:
+                cuts.append((x1, y1, x2, ry1 - 1))
+            if ry2 < y:
+                cuts.append((x1, ry2 + 1, x2, y2))
+            x1, y1, x2, y2 = max(cuts, key=lambda rect: (rect[2] - rect[0] + 1) * (rect[3] - rect[1] + 1))
+        return (x1, y1, x2, y2)
@@ -0,0 +1,587 @@
+"""ハンドルの経路による指定 (ロケーター)
+
+ウィンドウハンドルは実行のたびに変わるため、スクリプトからはクラス名・タイトル・兄弟内の順番の経路で指定する。
+
+    Notepad/Edit                 # クラス Notepad のトップレベルウィンドウの子で、クラスが Edit の最初のもの
+    Notepad/Edit[1]              # 同じく2番目 (負の値なら後ろから)
+    #32770@名前を付けて保存/Button@保存*   # "@" の後はタイトル ("*" "?" のワイルドカード可)
+    */@OK                        # クラスを問わない場合は "*" または省略
+
+各区切りは直下の子ウィンドウを表す (先頭はトップレベルウィンドウ)。"/" "@" "[" "]" "\\" は "\\" でエスケープする。
+
+`LocatorResolver` は解決結果・祖先の経路・作ったロケーターをキャッシュし、ハンドルが破棄されたものだけを捨てて解決し直す。
+"""
+import threading
+from collections import Counter
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterable, Iterator, NamedTuple, Optional, Union
+
+import win32gui
+
+from .enumeration import iter_child_hwnds
+
+if TYPE_CHECKING:
+    from .snapshot import WindowTree
+
+
+_SPECIAL = "/@[]\\"
+"""エスケープが必要な文字"""
+
+
+class LocatorSyntaxError(ValueError):
+    """ロケーターの書式が正しくない"""
+
+
+def _escape(text: str) -> str:
+    return "".join("\\" + char if char in _SPECIAL else char for char in text)
+
+
+def _matches(pattern: str, value: str) -> bool:
+    if "*" in pattern or "?" in pattern:
+        return fnmatchcase(value, pattern)
+    return pattern == value
+
+
+class Segment(NamedTuple):
+    """ロケーターの区切り1つ分
+
+    Attributes:
+        class_name (str): クラス名のパターン ("*" なら問わない)
+        title (Optional[str]): タイトルのパターン。None なら問わない
+        index (int): 条件に合う兄弟のうち何番目か (z オーダー順、負の値なら後ろから)
+    """
+    class_name: str = "*"
+    title: Optional[str] = None
+    index: int = 0
+
+    def __str__(self) -> str:
+        text = "*" if self.class_name == "*" and self.title is None else _escape(self.class_name)
+        if self.title is not None:
+            text = ("" if self.class_name == "*" else text) + "@" + _escape(self.title)
+        if self.index:
+            text += f"[{self.index}]"
+        return text
+
+    def matches(self, class_name: str, title: Optional[str]) -> bool:
+        """ウィンドウが条件に合うか
+
+        Args:
+            class_name (str): クラス名
+            title (Optional[str]): タイトル (`title` を問わない場合は参照しない)
+
+        Returns:
+            bool: 条件に合うか
+        """
+        if not _matches(self.class_name, class_name):
+            return False
+        return self.title is None or _matches(self.title, title)
+
+
+def _parse_segment(text: str, source: str) -> Segment:
+    # エスケープを解きながら "クラス名@タイトル[番号]" に分ける
+    parts = [[]]
+    index_text = None
+    position = 0
+    while position < len(text):
+        char = text[position]
+        if char == "\\":
+            if position + 1 >= len(text):
+                raise LocatorSyntaxError(f"dangling escape in locator: {source!r}")
+            parts[-1].append(text[position + 1])
+            position += 2
+            continue
+        if char == "@" and len(parts) == 1:
+            parts.append([])
+        elif char == "[":
+            end = text.find("]", position)
+            if end != len(text) - 1:
+                raise LocatorSyntaxError(f"index must close the segment: {source!r}")
+            index_text = text[position + 1:end]
+            break
+        elif char in "@]":
+            raise LocatorSyntaxError(f"unexpected {char!r} in locator: {source!r}")
+        else:
+            parts[-1].append(char)
+        position += 1
+    class_name = "".join(parts[0]) or "*"
+    title = "".join(parts[1]) if len(parts) > 1 else None
+    if index_text is None:
+        return Segment(class_name, title)
+    try:
+        return Segment(class_name, title, int(index_text))
+    except ValueError:
+        raise LocatorSyntaxError(f"invalid index {index_text!r} in locator: {source!r}") from None
+
+
+def _split(text: str) -> list[str]:
+    # エスケープされていない "/" で区切る
+    segments = [""]
+    escaped = False
+    for char in text:
+        if escaped:
+            segments[-1] += char
+            escaped = False
+        elif char == "\\":
+            segments[-1] += char
+            escaped = True
+        elif char == "/":
+            segments.append("")
+        else:
+            segments[-1] += char
+    return segments
+
+
+class Locator(NamedTuple):
+    """トップレベルウィンドウからの経路によるウィンドウの指定
+
+    Attributes:
+        segments (tuple[Segment, ...]): 先頭 (トップレベルウィンドウ) からの区切り
+    """
+    segments: tuple
+
+    def __str__(self) -> str:
+        return "/".join(str(segment) for segment in self.segments)
+
+    @classmethod
+    def parse(cls, text: Union[str, "Locator"]) -> "Locator":
+        """文字列からロケーターを作る
+
+        Args:
+            text (str | Locator): ロケーターの文字列 (`Locator` ならそのまま返す)
+
+        Raises:
+            LocatorSyntaxError: 書式が正しくない場合
+
+        Returns:
+            Locator: ロケーター
+        """
+        if isinstance(text, Locator):
+            return text
+        return _parse(cls, text)
+
+    @property
+    def parent(self) -> Optional["Locator"]:
+        """1つ上の階層のロケーター
+
+        Returns:
+            Optional[Locator]: 親のロケーター。トップレベルの場合は None
+        """
+        if len(self.segments) <= 1:
+            return None
+        return Locator(self.segments[:-1])
+
+
+@lru_cache(maxsize=1024)
+def _parse(cls: type, text: str) -> Locator:
+    # 同じ文字列のロケーターは繰り返し解決されることが多いので、解析結果を使い回す
+    if not text.strip("/"):
+        raise LocatorSyntaxError(f"empty locator: {text!r}")
+    segments = _split(text.strip("/"))
+    if any(not segment for segment in segments):
+        raise LocatorSyntaxError(f"empty segment in locator: {text!r}")
+    return cls(tuple(_parse_segment(segment, text) for segment in segments))
+
+
+LocatorLike = Union[str, Locator]
+
+
+class _Pass:
+    """1回の解決処理の中で読み出した値 (処理が終われば捨てる)"""
+
+    def __init__(self, need_titles: bool):
+        self.need_titles = need_titles
+        self.children: dict[int, tuple] = {}
+        self.attributes: dict[int, tuple] = {}
+        self.selected: dict[tuple, Optional[int]] = {}
+
+
+class LocatorResolver:
+    """ロケーターをハンドルに解決する
+
+    - 解決した経路 (区切りごとのハンドル) をロケーターごとに覚え、次回は末尾のハンドルが生きているかだけを確かめる
+    - 祖先の経路をハンドルごとに覚え、親の経路を子の経路の計算に使い回す
+    - `locate` で作ったロケーターをハンドルごとに覚え、同じ親の兄弟のロケーターも一緒に覚える
+    - 破棄されたハンドルを見つけると、それを経路に含むキャッシュだけを捨てる (ハンドルからの逆引きで探す)
+    - `resolve_many` は複数のロケーターを1回の走査で解決し、共通する経路の子ウィンドウの列挙や属性の読み出しを共有する
+
+    キャッシュした結果はウィンドウが生きている間保持するため、兄弟の順番が変わっても解決し直さない。
+    最新の状態で解決し直す場合は `refresh=True` を指定する。
+    キャッシュは種類ごとに `max_entries` 件までで、超えると古いものから捨てる。複数のスレッドから使える。
+    """
+
+    def __init__(self, max_entries: int = 8192):
+        """
+        Args:
+            max_entries (int): キャッシュの種類 (解決した経路・祖先の経路・ロケーター) ごとの上限
+        """
+        self.max_entries = max_entries
+        self.stats: Counter = Counter()
+        self.__paths: dict[Locator, tuple] = {}
+        self.__chains: dict[int, tuple] = {}
+        self.__locators: dict[int, tuple[Locator, tuple]] = {}
+        # ハンドル → そのハンドルを含むキャッシュの (種類, キー)
+        self.__members: dict[int, set] = {}
+        self.__lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.__paths)
+
+    # --- キャッシュ ---
+
+    def __tables(self) -> dict:
+        return {"path": self.__paths, "chain": self.__chains, "locator": self.__locators}
+
+    @staticmethod
+    def __hwnds_of(kind: str, key, value) -> tuple:
+        if kind == "path":
+            return value
+        if kind == "chain":
+            return value + (key,)
+        return value[1]
+
+    def __store(self, kind: str, key, value) -> None:
+        table = self.__tables()[kind]
+        if key in table:
+            self.__drop(kind, key)
+        elif len(table) >= self.max_entries:
+            self.__drop(kind, next(iter(table)))
+            self.stats["evicted"] += 1
+        table[key] = value
+        for hwnd in self.__hwnds_of(kind, key, value):
+            self.__members.setdefault(hwnd, set()).add((kind, key))
+
+    def __drop(self, kind: str, key) -> bool:
+        value = self.__tables()[kind].pop(key, None)
+        if value is None:
+            return False
+        for hwnd in self.__hwnds_of(kind, key, value):
+            members = self.__members.get(hwnd)
+            if members is not None:
+                members.discard((kind, key))
+                if not members:
+                    del self.__members[hwnd]
+        return True
+
+    # --- 祖先の経路 ---
+
+    def ancestors(self, hwnd: int) -> tuple:
+        """祖先ウィンドウのハンドルをトップレベルから順に取得する
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+
+        Returns:
+            tuple[int, ...]: 祖先ウィンドウのハンドル (トップレベルウィンドウが先頭、自身は含まない)
+        """
+        with self.__lock:
+            chain = self.__chains.get(hwnd)
+            if chain is not None:
+                if win32gui.IsWindow(hwnd):
+                    self.stats["chain_hits"] += 1
+                    return chain
+                self.invalidate(hwnd)
+            # 覚えている祖先に当たるまで親をたどる
+            pending = []
+            known = ()
+            current = hwnd
+            while True:
+                parent = win32gui.GetParent(current) or None
+                if parent is None:
+                    break
+                if parent in self.__chains:
+                    known = self.__chains[parent] + (parent,)
+                    break
+                pending.append(parent)
+                current = parent
+            chain = known + tuple(reversed(pending))
+            self.stats["chain_misses"] += 1
+            # 途中の祖先の経路も覚えておく
+            for position, ancestor in enumerate(pending):
+                if ancestor not in self.__chains:
+                    self.__store("chain", ancestor, chain[:len(chain) - position - 1])
+            self.__store("chain", hwnd, chain)
+            return chain
+
+    def level(self, hwnd: int) -> int:
+        """トップレベルからの深さ
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+
+        Returns:
+            int: 深さ (トップレベルウィンドウは0)
+        """
+        return len(self.ancestors(hwnd))
+
+    def hwnd_path(self, hwnd: int) -> str:
+        """トップレベルからのハンドルの経路
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+
+        Returns:
+            str: "/" で区切ったハンドル (例: "65536/65540/65541")
+        """
+        return "/".join(str(ancestor) for ancestor in self.ancestors(hwnd) + (hwnd,))
+
+    # --- ロケーターの生成 ---
+
+    def locate(self, hwnd: int, tree: Optional["WindowTree"] = None) -> Locator:
+        """ウィンドウを指すロケーターを作る (クラス名と、同じクラスの兄弟の中での順番)
+
+        同じ親の兄弟のロケーターも一緒に覚えるため、兄弟を続けて指定した場合は呼び出しが発生しない
+        (生きているかの確認を除く)。`tree` を指定した場合、ツリーに含まれる範囲はスナップショットの値から作る。
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+            tree (Optional[WindowTree]): 兄弟やクラス名を読むスナップショット
+
+        Raises:
+            win32gui.error: ウィンドウ (またはツリーに含まれない祖先) が破棄されている場合
+
+        Returns:
+            Locator: ロケーター
+        """
+        with self.__lock:
+            # ツリーの中で、覚えているロケーターかツリーのルートに当たるまで親をたどる
+            below = []
+            current = hwnd
+            while True:
+                snapshot = tree.get(current) if tree is not None else None
+                entry = self.__cached_locator(current, trusted=snapshot is not None)
+                if entry is not None:
+                    break
+                if snapshot is None or snapshot.depth == 0 or snapshot.parent_hwnd not in tree:
+                    entry = self.__locate_live(current)
+                    break
+                below.append(current)
+                current = snapshot.parent_hwnd
+            for child in reversed(below):
+                parent = tree[child].parent_hwnd
+                siblings = [(sibling, tree[sibling].class_name) for sibling in tree[parent].children_hwnds]
+                entry = self.__remember_siblings(entry, siblings, child)
+            return entry[0]
+
+    def __cached_locator(self, hwnd: int, trusted: bool = False) -> Optional[tuple]:
+        entry = self.__locators.get(hwnd)
+        if entry is None:
+            return None
+        if trusted or win32gui.IsWindow(hwnd):
+            self.stats["locate_hits"] += 1
+            return entry
+        self.invalidate(hwnd)
+        return None
+
+    def __remember_siblings(self, parent_entry: tuple, siblings: Iterable[tuple], target: int) -> tuple:
+        # 兄弟全てのロケーターを覚え、target のものを返す
+        parent_locator, parent_path = parent_entry
+        counts: Counter = Counter()
+        found = None
+        for sibling, class_name in siblings:
+            locator = Locator(parent_locator.segments + (Segment(class_name, None, counts[class_name]),))
+            counts[class_name] += 1
+            path = parent_path + (sibling,)
+            self.__store("locator", sibling, (locator, path))
+            self.__store("path", locator, path)
+            if sibling == target:
+                found = (locator, path)
+        self.stats["locate_misses"] += 1
+        if found is None:
+            # 兄弟の列挙に現れなかった (列挙の後に作られた等)。同じクラスの兄弟の後ろにあるものとして扱う
+            class_name = win32gui.GetClassName(target)
+            path = parent_path + (target,)
+            found = (Locator(parent_locator.segments + (Segment(class_name, None, counts[class_name]),)), path)
+            self.__store("locator", target, found)
+        return found
+
+    def __locate_live(self, hwnd: int) -> tuple:
+        path = self.ancestors(hwnd) + (hwnd,)
+        # 覚えている最も深い祖先から下だけを求める
+        entry = (Locator(()), ())
+        start = 0
+        for position in range(len(path) - 2, -1, -1):
+            cached = self.__cached_locator(path[position])
+            if cached is not None:
+                entry, start = cached, position + 1
+                break
+        for position in range(start, len(path)):
+            if position == 0:
+                siblings = []
+                win32gui.EnumWindows(lambda sibling, siblings: siblings.append(sibling), siblings)
+            else:
+                siblings = list(iter_child_hwnds(path[position - 1]))
+            entry = self.__remember_siblings(entry, self.__read_classes(siblings), path[position])
+        return entry
+
+    @staticmethod
+    def __read_classes(hwnds: Iterable[int]) -> Iterator[tuple]:
+        for hwnd in hwnds:
+            try:
+                yield hwnd, win32gui.GetClassName(hwnd)
+            except win32gui.error:
+                # 走査中に破棄された
+                continue
+
+    # --- 解決 ---
+
+    def resolve(self, locator: LocatorLike, *, refresh: bool = False) -> Optional[int]:
+        """ロケーターをハンドルに解決する
+
+        Args:
+            locator (str | Locator): ロケーター
+            refresh (bool): キャッシュを使わずに解決し直すか
+
+        Raises:
+            LocatorSyntaxError: 書式が正しくない場合
+
+        Returns:
+            Optional[int]: ウィンドウハンドル。見つからなければ None
+        """
+        return self.resolve_many([locator], refresh=refresh)[locator]
+
+    def resolve_many(self, locators: Iterable[LocatorLike], *, refresh: bool = False) -> dict:
+        """複数のロケーターを1回の走査で解決する
+
+        トップレベルウィンドウの列挙は1回だけ行い、同じ親の子ウィンドウの列挙と属性の読み出しも1回にまとめる。
+
+        Args:
+            locators (Iterable[str | Locator]): ロケーター
+            refresh (bool): キャッシュを使わずに解決し直すか
+
+        Raises:
+            LocatorSyntaxError: 書式が正しくない場合
+
+        Returns:
+            dict[str | Locator, Optional[int]]: 指定したロケーターとハンドル (見つからなければ None) の dict
+        """
+        with self.__lock:
+            return self.__resolve_many(locators, refresh)
+
+    def __resolve_many(self, locators: Iterable[LocatorLike], refresh: bool) -> dict:
+        results = {}
+        pending = {}
+        for key in locators:
+            locator = Locator.parse(key)
+            path = None if refresh else self.__paths.get(locator)
+            if path is not None:
+                if win32gui.IsWindow(path[-1]):
+                    self.stats["hits"] += 1
+                    results[key] = path[-1]
+                    continue
+                self.invalidate(path[-1])
+            pending.setdefault(locator, []).append(key)
+        if not pending:
+            return results
+
+        need_titles = any(segment.title is not None for locator in pending for segment in locator.segments)
+        state = _Pass(need_titles)
+        for locator, keys in pending.items():
+            self.stats["misses"] += 1
+            path = self.__walk(locator, state)
+            if path is not None:
+                self.__store("path", locator, path)
+                # 解決の途中でたどった経路は祖先の経路としても使える
+                for depth, hwnd in enumerate(path):
+                    if hwnd not in self.__chains:
+                        self.__store("chain", hwnd, path[:depth])
+            for key in keys:
+                results[key] = path[-1] if path is not None else None
+        self.stats["passes"] += 1
+        return results
+
+    def __walk(self, locator: Locator, state: _Pass) -> Optional[tuple]:
+        path = []
+        parent = 0
+        for segment in locator.segments:
+            key = (parent, segment)
+            if key not in state.selected:
+                state.selected[key] = self.__select(parent, segment, state)
+            selected = state.selected[key]
+            if selected is None:
+                return None
+            path.append(selected)
+            parent = selected
+        return tuple(path)
+
+    def __select(self, parent: int, segment: Segment, state: _Pass) -> Optional[int]:
+        children = state.children.get(parent)
+        if children is None:
+            if parent == 0:
+                hwnds = []
+                win32gui.EnumWindows(lambda hwnd, hwnds: hwnds.append(hwnd), hwnds)
+                children = tuple(hwnds)
+            else:
+                try:
+                    children = tuple(iter_child_hwnds(parent))
+                except win32gui.error:
+                    children = ()
+            state.children[parent] = children
+        matched = []
+        for child in children:
+            attributes = state.attributes.get(child)
+            if attributes is None:
+                try:
+                    attributes = (
+                        win32gui.GetClassName(child),
+                        win32gui.GetWindowText(child) if state.need_titles else None,
+                    )
+                except win32gui.error:
+                    # 走査中に破棄された
+                    attributes = ("", "")
+                state.attributes[child] = attributes
+            if segment.matches(*attributes):
+                matched.append(child)
+        try:
+            return matched[segment.index]
+        except IndexError:
+            return None
+
+    # --- 無効化 ---
+
+    def invalidate(self, hwnd: Optional[int] = None) -> int:
+        """ハンドルを経路に含むキャッシュを捨てる
+
+        Args:
+            hwnd (Optional[int]): 破棄されたウィンドウハンドル。None なら全て捨てる
+
+        Returns:
+            int: 捨てたキャッシュの数
+        """
+        with self.__lock:
+            if hwnd is None:
+                count = len(self.__paths) + len(self.__chains) + len(self.__locators)
+                for table in self.__tables().values():
+                    table.clear()
+                self.__members.clear()
+                return count
+            count = sum(self.__drop(kind, key) for kind, key in list(self.__members.get(hwnd, ())))
+            self.stats["invalidated"] += count
+            return count
+
+    def prune(self) -> int:
+        """破棄されたハンドルを含むキャッシュを全て捨てる
+
+        Returns:
+            int: 捨てたキャッシュの数
+        """
+        with self.__lock:
+            dead = [hwnd for hwnd in self.__members if not win32gui.IsWindow(hwnd)]
+            return sum(self.invalidate(hwnd) for hwnd in dead)
+
+
+_default_resolver: Optional[LocatorResolver] = None
+_default_resolver_lock = threading.Lock()
+
+
+def default_resolver() -> LocatorResolver:
+    """`Window.level` や `Desktop.locate` などが既定で使うリゾルバーを取得する
+
+    Returns:
+        LocatorResolver: 共有のリゾルバー
+    """
+    global _default_resolver
+    with _default_resolver_lock:
+        if _default_resolver is None:
+            _default_resolver = LocatorResolver()
+        return _default_resolver
@@ -0,0 +1,162 @@
+import time
+from functools import lru_cache
+from typing import Callable, Iterable, NamedTuple, Optional
+
+import win32gui
+
+from .utils import Win32Constants
+
+
+@lru_cache(maxsize=None)
+def resolve_message(act) -> int:
+    """メッセージ指定を数値のメッセージコードに変換する
+
+    Args:
+        act (Win32Constants | str | int): win32con メッセージ、16進数文字列または数値
+
+    Returns:
+        int: メッセージコード
+    """
+    if isinstance(act, Win32Constants):
+        act = act.value
+    if isinstance(act, str):
+        act = int(act, 16)
+    return act
+
+
+class MessageResult(NamedTuple):
+    """送信したメッセージ1件分の結果
+
+    Attributes:
+        hwnd (int): 送信先のウィンドウハンドル
+        msg (int): メッセージコード
+        word_param (Optional[int]): wParam
+        long_param: lParam
+        posted (bool): PostMessage で送信したか
+        result: SendMessage の戻り値、または PostMessage の成否
+        error (Optional[Exception]): 送信に失敗した場合の例外
+    """
+    hwnd: int
+    msg: int
+    word_param: Optional[int]
+    long_param: object
+    posted: bool
+    result: object
+    error: Optional[Exception]
+
+
+class MessageBatch:
+    """ウィンドウメッセージをまとめて送信するバッチ
+
+    メッセージコードは積んだ時点で1度だけ解決し、`flush` で積んだ順に送信する。
+    `coalesce` に含まれるメッセージは、同じウィンドウに対して間に別のメッセージを挟まずに
+    連続して積まれた場合、最後の1件にまとめる (例: `WM_SETTEXT` の連続は最後の値だけ送る)。
+
+        batch = MessageBatch(interval=0.01)
+        for edit in edits:
+            batch.set_text(edit, "hello")
+        batch.click(ok_button)
+        results = batch.flush()
+    """
+
+    def __init__(
+            self,
+            *,
+            interval: float = 0.0,
+            coalesce: Iterable = (Win32Constants.WM_SETTEXT,),
+            stop_on_error: bool = False,
+            sleep: Callable[[float], None] = time.sleep
+        ):
+        """
+        Args:
+            interval (float): メッセージ間に空ける秒数
+            coalesce (Iterable): まとめる対象のメッセージ
+            stop_on_error (bool): 送信に失敗した時点で残りを送らずに終了するか
+            sleep (Callable[[float], None]): 待機に使う関数
+        """
+        self.interval = interval
+        self.coalesce = frozenset(resolve_message(act) for act in coalesce)
+        self.stop_on_error = stop_on_error
+        self.sleep = sleep
+        self.__queue: list[list] = []
+        self.__last_by_hwnd: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.__queue)
+
+    def __enqueue(self, target, act, word_param, long_param, posted: bool) -> "MessageBatch":
+        hwnd = getattr(target, "hwnd", target)
+        msg = resolve_message(act)
+        last = self.__last_by_hwnd.get(hwnd)
+        if msg in self.coalesce and last is not None:
+            queued = self.__queue[last]
+            if queued[1] == msg and queued[4] == posted:
+                queued[2], queued[3] = word_param, long_param
+                return self
+        self.__last_by_hwnd[hwnd] = len(self.__queue)
+        self.__queue.append([hwnd, msg, word_param, long_param, posted])
+        return self
+
+    def send(self, target, act, *, word_param: Optional[int] = None, long_param=None) -> "MessageBatch":
+        """SendMessage で送るメッセージを積む
+
+        Args:
+            target (Window | int): 送信先
+            act (Win32Constants | str | int): メッセージ
+            word_param (Optional[int], optional): Defaults to None.
+            long_param (optional): Defaults to None.
+
+        Returns:
+            MessageBatch: 自身 (メソッドチェーン用)
+        """
+        return self.__enqueue(target, act, word_param, long_param, False)
+
+    def post(self, target, act, *, word_param: Optional[int] = None) -> "MessageBatch":
+        """PostMessage で送るメッセージを積む
+
+        Args:
+            target (Window | int): 送信先
+            act (Win32Constants | str | int): メッセージ
+            word_param (Optional[int], optional): Defaults to None.
+
+        Returns:
+            MessageBatch: 自身 (メソッドチェーン用)
+        """
+        return self.__enqueue(target, act, word_param, None, True)
+
+    def click(self, target) -> "MessageBatch":
+        """クリックを積む"""
+        self.post(target, Win32Constants.WM_LBUTTONDOWN)
+        return self.post(target, Win32Constants.WM_LBUTTONUP)
+
+    def set_text(self, target, text: str) -> "MessageBatch":
+        """テキストの設定 (`Window.send_keys` と同じ WM_SETTEXT) を積む"""
+        return self.send(target, Win32Constants.WM_SETTEXT, word_param=0, long_param=text)
+
+    def close(self, target) -> "MessageBatch":
+        """ウィンドウを閉じるメッセージを積む"""
+        return self.send(target, Win32Constants.WM_CLOSE)
+
+    def flush(self) -> list[MessageResult]:
+        """積んだメッセージを順に送信してバッチを空にする
+
+        Returns:
+            list[MessageResult]: 送信したメッセージごとの結果
+        """
+        queue, self.__queue, self.__last_by_hwnd = self.__queue, [], {}
+        results = []
+        for i, (hwnd, msg, word_param, long_param, posted) in enumerate(queue):
+            if i and self.interval > 0:
+                self.sleep(self.interval)
+            try:
+                if posted:
+                    result = bool(win32gui.PostMessage(hwnd, msg, word_param))
+                else:
+                    result = win32gui.SendMessage(hwnd, msg, word_param, long_param)
+            except win32gui.error as e:
+                results.append(MessageResult(hwnd, msg, word_param, long_param, posted, None, e))
+                if self.stop_on_error:
+                    break
+                continue
+            results.append(MessageResult(hwnd, msg, word_param, long_param, posted, result, None))
+        return results
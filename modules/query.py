@@ -0,0 +1,148 @@
+import re
+from typing import Callable, Iterable, Iterator, Optional
+
+import win32gui
+import win32process
+
+from .window import Window
+from .enumeration import iter_enum
+
+
+def _as_set(value) -> Optional[frozenset]:
+    if value is None:
+        return None
+    if isinstance(value, (str, int)):
+        return frozenset([value])
+    return frozenset(value)
+
+
+class WindowQuery:
+    """トップレベルウィンドウを複数条件で検索するクエリ
+
+    全ての条件を1回の `EnumWindows` の中で評価する。条件は呼び出しコストの低い順
+    (表示フラグ → クラス名 → タイトル → プロセスID → 任意の述語) に評価し、
+    不一致が確定した時点で残りの win32 呼び出しを省略する。
+    `limit` 件に達した時点で列挙自体も打ち切る。
+    """
+
+    def __init__(
+            self,
+            *,
+            name: Optional[str] = None,
+            name_contains: Optional[str] = None,
+            regex: Optional[str | re.Pattern] = None,
+            class_name: Optional[str | Iterable[str]] = None,
+            class_contains: Optional[str] = None,
+            pid: Optional[int | Iterable[int]] = None,
+            visible: Optional[bool] = None,
+            predicate: Optional[Callable[[Window], bool]] = None,
+            limit: Optional[int] = None
+        ):
+        """
+        Args:
+            name (Optional[str]): タイトルの完全一致
+            name_contains (Optional[str]): タイトルの部分一致
+            regex (Optional[str | re.Pattern]): タイトルに対する正規表現 (`re.search`)
+            class_name (Optional[str | Iterable[str]]): クラス名の完全一致 (複数指定時はいずれか)
+            class_contains (Optional[str]): クラス名の部分一致
+            pid (Optional[int | Iterable[int]]): プロセスID (複数指定時はいずれか)
+            visible (Optional[bool]): 表示フラグ
+            predicate (Optional[Callable[[Window], bool]]): 他の条件を全て満たしたウィンドウに対する任意の判定
+            limit (Optional[int]): 取得する最大件数
+        """
+        self.name = name
+        self.name_contains = name_contains
+        self.regex = re.compile(regex) if isinstance(regex, str) else regex
+        self.class_names = _as_set(class_name)
+        self.class_contains = class_contains
+        self.pids = _as_set(pid)
+        self.visible = visible
+        self.predicate = predicate
+        self.limit = limit
+
+    def matches(self, hwnd: int) -> bool:
+        """ウィンドウが全ての条件を満たすか判定する
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+
+        Returns:
+            bool: 全ての条件を満たすか
+        """
+        if self.visible is not None and bool(win32gui.IsWindowVisible(hwnd)) != self.visible:
+            return False
+        if self.class_names is not None or self.class_contains is not None:
+            class_name = win32gui.GetClassName(hwnd)
+            if self.class_names is not None and class_name not in self.class_names:
+                return False
+            if self.class_contains is not None and self.class_contains not in class_name:
+                return False
+        if self.name is not None or self.name_contains is not None or self.regex is not None:
+            text = win32gui.GetWindowText(hwnd)
+            if self.name is not None and text != self.name:
+                return False
+            if self.name_contains is not None and self.name_contains not in text:
+                return False
+            if self.regex is not None and not self.regex.search(text):
+                return False
+        if self.pids is not None:
+            _, process_id = win32process.GetWindowThreadProcessId(hwnd)
+            if process_id not in self.pids:
+                return False
+        if self.predicate is not None and not self.predicate(Window(hwnd)):
+            return False
+        return True
+
+    def all(self, limit: Optional[int] = None) -> list[Window]:
+        """条件に合致するウィンドウを取得する
+
+        Args:
+            limit (Optional[int]): 取得する最大件数。None ならクエリの `limit` を使う
+
+        Returns:
+            list[Window]: 合致したウィンドウ一覧 (列挙順)
+        """
+        limit = self.limit if limit is None else limit
+        results = []
+        if limit is not None and limit <= 0:
+            return results
+
+        def _callback(hwnd, results):
+            if self.matches(hwnd):
+                results.append(Window(hwnd))
+                if limit is not None and len(results) >= limit:
+                    return False
+            return True
+
+        try:
+            win32gui.EnumWindows(_callback, results)
+        except win32gui.error:
+            # コールバックで列挙を打ち切ると pywin32 が例外を送出することがある
+            if limit is None or len(results) < limit:
+                raise
+        return results
+
+    def first(self) -> Optional[Window]:
+        """条件に合致する最初のウィンドウを取得する
+
+        Returns:
+            Optional[Window]: 見つからなければ None
+        """
+        results = self.all(limit=1)
+        return results[0] if results else None
+
+    def __iter__(self) -> Iterator[Window]:
+        """条件に合致するウィンドウを列挙しながら逐次取得する
+
+        Yields:
+            Window: 合致したウィンドウ
+        """
+        if self.limit is not None and self.limit <= 0:
+            return
+        count = 0
+        for hwnd in iter_enum(win32gui.EnumWindows):
+            if self.matches(hwnd):
+                yield Window(hwnd)
+                count += 1
+                if self.limit is not None and count >= self.limit:
+                    return
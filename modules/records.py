@@ -0,0 +1,326 @@
+"""大量のウィンドウ情報を省メモリで保持する列指向レコード
+
+デスクトップ全体 (数万コントロール) を監査用に取得するときに、ウィンドウごとに `Window` や dict を作らず、
+属性ごとの `array` とクラス名の intern 表にまとめて保持する。
+"""
+from array import array
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+import win32gui
+
+_VISIBLE = 0x1
+_ICONIC = 0x2
+
+
+class WindowRecord(NamedTuple):
+    """`WindowRecords` の1行分
+
+    Attributes:
+        hwnd (int): ウィンドウハンドル
+        parent_hwnd (int | None): 親ウィンドウのハンドル
+        depth (int): 列挙のルートからの深さ (ルートは0)
+        text (str): ウィンドウタイトル
+        class_name (str): ウィンドウクラス名
+        rect (tuple): ウィンドウの位置とサイズ (left, top, right, bottom)
+        is_visible (bool): 表示フラグ
+        is_iconic (bool): 最小化フラグ
+    """
+    hwnd: int
+    parent_hwnd: Optional[int]
+    depth: int
+    text: str
+    class_name: str
+    rect: tuple
+    is_visible: bool
+    is_iconic: bool
+
+
+class ClassNameTable:
+    """クラス名と連番IDの対応表
+
+    同じクラス名は1つの文字列と1つのIDにまとめられる。
+    """
+
+    def __init__(self):
+        self.__names: list[str] = []
+        self.__ids: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.__names)
+
+    def id_of(self, class_name: str) -> int:
+        """クラス名のIDを取得する (未登録なら登録する)
+
+        Args:
+            class_name (str): クラス名
+
+        Returns:
+            int: クラス名のID
+        """
+        class_id = self.__ids.get(class_name)
+        if class_id is None:
+            class_id = self.__ids[class_name] = len(self.__names)
+            self.__names.append(class_name)
+        return class_id
+
+    def name_of(self, class_id: int) -> str:
+        """IDに対応するクラス名を取得する
+
+        Args:
+            class_id (int): クラス名のID
+
+        Returns:
+            str: クラス名
+        """
+        return self.__names[class_id]
+
+    @property
+    def names(self) -> tuple:
+        """登録済みのクラス名 (ID順)
+
+        Returns:
+            tuple[str, ...]: クラス名一覧
+        """
+        return tuple(self.__names)
+
+
+class WindowRecords:
+    """ウィンドウ情報の列指向コンテナ
+
+    ハンドル・親・深さ・矩形・クラスID・フラグを `array` に、タイトルだけを list に保持する。
+    行は列挙順 (ルートごとに前順) に並び、`Window` が必要になった行だけ `window()` で変換する。
+
+        records = WindowRecords.capture_desktop()
+        for record in records:
+            ...
+    """
+
+    def __init__(self):
+        self.hwnds = array("q")
+        self.parents = array("q")
+        self.depths = array("H")
+        self.rects = array("i")
+        self.class_ids = array("H")
+        self.flags = array("B")
+        self.texts: list[str] = []
+        self.class_names = ClassNameTable()
+        self.__positions: Optional[dict[int, int]] = None
+
+    def append(self, hwnd: int, parent_hwnd: Optional[int], depth: int, text: str, class_name: str,
+               rect: tuple, is_visible: bool, is_iconic: bool) -> None:
+        """1行追加する
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+            parent_hwnd (Optional[int]): 親ウィンドウのハンドル
+            depth (int): 列挙のルートからの深さ
+            text (str): ウィンドウタイトル
+            class_name (str): ウィンドウクラス名
+            rect (tuple): (left, top, right, bottom)
+            is_visible (bool): 表示フラグ
+            is_iconic (bool): 最小化フラグ
+        """
+        self.hwnds.append(hwnd)
+        self.parents.append(parent_hwnd or 0)
+        self.depths.append(depth)
+        self.rects.extend(rect)
+        self.class_ids.append(self.class_names.id_of(class_name))
+        self.flags.append((_VISIBLE if is_visible else 0) | (_ICONIC if is_iconic else 0))
+        self.texts.append(text)
+        self.__positions = None
+
+    def _append_enumerated(self, root: int, hwnds: list[int]) -> None:
+        # 列挙結果 (ルートと、その子孫の前順) から属性を1度ずつ読み出して追加する
+        depths = {root: 0}
+        # 列挙後に破棄され属性を読めなかったウィンドウ。その子孫も追加しない
+        dead = set()
+        for hwnd in [root] + hwnds:
+            try:
+                parent = win32gui.GetParent(hwnd)
+                if hwnd != root and (root in dead or parent in dead):
+                    # 前順に並んでいるため、破棄された親は子より先に判定済み
+                    dead.add(hwnd)
+                    continue
+                row = (
+                    win32gui.GetWindowText(hwnd),
+                    win32gui.GetClassName(hwnd),
+                    win32gui.GetWindowRect(hwnd),
+                    win32gui.IsWindowVisible(hwnd),
+                    win32gui.IsIconic(hwnd),
+                )
+            except win32gui.error:
+                dead.add(hwnd)
+                continue
+            if hwnd == root:
+                depth = 0
+            else:
+                # 親がたどれない場合 (列挙中に付け替えられた等) はルートの直下として扱う
+                depth = depths.get(parent, 0) + 1
+            depths[hwnd] = depth
+            self.append(hwnd, parent, depth, *row)
+
+    @classmethod
+    def capture(cls, hwnd: int) -> "WindowRecords":
+        """指定ウィンドウ以下の階層を取得する
+
+        Args:
+            hwnd (int): ルートとするウィンドウハンドル
+
+        Returns:
+            WindowRecords: 取得したレコード (取得中に破棄されたウィンドウとその子孫は含まない)
+        """
+        records = cls()
+        hwnds = []
+        win32gui.EnumChildWindows(hwnd, lambda child, hwnds: hwnds.append(child), hwnds)
+        records._append_enumerated(hwnd, hwnds)
+        return records
+
+    @classmethod
+    def capture_desktop(cls, visible_only: bool = False) -> "WindowRecords":
+        """デスクトップ全体の階層を取得する
+
+        Args:
+            visible_only (bool): 表示されているトップレベルウィンドウのみを対象にするか
+
+        Returns:
+            WindowRecords: トップレベルウィンドウをルートとするレコード
+        """
+        records = cls()
+        roots = []
+        win32gui.EnumWindows(lambda hwnd, roots: roots.append(hwnd), roots)
+        for root in roots:
+            if visible_only and not win32gui.IsWindowVisible(root):
+                continue
+            hwnds = []
+            try:
+                win32gui.EnumChildWindows(root, lambda child, hwnds: hwnds.append(child), hwnds)
+            except win32gui.error:
+                # 列挙後に破棄された (ルートの属性も読めないため追加されない)
+                pass
+            records._append_enumerated(root, hwnds)
+        return records
+
+    @classmethod
+    def merge(cls, parts: Iterable["WindowRecords"]) -> "WindowRecords":
+        """複数のレコードを順に連結する
+
+        Args:
+            parts (Iterable[WindowRecords]): 連結するレコード
+
+        Returns:
+            WindowRecords: 連結したレコード (行の順番は `parts` の順)
+        """
+        records = cls()
+        for part in parts:
+            records.extend(part)
+        return records
+
+    def extend(self, other: "WindowRecords") -> None:
+        """別のレコードの行を末尾に追加する (クラス名のIDは付け直す)
+
+        Args:
+            other (WindowRecords): 追加するレコード
+        """
+        class_ids = [self.class_names.id_of(name) for name in other.class_names.names]
+        self.hwnds.extend(other.hwnds)
+        self.parents.extend(other.parents)
+        self.depths.extend(other.depths)
+        self.rects.extend(other.rects)
+        self.class_ids.extend(class_ids[class_id] for class_id in other.class_ids)
+        self.flags.extend(other.flags)
+        self.texts.extend(other.texts)
+        self.__positions = None
+
+    def __getstate__(self) -> dict:
+        # プロセス間で受け渡すときは、必要になれば作り直せる索引を含めない
+        state = self.__dict__.copy()
+        state["_WindowRecords__positions"] = None
+        return state
+
+    def __len__(self) -> int:
+        return len(self.hwnds)
+
+    def __getitem__(self, position: int) -> WindowRecord:
+        if position < 0:
+            position += len(self)
+        flags = self.flags[position]
+        return WindowRecord(
+            self.hwnds[position],
+            self.parents[position] or None,
+            self.depths[position],
+            self.texts[position],
+            self.class_names.name_of(self.class_ids[position]),
+            tuple(self.rects[position * 4:position * 4 + 4]),
+            bool(flags & _VISIBLE),
+            bool(flags & _ICONIC),
+        )
+
+    def __iter__(self) -> Iterator[WindowRecord]:
+        return (self[position] for position in range(len(self)))
+
+    def __contains__(self, hwnd: int) -> bool:
+        return hwnd in self.__position_index()
+
+    def __position_index(self) -> dict[int, int]:
+        # ハンドル → 行番号の索引は必要になった時点で作る
+        if self.__positions is None:
+            self.__positions = {hwnd: position for position, hwnd in enumerate(self.hwnds)}
+        return self.__positions
+
+    def position_of(self, hwnd: int) -> int:
+        """ハンドルの行番号を取得する
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+
+        Raises:
+            KeyError: レコードに含まれない場合
+
+        Returns:
+            int: 行番号
+        """
+        return self.__position_index()[hwnd]
+
+    def get(self, hwnd: int) -> Optional[WindowRecord]:
+        """ハンドルの行を取得する
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+
+        Returns:
+            Optional[WindowRecord]: レコードに含まれない場合は None
+        """
+        position = self.__position_index().get(hwnd)
+        return None if position is None else self[position]
+
+    def window(self, hwnd: int):
+        """行に対応する `Window` を生成する
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+
+        Returns:
+            Window: 現在の属性を読む `Window`
+        """
+        from .window import Window
+        self.position_of(hwnd)
+        return Window(hwnd)
+
+    def iter_dicts(self) -> Iterator[dict]:
+        """各行を dict として逐次取得する
+
+        Yields:
+            dict: `WindowRecord` のフィールド名をキーとする dict
+        """
+        for record in self:
+            yield record._asdict()
+
+    @property
+    def nbytes(self) -> int:
+        """列の配列が使っているバイト数 (タイトルとクラス名の文字列を除く)
+
+        Returns:
+            int: バイト数
+        """
+        columns = (self.hwnds, self.parents, self.depths, self.rects, self.class_ids, self.flags)
+        return sum(column.itemsize * len(column) for column in columns)
@@ -0,0 +1,197 @@
+"""ウィンドウ構成の可視化
+
+matplotlib / tkinter に依存するため、`Window.draw_window_obj` などから必要になった時点で import される。
+"""
+import itertools
+import tkinter as tk
+from typing import Optional
+
+import matplotlib.pyplot as plt
+import matplotlib.patches as patches
+import numpy as np
+from matplotlib.collections import LineCollection
+
+from modules.window import Window
+from modules.viewport import Viewport, ViewportLayout
+
+
+def _rect_outlines(rects: np.ndarray) -> np.ndarray:
+    """(n, 4) の矩形配列から LineCollection 用の (n, 5, 2) の閉じた輪郭線を作る"""
+    x1, y1, x2, y2 = rects[:, 0], rects[:, 1], rects[:, 2], rects[:, 3]
+    xs = np.stack([x1, x2, x2, x1, x1], axis=1)
+    ys = np.stack([y1, y1, y2, y2, y1], axis=1)
+    return np.stack([xs, ys], axis=2)
+
+
+def draw_window_obj(
+        window: Window,
+        *,
+        min_pixels: float = 1.0,
+        label_min_pixels: float = 24.0,
+        max_labels: int = 500,
+        show: bool = True,
+        **kwargs
+    ):
+    """子要素とhwnd値の構成を描画する
+
+    階層を1回だけ取得し、全ての矩形を NumPy 配列にまとめて1つの `LineCollection` で描画する。
+    描画サイズで `min_pixels` に満たない要素は描画せず、ラベルは `label_min_pixels` 以上の幅がある要素のうち
+    大きい順に `max_labels` 件までに限る。
+
+    Args:
+        window (Window): 描画の基準となるウィンドウ
+        min_pixels (float): 描画する要素の最小サイズ (画面上のピクセル数)
+        label_min_pixels (float): hwnd のラベルを付ける要素の最小の幅 (画面上のピクセル数)
+        max_labels (int): ラベルの最大数
+        show (bool): `plt.show()` で表示するか
+        **kwargs: `Window.get_filtered_children` のフィルター条件
+
+    Returns:
+        matplotlib.figure.Figure: 描画した図
+    """
+    window = window.with_snapshot()
+    children = window.get_filtered_children(**kwargs)
+
+    fig, ax = plt.subplots()
+
+    x1, y1, x2, y2 = window.rect
+    ax.set_xlim(x1, x2)
+    ax.set_ylim(y1, y2)
+
+    me_rect = patches.Rectangle((x1, y1), x2 - x1, y2 - y1, linewidth=2, edgecolor='black', facecolor='none')
+    ax.add_patch(me_rect)
+    class_colors = {'me': 'black'}
+
+    if children:
+        rects = np.array([child.rect for child in children], dtype=float)
+        class_names = [child.class_name for child in children]
+        hwnds = np.array([child.hwnd for child in children])
+
+        # 軸の表示サイズから1ピクセルあたりの座標幅を求め、見えないほど小さい要素を間引く
+        bbox = ax.get_window_extent()
+        scale = min(bbox.width / max(x2 - x1, 1), bbox.height / max(y2 - y1, 1))
+        widths = (rects[:, 2] - rects[:, 0]) * scale
+        heights = (rects[:, 3] - rects[:, 1]) * scale
+        visible = (widths >= min_pixels) & (heights >= min_pixels)
+
+        colors = itertools.cycle(plt.cm.tab20.colors)
+        class_ids = {}
+        for class_name in class_names:
+            if class_name not in class_ids:
+                class_ids[class_name] = len(class_ids)
+                class_colors[class_name] = next(colors)
+        palette = np.array([class_colors[class_name] for class_name in class_ids])
+        edge_colors = palette[np.array([class_ids[class_name] for class_name in class_names])]
+
+        ax.add_collection(LineCollection(_rect_outlines(rects[visible]), colors=edge_colors[visible], linewidths=1))
+
+        labeled = np.flatnonzero(visible & (widths >= label_min_pixels))
+        labeled = labeled[np.argsort(-(widths[labeled] * heights[labeled]), kind="stable")[:max_labels]]
+        centers = (rects[labeled, :2] + rects[labeled, 2:]) / 2
+        for (cx, cy), hwnd, color in zip(centers, hwnds[labeled], edge_colors[labeled]):
+            ax.text(cx, cy, str(hwnd), ha='center', va='center', color=color)
+
+    ax.invert_yaxis()
+
+    handles = [patches.Patch(color=color, label=class_name) for class_name, color in class_colors.items()]
+    ax.legend(handles=handles)
+
+    if show:
+        plt.show()
+    return fig
+
+
+class CanvasInspector:
+    """Canvas 上にウィンドウ構成を描画するビューア
+
+    マウスホイールで拡大・縮小、ドラッグで移動できる。表示範囲に入る要素だけを描画し、
+    ラベルも表示範囲内の大きな要素に限って作成するため、数万要素のツリーでも操作が重くならない。
+    """
+
+    def __init__(self, master, window: Window, *, width: int, height: int, **kwargs):
+        """
+        Args:
+            master: 親ウィジェット
+            window (Window): 描画の基準となるウィンドウ
+            width (int): 表示領域の幅
+            height (int): 表示領域の高さ
+            **kwargs: `Window.get_filtered_children` のフィルター条件
+        """
+        tree = window.snapshot()
+        children = tree.window(window.hwnd).get_filtered_children(**kwargs)
+        self.layout = ViewportLayout(tree, [tree[child.hwnd] for child in children])
+        self.viewport = Viewport(tree[window.hwnd].rect, width, height)
+        self.canvas = tk.Canvas(master, width=width, height=height, background="white")
+        self.class_colors: dict[str, str] = {}
+        self.__colors = itertools.cycle(["red", "blue", "green", "purple", "orange"])
+        self.__drag_from: Optional[tuple] = None
+        for child in children:
+            self.color_of(child.class_name)
+
+        self.canvas.bind("<Configure>", self._on_resize)
+        self.canvas.bind("<MouseWheel>", lambda event: self._on_zoom(event, 1.2 if event.delta > 0 else 1 / 1.2))
+        self.canvas.bind("<Button-4>", lambda event: self._on_zoom(event, 1.2))
+        self.canvas.bind("<Button-5>", lambda event: self._on_zoom(event, 1 / 1.2))
+        self.canvas.bind("<ButtonPress-1>", self._on_drag_start)
+        self.canvas.bind("<B1-Motion>", self._on_drag)
+
+    def color_of(self, class_name: str) -> str:
+        """クラス名に割り当てた色を取得する"""
+        if class_name not in self.class_colors:
+            self.class_colors[class_name] = next(self.__colors)
+        return self.class_colors[class_name]
+
+    def redraw(self) -> None:
+        """表示範囲の要素を描画し直す"""
+        self.canvas.delete("all")
+        for item in self.layout.visible_items(self.viewport):
+            color = self.color_of(item.class_name)
+            self.canvas.create_rectangle(*item.bounds, outline=color)
+            if item.label is not None:
+                x1, y1, x2, y2 = item.bounds
+                self.canvas.create_text((x1 + x2) / 2, (y1 + y2) / 2, text=item.label, fill=color)
+
+    def _on_resize(self, event) -> None:
+        self.viewport.resize(event.width, event.height)
+        self.redraw()
+
+    def _on_zoom(self, event, factor: float) -> None:
+        self.viewport.zoom(factor, event.x, event.y)
+        self.redraw()
+
+    def _on_drag_start(self, event) -> None:
+        self.__drag_from = (event.x, event.y)
+
+    def _on_drag(self, event) -> None:
+        if self.__drag_from is None:
+            return
+        self.viewport.pan(event.x - self.__drag_from[0], event.y - self.__drag_from[1])
+        self.__drag_from = (event.x, event.y)
+        self.redraw()
+
+
+def draw_window_obj_tkinter(window: Window, **kwargs) -> None:
+    """子要素とhwnd値の構成を Canvas に描画する
+
+    Args:
+        window (Window): 描画の基準となるウィンドウ
+        **kwargs: `Window.get_filtered_children` のフィルター条件
+    """
+    root = tk.Tk()
+
+    x1, y1, x2, y2 = window.rect
+    width, height = x2 - x1, y2 - y1
+    root.geometry(f"{width}x{height}")
+
+    legend_frame = tk.Frame(root)
+    legend_frame.pack(side=tk.TOP, fill=tk.X)
+
+    inspector = CanvasInspector(root, window, width=width, height=height, **kwargs)
+    inspector.canvas.pack(fill=tk.BOTH, expand=True)
+    inspector.redraw()
+
+    for class_name, color in inspector.class_colors.items():
+        label = tk.Label(legend_frame, text=class_name, bg=color, fg="white")
+        label.pack(side=tk.LEFT)
+
+    root.mainloop()
@@ -0,0 +1,298 @@
+"""win32gui / win32process 呼び出しの記録と再生
+
+このパッケージの win32 呼び出しは全て `win32gui` / `win32process` モジュールを経由するため、
+モジュールの関数を差し替えることでバックエンドを切り替えられる。
+
+- `Recorder`: 実際のデスクトップでの呼び出しと結果、およびウィンドウ階層をファイルに記録する
+- `ReplayDesktop`: 記録を返すフェイクバックエンド。記録にない呼び出しは記録した階層から答える
+
+    # Windows 上で記録
+    with Recorder() as recorder:
+        recorder.capture_tree()
+        Desktop().query(name_contains="Notepad").all()
+    recorder.save("session.json.gz")
+
+    # Linux 上で再生
+    replay = ReplayDesktop.load("session.json.gz", latency="recorded")
+    fake_win32.install(replay)
+
+記録と同じ呼び出しだけが行われることを確かめる場合は `strict=True` で読み込むと、
+記録を使い切った後や記録にない呼び出しで `RecordingExhaustedError` を送出する。
+"""
+import gzip
+import json
+import os
+import time
+from collections import deque
+from typing import Callable, Optional, Union
+
+from .fake_win32 import WIN32GUI_FUNCTIONS, WIN32PROCESS_FUNCTIONS, FakeDesktop, FakeWin32Error
+
+
+RECORDING_VERSION = 1
+"""記録ファイルの形式のバージョン"""
+
+ENUM_FUNCTIONS = ("EnumWindows", "EnumChildWindows")
+"""コールバックに渡されたハンドル列を結果として記録する関数"""
+
+UNRECORDED_FUNCTIONS = ("set_logger",)
+"""記録・再生の対象外とする関数"""
+
+
+class RecordingExhaustedError(LookupError):
+    """`strict` な再生で、記録を使い切った呼び出しや記録にない呼び出しが行われた"""
+
+
+def _call_key(function: str, args: tuple) -> str:
+    # 列挙関数のコールバックと追加引数は記録できないので除く
+    if function in ENUM_FUNCTIONS:
+        args = args[:-2]
+    return json.dumps([function, list(args)], ensure_ascii=False, default=repr)
+
+
+def _to_json(value):
+    if isinstance(value, tuple):
+        return [_to_json(item) for item in value]
+    if isinstance(value, (str, int, float, bool, type(None), list)):
+        return value
+    return repr(value)
+
+
+def _open(path: Union[str, os.PathLike], mode: str):
+    if str(os.fspath(path)).endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class Recorder:
+    """win32gui / win32process の呼び出しと結果を記録する
+
+    開始するとモジュールの関数をその場で記録用の関数に差し替え、停止すると元に戻す。
+    既に import 済みのモジュールからの呼び出しも記録される。
+    """
+
+    def __init__(self, win32gui=None, win32process=None, *, clock: Callable[[], float] = time.perf_counter):
+        """
+        Args:
+            win32gui (optional): 記録対象の win32gui モジュール。None なら import したもの
+            win32process (optional): 記録対象の win32process モジュール。None なら import したもの
+            clock (Callable[[], float]): 所要時間の計測に使う時計
+        """
+        if win32gui is None:
+            import win32gui
+        if win32process is None:
+            import win32process
+        self.modules = ((win32gui, WIN32GUI_FUNCTIONS), (win32process, WIN32PROCESS_FUNCTIONS))
+        self.clock = clock
+        self.calls: list[dict] = []
+        self.windows: list[dict] = []
+        self.foreground: int = 0
+        self.__originals: list[tuple] = []
+        self.__paused = False
+
+    def __enter__(self) -> "Recorder":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """記録を開始する"""
+        if self.__originals:
+            return
+        for module, functions in self.modules:
+            for name in functions:
+                original = getattr(module, name, None)
+                if original is None or name in UNRECORDED_FUNCTIONS:
+                    continue
+                self.__originals.append((module, name, original))
+                setattr(module, name, self.__wrap(name, original, module.error))
+
+    def stop(self) -> None:
+        """記録を停止し、モジュールの関数を元に戻す"""
+        for module, name, original in reversed(self.__originals):
+            setattr(module, name, original)
+        self.__originals = []
+
+    def __wrap(self, name: str, original: Callable, error: type) -> Callable:
+        def _recorded(*args):
+            if self.__paused:
+                return original(*args)
+            entry = {"function": name, "key": _call_key(name, args)}
+            if name in ENUM_FUNCTIONS:
+                callback = args[-2]
+                hwnds = entry["result"] = []
+
+                def _callback(hwnd, extra):
+                    hwnds.append(hwnd)
+                    return callback(hwnd, extra)
+
+                args = args[:-2] + (_callback, args[-1])
+            start = self.clock()
+            try:
+                result = original(*args)
+            except error as e:
+                entry["error"] = [getattr(e, "winerror", 0), getattr(e, "funcname", name), getattr(e, "strerror", str(e))]
+                raise
+            else:
+                if name not in ENUM_FUNCTIONS:
+                    entry["result"] = _to_json(result)
+                return result
+            finally:
+                entry["elapsed"] = self.clock() - start
+                self.calls.append(entry)
+
+        _recorded.__name__ = name
+        return _recorded
+
+    def capture_tree(self, visible_only: bool = False) -> int:
+        """デスクトップ全体の階層を記録する (この間の呼び出しは記録しない)
+
+        Args:
+            visible_only (bool): 表示されているトップレベルウィンドウのみを対象にするか
+
+        Returns:
+            int: 記録したウィンドウ数
+        """
+        from .export import iter_rows
+        win32gui, _ = self.modules[0]
+        win32process, _ = self.modules[1]
+        self.__paused = True
+        try:
+            roots = []
+            win32gui.EnumWindows(lambda hwnd, roots: roots.append(hwnd), roots)
+            if visible_only:
+                roots = [hwnd for hwnd in roots if win32gui.IsWindowVisible(hwnd)]
+            self.windows = []
+            for row in iter_rows(roots):
+                _, row["pid"] = win32process.GetWindowThreadProcessId(row["hwnd"])
+                self.windows.append(row)
+            self.foreground = win32gui.GetForegroundWindow()
+        finally:
+            self.__paused = False
+        return len(self.windows)
+
+    def save(self, path: Union[str, os.PathLike]) -> None:
+        """記録をファイルに保存する (`.gz` なら gzip 圧縮)
+
+        Args:
+            path (str | os.PathLike): 保存先
+        """
+        with _open(path, "w") as file:
+            json.dump({
+                "version": RECORDING_VERSION,
+                "foreground": self.foreground,
+                "windows": self.windows,
+                "calls": self.calls,
+            }, file, ensure_ascii=False)
+
+
+class ReplayDesktop(FakeDesktop):
+    """記録した呼び出し結果を返すフェイクバックエンド
+
+    同じ関数・引数の呼び出しには記録された結果を記録順に返し、使い切った後や記録にない呼び出しは
+    記録したウィンドウ階層をもとに `FakeDesktop` として答える (`strict` なら例外を送出する)。
+    `latency` で呼び出しごとの待ち時間を再現できる。
+    """
+
+    def __init__(
+            self,
+            recording: Optional[dict] = None,
+            *,
+            latency: Union[None, str, float, dict] = None,
+            strict: bool = False,
+            sleep: Callable[[float], None] = time.sleep
+        ):
+        """
+        Args:
+            recording (Optional[dict]): `Recorder.save` で保存した内容
+            latency (None | str | float | dict): 呼び出しごとの待ち時間。
+                None なら待たない、"recorded" なら記録された所要時間、数値なら一律の秒数、dict なら関数名ごとの秒数
+            strict (bool): 記録を使い切った後や記録にない呼び出しで、階層から答えずに `RecordingExhaustedError` を送出するか
+            sleep (Callable[[float], None]): 待機に使う関数
+        """
+        super().__init__()
+        recording = recording or {}
+        self.latency = latency
+        self.strict = strict
+        self.sleep = sleep
+        self.replayed = 0
+        self.__recorded: dict[str, deque] = {}
+        for entry in recording.get("calls", []):
+            self.__recorded.setdefault(entry["key"], deque()).append(entry)
+        for row in recording.get("windows", []):
+            self.add_window(
+                row["parent_hwnd"] if row["depth"] > 0 else None,
+                text=row["text"],
+                class_name=row["class_name"],
+                rect=tuple(row["rect"]),
+                visible=row["is_visible"],
+                iconic=row["is_iconic"],
+                pid=row.get("pid"),
+                hwnd=row["hwnd"],
+            )
+        self.foreground = recording.get("foreground", 0)
+        for name in WIN32GUI_FUNCTIONS + WIN32PROCESS_FUNCTIONS:
+            if name not in UNRECORDED_FUNCTIONS:
+                setattr(self, name, self.__replaying(name, getattr(self, name)))
+
+    @classmethod
+    def load(cls, path: Union[str, os.PathLike], **kwargs) -> "ReplayDesktop":
+        """記録ファイルから再生用のバックエンドを作る
+
+        Args:
+            path (str | os.PathLike): `Recorder.save` で保存したファイル
+            **kwargs: `ReplayDesktop` のオプション (latency, strict, sleep)
+
+        Raises:
+            ValueError: 対応していない形式のファイルの場合
+
+        Returns:
+            ReplayDesktop: 再生用のバックエンド
+        """
+        with _open(path, "r") as file:
+            recording = json.load(file)
+        if recording.get("version") != RECORDING_VERSION:
+            raise ValueError(f"unsupported recording version: {recording.get('version')}")
+        return cls(recording, **kwargs)
+
+    def __delay_of(self, name: str, entry: Optional[dict]) -> float:
+        if self.latency is None:
+            return 0.0
+        if self.latency == "recorded":
+            return entry["elapsed"] if entry is not None else 0.0
+        if isinstance(self.latency, dict):
+            return self.latency.get(name, 0.0)
+        return float(self.latency)
+
+    def __replaying(self, name: str, fallback: Callable) -> Callable:
+        def _replay(*args):
+            key = _call_key(name, args)
+            recorded = self.__recorded.get(key)
+            entry = recorded.popleft() if recorded else None
+            if entry is None and self.strict:
+                state = "exhausted" if recorded is not None else "not recorded"
+                raise RecordingExhaustedError(f"{key}: {state}")
+            delay = self.__delay_of(name, entry)
+            if delay:
+                self.sleep(delay)
+            if entry is None:
+                return fallback(*args)
+            self.calls[name] += 1
+            self.replayed += 1
+            if name in ENUM_FUNCTIONS:
+                callback, extra = args[-2:]
+                for hwnd in entry["result"]:
+                    result = callback(hwnd, extra)
+                    if result is not None and not result:
+                        break
+            if "error" in entry:
+                raise FakeWin32Error(*entry["error"])
+            if name in ENUM_FUNCTIONS:
+                return None
+            result = entry["result"]
+            return tuple(result) if isinstance(result, list) else result
+
+        _replay.__name__ = name
+        return _replay
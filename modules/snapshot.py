@@ -0,0 +1,271 @@
+from typing import Iterator, NamedTuple, Optional
+
+try:
+    import win32gui
+except ImportError:
+    # Win32 のない環境でも、書き出したツリーを読み込んで参照できるようにする (取得はできない)
+    win32gui = None
+
+
+class WindowSnapshot(NamedTuple):
+    """ある時点でのウィンドウ1つ分の属性
+
+    Attributes:
+        hwnd (int): ウィンドウハンドル
+        parent_hwnd (int | None): 親ウィンドウのハンドル
+        text (str): ウィンドウタイトル
+        class_name (str): ウィンドウクラス名
+        rect (tuple): ウィンドウの位置とサイズ (left, top, right, bottom)
+        client_rect (tuple): クライアント領域の位置とサイズ (left, top, right, bottom)
+        is_visible (bool): 表示フラグ
+        is_iconic (bool): 最小化フラグ
+        depth (int): ツリーのルートからの深さ (ルートは0)
+        children_hwnds (tuple[int, ...]): 直下の子ウィンドウのハンドル (z オーダー順)
+    """
+    hwnd: int
+    parent_hwnd: Optional[int]
+    text: str
+    class_name: str
+    rect: tuple
+    client_rect: tuple
+    is_visible: bool
+    is_iconic: bool
+    depth: int
+    children_hwnds: tuple
+
+
+def _read_attributes(hwnd: int) -> tuple:
+    parent = win32gui.GetParent(hwnd)
+    return (
+        parent or None,
+        win32gui.GetWindowText(hwnd),
+        win32gui.GetClassName(hwnd),
+        tuple(win32gui.GetWindowRect(hwnd)),
+        tuple(win32gui.GetClientRect(hwnd)),
+        bool(win32gui.IsWindowVisible(hwnd)),
+        bool(win32gui.IsIconic(hwnd)),
+    )
+
+
+class WindowTree:
+    """ウィンドウ階層の不変スナップショット
+
+    1回の列挙で階層全体を取得し、各ウィンドウの属性を1度だけ読み出して保持する。
+    ノードは前順 (親 → 子孫) で並んでいるため、あるウィンドウの子孫は連続した区間として取り出せる。
+    """
+
+    def __init__(self, roots: list[int], records: dict[int, tuple], links: dict[int, list[int]], foreground_hwnd: int = 0):
+        self.__roots: tuple = tuple(roots)
+        self.__foreground_hwnd: int = foreground_hwnd
+        self.__snapshots: dict[int, WindowSnapshot] = {}
+        self.__order: list[int] = []
+        self.__subtree_span: dict[int, tuple] = {}
+
+        for root in self.__roots:
+            self.__add_subtree(root, records, links)
+
+    def __add_subtree(self, root: int, records: dict[int, tuple], links: dict[int, list[int]]) -> None:
+        # 深い階層で再帰上限に当たらないよう明示的なスタックで前順に並べる
+        stack = [(root, 0, False)]
+        while stack:
+            hwnd, depth, is_exit = stack.pop()
+            if is_exit:
+                self.__subtree_span[hwnd] = (self.__subtree_span[hwnd], len(self.__order))
+                continue
+            children = links.get(hwnd, [])
+            self.__snapshots[hwnd] = WindowSnapshot(hwnd, *records[hwnd], depth, tuple(children))
+            self.__subtree_span[hwnd] = len(self.__order) + 1
+            self.__order.append(hwnd)
+            stack.append((hwnd, depth, True))
+            stack.extend((child, depth + 1, False) for child in reversed(children))
+
+    @classmethod
+    def _build(cls, groups: list[tuple]) -> "WindowTree":
+        """列挙結果からツリーを組み立てる
+
+        列挙後に破棄されたウィンドウは、その子孫ごと除く。
+
+        Args:
+            groups (list[tuple[int, list[int]]]): (ルートのハンドル, その子孫のハンドル一覧) の組
+        """
+        records = {}
+        links: dict[int, list[int]] = {}
+        # 列挙後に破棄され属性を読めなかったウィンドウ。その子孫もツリーから除く
+        dead = set()
+        for root, hwnds in groups:
+            for hwnd in [root] + hwnds:
+                if hwnd in records or hwnd in dead:
+                    continue
+                try:
+                    records[hwnd] = _read_attributes(hwnd)
+                except win32gui.error:
+                    dead.add(hwnd)
+        roots = [root for root, _ in groups if root in records]
+        root_set = set(roots)
+        for root, hwnds in groups:
+            if root not in root_set:
+                continue
+            for hwnd in hwnds:
+                if hwnd in root_set or hwnd not in records:
+                    continue
+                parent = records[hwnd][0]
+                if parent in dead:
+                    # 前順に並んでいるため、破棄された親は子より先に判定済み
+                    del records[hwnd]
+                    dead.add(hwnd)
+                    continue
+                if parent not in records:
+                    # 列挙中に親が付け替えられた等でたどれない場合は列挙元のルートにぶら下げる
+                    parent = root
+                links.setdefault(parent, []).append(hwnd)
+        return cls(roots, records, links, win32gui.GetForegroundWindow())
+
+    @classmethod
+    def capture(cls, hwnd: int) -> "WindowTree":
+        """指定ウィンドウ以下の階層を取得する
+
+        Args:
+            hwnd (int): ルートとするウィンドウハンドル
+
+        Raises:
+            win32gui.error: ルートのウィンドウが破棄されている場合
+
+        Returns:
+            WindowTree: 取得したスナップショット
+        """
+        hwnds = []
+        win32gui.EnumChildWindows(hwnd, lambda child, hwnds: hwnds.append(child), hwnds)
+        tree = cls._build([(hwnd, hwnds)])
+        if hwnd not in tree:
+            # ルートごと除かれた空のツリーは返さず、破棄されたウィンドウへの呼び出しと同じエラーにする
+            win32gui.GetClassName(hwnd)
+        return tree
+
+    @classmethod
+    def capture_desktop(cls, visible_only: bool = False) -> "WindowTree":
+        """デスクトップ全体の階層を取得する
+
+        Args:
+            visible_only (bool): 表示されているトップレベルウィンドウのみを対象にするか
+
+        Returns:
+            WindowTree: トップレベルウィンドウをルートとするスナップショット
+        """
+        roots = []
+        win32gui.EnumWindows(lambda hwnd, roots: roots.append(hwnd), roots)
+        if visible_only:
+            roots = [hwnd for hwnd in roots if win32gui.IsWindowVisible(hwnd)]
+        groups = []
+        for root in roots:
+            hwnds = []
+            try:
+                win32gui.EnumChildWindows(root, lambda child, hwnds: hwnds.append(child), hwnds)
+            except win32gui.error:
+                # 列挙後に破棄された (ルートの属性も読めないため _build で除かれる)
+                pass
+            groups.append((root, hwnds))
+        return cls._build(groups)
+
+    def __len__(self) -> int:
+        return len(self.__order)
+
+    def __contains__(self, hwnd: int) -> bool:
+        return hwnd in self.__snapshots
+
+    def __iter__(self) -> Iterator[WindowSnapshot]:
+        return (self.__snapshots[hwnd] for hwnd in self.__order)
+
+    def __getitem__(self, hwnd: int) -> WindowSnapshot:
+        return self.__snapshots[hwnd]
+
+    @property
+    def roots(self) -> tuple:
+        """ルートウィンドウのハンドル
+
+        Returns:
+            tuple[int, ...]: ルートウィンドウのハンドル
+        """
+        return self.__roots
+
+    @property
+    def foreground_hwnd(self) -> int:
+        """取得時点でのフォアグラウンドウィンドウのハンドル
+
+        Returns:
+            int: フォアグラウンドウィンドウのハンドル
+        """
+        return self.__foreground_hwnd
+
+    def get(self, hwnd: int) -> Optional[WindowSnapshot]:
+        """ウィンドウのスナップショットを取得する
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+
+        Returns:
+            Optional[WindowSnapshot]: ツリーに含まれない場合は None
+        """
+        return self.__snapshots.get(hwnd)
+
+    def children_of(self, hwnd: int) -> list[WindowSnapshot]:
+        """直下の子ウィンドウを取得する
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+
+        Returns:
+            list[WindowSnapshot]: 子ウィンドウ一覧 (z オーダー順)
+        """
+        return [self.__snapshots[child] for child in self.__snapshots[hwnd].children_hwnds]
+
+    def descendant_hwnds_of(self, hwnd: int) -> list[int]:
+        """子孫ウィンドウのハンドルを `EnumChildWindows` と同じ前順で取得する
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+
+        Returns:
+            list[int]: 子孫ウィンドウのハンドル一覧
+        """
+        start, end = self.__subtree_span[hwnd]
+        return self.__order[start:end]
+
+    def descendants_of(self, hwnd: int) -> list[WindowSnapshot]:
+        """子孫ウィンドウを前順で取得する
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+
+        Returns:
+            list[WindowSnapshot]: 子孫ウィンドウ一覧
+        """
+        return [self.__snapshots[child] for child in self.descendant_hwnds_of(hwnd)]
+
+    def ancestors_of(self, hwnd: int) -> list[WindowSnapshot]:
+        """ツリー内の祖先ウィンドウを近い順に取得する
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+
+        Returns:
+            list[WindowSnapshot]: 祖先ウィンドウ一覧
+        """
+        ancestors = []
+        parent = self.__snapshots[hwnd].parent_hwnd
+        while parent in self.__snapshots and self.__snapshots[hwnd].depth > 0:
+            hwnd = parent
+            ancestors.append(self.__snapshots[hwnd])
+            parent = self.__snapshots[hwnd].parent_hwnd
+        return ancestors
+
+    def window(self, hwnd: int):
+        """スナップショットを参照する `Window` を生成する
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+
+        Returns:
+            Window: このツリーから属性を読む `Window`
+        """
+        from .window import Window
+        return Window(hwnd, tree=self)
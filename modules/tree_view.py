@@ -0,0 +1,401 @@
+"""ウィンドウ階層の仮想化ツリー表示
+
+子ウィンドウは展開したときに初めて取得し、表示行は画面に見えている範囲の分だけを使い回して描画する。
+Tk に依存しないため、遅延展開・表示行の再利用をヘッドレスで検証できる。
+
+    model = LazyWindowTree([root])
+    rows = RowRecycler(model, height=20, render=draw_row)
+    model.expand(root)
+    rows.update()
+"""
+from collections import Counter
+from typing import Callable, Iterable, NamedTuple, Optional
+
+import win32gui
+
+from .enumeration import iter_child_hwnds
+
+
+def describe_window(hwnd: int) -> str:
+    """ツリーの行に表示するラベルを作る
+
+    Args:
+        hwnd (int): ウィンドウハンドル
+
+    Returns:
+        str: ハンドル・クラス名・タイトルを並べたラベル
+    """
+    try:
+        return f"{hwnd} [{win32gui.GetClassName(hwnd)}] {win32gui.GetWindowText(hwnd)}"
+    except win32gui.error:
+        return f"{hwnd} (破棄済み)"
+
+
+class TreeRow(NamedTuple):
+    """表示行1つ分
+
+    Attributes:
+        hwnd (int): ウィンドウハンドル
+        depth (int): ルートからの深さ (ルートは0)
+        label (str): 表示するラベル
+        expandable (Optional[bool]): 子ウィンドウがあるか。まだ取得していなければ None
+        expanded (bool): 展開されているか
+    """
+    hwnd: int
+    depth: int
+    label: str
+    expandable: Optional[bool]
+    expanded: bool
+
+
+class LazyWindowTree:
+    """遅延展開するウィンドウ階層の表示モデル
+
+    展開されているノードをたどった前順の行一覧を保持する。子ウィンドウは展開時に1度だけ取得してキャッシュし、
+    ラベルは `rows` で表示範囲の行を取り出したときに初めて読み出す。
+    畳んだノードの展開状態は保持し、再び展開すると子孫の展開も元に戻る。
+    """
+
+    def __init__(
+            self,
+            roots: Iterable[int],
+            *,
+            children_of: Callable[[int], Iterable[int]] = iter_child_hwnds,
+            describe: Callable[[int], str] = describe_window
+        ):
+        """
+        Args:
+            roots (Iterable[int]): ルートとするウィンドウハンドル
+            children_of (Callable[[int], Iterable[int]]): 直下の子ウィンドウのハンドルを返す関数
+            describe (Callable[[int], str]): 行のラベルを返す関数
+        """
+        self.children_of = children_of
+        self.describe = describe
+        self.stats: Counter = Counter()
+        self.__roots = tuple(roots)
+        self.__rows: list[int] = list(self.__roots)
+        self.__depths: dict[int, int] = {hwnd: 0 for hwnd in self.__roots}
+        self.__children: dict[int, tuple] = {}
+        self.__labels: dict[int, str] = {}
+        self.__expanded: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.__rows)
+
+    def __contains__(self, hwnd: int) -> bool:
+        return hwnd in self.__depths
+
+    @property
+    def roots(self) -> tuple:
+        """ルートウィンドウのハンドル
+
+        Returns:
+            tuple[int, ...]: ルートウィンドウのハンドル
+        """
+        return self.__roots
+
+    def index_of(self, hwnd: int) -> int:
+        """表示行の位置を取得する
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+
+        Raises:
+            KeyError: 表示されていない (祖先が畳まれている) 場合
+
+        Returns:
+            int: 行の位置
+        """
+        if hwnd not in self.__depths:
+            raise KeyError(hwnd)
+        return self.__rows.index(hwnd)
+
+    def row(self, index: int) -> TreeRow:
+        """表示行を取得する
+
+        Args:
+            index (int): 行の位置
+
+        Returns:
+            TreeRow: 表示行
+        """
+        hwnd = self.__rows[index]
+        label = self.__labels.get(hwnd)
+        if label is None:
+            label = self.__labels[hwnd] = self.describe(hwnd)
+            self.stats["labels"] += 1
+        children = self.__children.get(hwnd)
+        return TreeRow(
+            hwnd,
+            self.__depths[hwnd],
+            label,
+            None if children is None else bool(children),
+            hwnd in self.__expanded,
+        )
+
+    def rows(self, start: int, count: int) -> list[TreeRow]:
+        """表示範囲の行を取得する
+
+        Args:
+            start (int): 先頭の行の位置
+            count (int): 行数
+
+        Returns:
+            list[TreeRow]: 表示行 (範囲外は含まない)
+        """
+        return [self.row(index) for index in range(max(start, 0), min(start + count, len(self.__rows)))]
+
+    def __fetch(self, hwnd: int) -> tuple:
+        try:
+            children = tuple(self.children_of(hwnd))
+        except win32gui.error:
+            # 破棄されたウィンドウは子なしとして扱う
+            children = ()
+        self.__children[hwnd] = children
+        self.stats["fetches"] += 1
+        return children
+
+    def __flatten(self, hwnd: int, depth: int) -> list[int]:
+        # 展開済みのノードをたどって hwnd の子孫の表示行を前順に並べる
+        rows = []
+        stack = [(hwnd, depth)]
+        while stack:
+            parent, parent_depth = stack.pop()
+            if parent != hwnd:
+                if parent in self.__depths:
+                    # 親子関係が変わった等で既に表示されている
+                    continue
+                rows.append(parent)
+                self.__depths[parent] = parent_depth
+                if parent not in self.__expanded:
+                    continue
+            children = self.__children.get(parent)
+            if children is None:
+                children = self.__fetch(parent)
+            stack.extend((child, parent_depth + 1) for child in reversed(children))
+        return rows
+
+    def __subtree_end(self, index: int) -> int:
+        depth = self.__depths[self.__rows[index]]
+        end = index + 1
+        while end < len(self.__rows) and self.__depths[self.__rows[end]] > depth:
+            end += 1
+        return end
+
+    def __replace_subtree(self, index: int) -> tuple:
+        # index の行の子孫の表示行を作り直す
+        hwnd = self.__rows[index]
+        end = self.__subtree_end(index)
+        for removed in self.__rows[index + 1:end]:
+            del self.__depths[removed]
+        rows = self.__flatten(hwnd, self.__depths[hwnd]) if hwnd in self.__expanded else []
+        self.__rows[index + 1:end] = rows
+        return end - index - 1, len(rows)
+
+    def expand(self, hwnd: int) -> int:
+        """ノードを展開する (子ウィンドウが未取得ならここで取得する)
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+
+        Returns:
+            int: 追加された行数
+        """
+        if hwnd in self.__expanded:
+            return 0
+        index = self.index_of(hwnd)
+        self.__expanded.add(hwnd)
+        _, added = self.__replace_subtree(index)
+        self.stats["expands"] += 1
+        return added
+
+    def collapse(self, hwnd: int) -> int:
+        """ノードを畳む (子孫の展開状態は保持する)
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+
+        Returns:
+            int: 取り除かれた行数
+        """
+        if hwnd not in self.__expanded:
+            return 0
+        index = self.index_of(hwnd)
+        self.__expanded.discard(hwnd)
+        removed, _ = self.__replace_subtree(index)
+        self.stats["collapses"] += 1
+        return removed
+
+    def toggle(self, hwnd: int) -> int:
+        """展開されていれば畳み、畳まれていれば展開する
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+
+        Returns:
+            int: 増減した行数
+        """
+        if hwnd in self.__expanded:
+            return -self.collapse(hwnd)
+        return self.expand(hwnd)
+
+    def reveal(self, path: Iterable[int]) -> int:
+        """ルートからのハンドルの経路をたどって展開し、末尾のウィンドウを表示する
+
+        Args:
+            path (Iterable[int]): ルートから対象までのハンドル (先頭はルート)
+
+        Raises:
+            KeyError: 経路が表示中の階層とつながっていない場合
+
+        Returns:
+            int: 末尾のウィンドウの行の位置
+        """
+        path = list(path)
+        for hwnd in path[:-1]:
+            self.expand(hwnd)
+        return self.index_of(path[-1])
+
+    def refresh(self, hwnd: Optional[int] = None) -> int:
+        """子ウィンドウを取得し直し、変わったノードの子孫の行だけを作り直す
+
+        ラベルは次に表示するときに読み出し直す。
+
+        Args:
+            hwnd (Optional[int]): 取得し直すノード。None なら表示中の展開済みノード全て
+
+        Returns:
+            int: 子ウィンドウが変わったノードの数
+        """
+        self.__labels.clear()
+        targets = [hwnd] if hwnd is not None else [row for row in self.__rows if row in self.__expanded]
+        # 表示されていない展開済みノードは次に表示するときに取得し直す
+        for expanded in self.__expanded - set(targets):
+            if expanded not in self.__depths:
+                self.__children.pop(expanded, None)
+        changed = 0
+        for target in targets:
+            if target not in self.__depths:
+                # 祖先の作り直しで取り除かれた
+                continue
+            old = self.__children.get(target)
+            if self.__fetch(target) == old:
+                continue
+            changed += 1
+            self.__replace_subtree(self.index_of(target))
+        self.stats["refreshes"] += 1
+        return changed
+
+
+class RowRecycler:
+    """決まった数の表示行を使い回して、表示範囲の行だけを描画する
+
+    全ての行を描画部品として作る代わりに `height` 個の枠を用意し、スクロールや展開のたびに
+    内容が変わった枠だけを `render` で書き換える。
+    """
+
+    def __init__(self, model: LazyWindowTree, height: int, render: Callable[[int, Optional[TreeRow]], None]):
+        """
+        Args:
+            model (LazyWindowTree): 表示するモデル
+            height (int): 表示行数
+            render (Callable[[int, Optional[TreeRow]], None]): 枠の番号と表示行を受け取り描画する関数。
+                行がない枠には None を渡す
+        """
+        self.model = model
+        self.height = height
+        self.render = render
+        self.first = 0
+        self.stats: Counter = Counter()
+        self.__shown: list[Optional[TreeRow]] = [None] * height
+
+    @property
+    def last_first(self) -> int:
+        """スクロールできる先頭行の最大値
+
+        Returns:
+            int: 先頭行の位置の最大値
+        """
+        return max(len(self.model) - self.height, 0)
+
+    def scroll_to(self, first: int) -> int:
+        """先頭行の位置を変えて描画する
+
+        Args:
+            first (int): 先頭行の位置
+
+        Returns:
+            int: 書き換えた枠の数
+        """
+        self.first = min(max(first, 0), self.last_first)
+        return self.update()
+
+    def scroll(self, delta: int) -> int:
+        """行数を指定してスクロールする
+
+        Args:
+            delta (int): スクロールする行数 (負なら上へ)
+
+        Returns:
+            int: 書き換えた枠の数
+        """
+        return self.scroll_to(self.first + delta)
+
+    def ensure_visible(self, index: int) -> int:
+        """行が表示範囲に入るようにスクロールする
+
+        Args:
+            index (int): 行の位置
+
+        Returns:
+            int: 書き換えた枠の数
+        """
+        if index < self.first:
+            return self.scroll_to(index)
+        if index >= self.first + self.height:
+            return self.scroll_to(index - self.height + 1)
+        return self.update()
+
+    def slot_of(self, hwnd: int) -> Optional[int]:
+        """ウィンドウを表示している枠の番号を取得する
+
+        Args:
+            hwnd (int): ウィンドウハンドル
+
+        Returns:
+            Optional[int]: 枠の番号。表示範囲にない場合は None
+        """
+        for slot, row in enumerate(self.__shown):
+            if row is not None and row.hwnd == hwnd:
+                return slot
+        return None
+
+    def row_at(self, slot: int) -> Optional[TreeRow]:
+        """枠に表示している行を取得する
+
+        Args:
+            slot (int): 枠の番号
+
+        Returns:
+            Optional[TreeRow]: 表示行。行がない枠なら None
+        """
+        return self.__shown[slot]
+
+    def update(self) -> int:
+        """表示範囲の行を取り直し、内容が変わった枠だけを描画する
+
+        Returns:
+            int: 書き換えた枠の数
+        """
+        self.first = min(self.first, self.last_first)
+        rows = self.model.rows(self.first, self.height)
+        rows += [None] * (self.height - len(rows))
+        written = 0
+        for slot, row in enumerate(rows):
+            if row != self.__shown[slot]:
+                self.__shown[slot] = row
+                self.render(slot, row)
+                written += 1
+        self.stats["updates"] += 1
+        self.stats["writes"] += written
+        return written
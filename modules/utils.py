@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import Iterator
 
 import win32con
 
@@ -69,17 +70,96 @@ class ShowWindowCommands(Enum):
     """起動時に指定されたSWフラグに基づいて表示状態を設定します。"""
 
 
-def _get_win32con_constants():
-    """win32conモジュールの定数を取得する
+class _Win32ConstantsMeta(type):
+    def __getattr__(cls, name: str) -> "Win32Constants":
+        # 通常の属性探索で見つからなかった名前 (= 未解決の定数) だけがここに来る
+        if not name.isupper():
+            raise AttributeError(name)
+        try:
+            value = getattr(win32con, name)
+        except AttributeError:
+            raise AttributeError(f"win32con has no constant {name!r}") from None
+        member = cls(name, value)
+        setattr(cls, name, member)
+        return member
 
-    Returns:
-        dict[str, int]: 定数名と値の辞書
+    def __getitem__(cls, name: str) -> "Win32Constants":
+        try:
+            return getattr(cls, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def __contains__(cls, name: str) -> bool:
+        return name.isupper() and hasattr(win32con, name)
+
+    def __call__(cls, *args) -> "Win32Constants":
+        # 旧 Enum と同じく、値1つで呼び出した場合はその値の定数を返す
+        if len(args) != 1:
+            return super().__call__(*args)
+        value = args[0]
+        if isinstance(value, cls):
+            return value
+        try:
+            name = cls._canonical_names().get(value)
+        except TypeError:
+            # ハッシュできない値
+            name = None
+        if name is None:
+            raise ValueError(f"{value!r} is not a valid {cls.__name__}")
+        return getattr(cls, name)
+
+    def __iter__(cls) -> Iterator["Win32Constants"]:
+        return (getattr(cls, name) for name in cls._canonical_names().values())
+
+    def __len__(cls) -> int:
+        return len(cls._canonical_names())
+
+    def _canonical_names(cls) -> dict:
+        # 値 → 定数名 (同じ値の定数が複数ある場合は名前順で最初のもの)。値での参照や列挙で初めて win32con を走査する
+        names = cls.__dict__.get("_canonical")
+        if names is None:
+            names = {}
+            for name in dir(win32con):
+                if not name.isupper():
+                    continue
+                value = getattr(win32con, name)
+                try:
+                    names.setdefault(value, name)
+                except TypeError:
+                    continue
+            cls._canonical = names
+        return names
+
+
+class Win32Constants(metaclass=_Win32ConstantsMeta):
+    """### win32conモジュールの定数
+
+    `Win32Constants.WM_CLOSE` のように参照した時点で win32con から値を取得し、以降はクラス属性として保持する。
+    import 時に win32con 全体を走査しないため起動が速い。
+
+    同じ値を持つ定数 (`SW_NORMAL` と `SW_SHOWNORMAL` など) は、それぞれ参照した名前を `name` に保持したまま
+    値で等価比較される。
+
+    以前の Enum と同じく `Win32Constants(0x0010)` で値から定数を引け、`for constant in Win32Constants` で
+    全ての定数を列挙できる。この2つは初回に win32con を走査し、同じ値の定数は名前順で最初のものにまとめる。
+
+    Attributes:
+        name (str): 定数名
+        value (int): 定数の値
     """
-    constants = {}
-    for attr in dir(win32con):
-        if attr.isupper():
-            value = getattr(win32con, attr)
-            constants[attr] = value
-    return constants
-
-Win32Constants = Enum('Win32Constants', _get_win32con_constants())
\ No newline at end of file
+    __slots__ = ("name", "value")
+
+    def __init__(self, name: str, value):
+        self.name = name
+        self.value = value
+
+    def __repr__(self) -> str:
+        return f"<Win32Constants.{self.name}: {self.value!r}>"
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Win32Constants):
+            return self.value == other.value
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.value)
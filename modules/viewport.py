@@ -0,0 +1,175 @@
+"""ウィンドウ構成ビューアの表示範囲計算
+
+Tk に依存しないため、ズーム・パン・表示範囲外の間引きをヘッドレスで検証できる。
+"""
+from typing import Iterable, NamedTuple, Optional
+
+from .hit_test import HitTestIndex
+from .snapshot import WindowSnapshot, WindowTree
+
+
+class Viewport:
+    """スクリーン座標 (ウィンドウ座標) と画面上のピクセル座標の対応
+
+    画面の左上に表示されるスクリーン座標 (`origin_x`, `origin_y`) と、
+    スクリーン座標1単位あたりのピクセル数 (`scale`) で表示範囲を表す。
+    """
+
+    def __init__(self, world: tuple, width: int, height: int):
+        """
+        Args:
+            world (tuple): 表示対象全体の矩形 (left, top, right, bottom)
+            width (int): 表示領域の幅 (ピクセル)
+            height (int): 表示領域の高さ (ピクセル)
+        """
+        self.world = tuple(world)
+        self.width = width
+        self.height = height
+        self.scale = 1.0
+        self.origin_x = 0.0
+        self.origin_y = 0.0
+        self.fit()
+
+    def fit(self) -> None:
+        """表示対象全体が収まるように表示範囲を合わせる"""
+        x1, y1, x2, y2 = self.world
+        self.scale = min(self.width / max(x2 - x1, 1), self.height / max(y2 - y1, 1))
+        self.origin_x, self.origin_y = x1, y1
+
+    def resize(self, width: int, height: int) -> None:
+        """表示領域の大きさを変更する (左上と倍率は保つ)
+
+        Args:
+            width (int): 表示領域の幅 (ピクセル)
+            height (int): 表示領域の高さ (ピクセル)
+        """
+        self.width, self.height = width, height
+
+    def to_screen(self, rect: tuple) -> tuple:
+        """スクリーン座標の矩形を表示領域のピクセル座標に変換する
+
+        Args:
+            rect (tuple): (left, top, right, bottom)
+
+        Returns:
+            tuple: 表示領域上の (left, top, right, bottom)
+        """
+        x1, y1, x2, y2 = rect
+        return (
+            (x1 - self.origin_x) * self.scale,
+            (y1 - self.origin_y) * self.scale,
+            (x2 - self.origin_x) * self.scale,
+            (y2 - self.origin_y) * self.scale,
+        )
+
+    def to_world(self, x: float, y: float) -> tuple:
+        """表示領域のピクセル座標をスクリーン座標に変換する
+
+        Args:
+            x (float): 表示領域上のx
+            y (float): 表示領域上のy
+
+        Returns:
+            tuple: スクリーン座標の (x, y)
+        """
+        return (self.origin_x + x / self.scale, self.origin_y + y / self.scale)
+
+    @property
+    def visible_world(self) -> tuple:
+        """表示されているスクリーン座標の範囲
+
+        Returns:
+            tuple: (left, top, right, bottom)
+        """
+        x1, y1 = self.to_world(0, 0)
+        x2, y2 = self.to_world(self.width, self.height)
+        return (x1, y1, x2, y2)
+
+    def zoom(self, factor: float, x: Optional[float] = None, y: Optional[float] = None) -> None:
+        """表示領域上の点を中心に拡大・縮小する
+
+        Args:
+            factor (float): 倍率 (1より大きいと拡大)
+            x (Optional[float]): 中心にする表示領域上のx。None なら表示領域の中央
+            y (Optional[float]): 中心にする表示領域上のy。None なら表示領域の中央
+        """
+        x = self.width / 2 if x is None else x
+        y = self.height / 2 if y is None else y
+        anchor_x, anchor_y = self.to_world(x, y)
+        self.scale *= factor
+        self.origin_x = anchor_x - x / self.scale
+        self.origin_y = anchor_y - y / self.scale
+
+    def pan(self, dx: float, dy: float) -> None:
+        """表示範囲を移動する
+
+        Args:
+            dx (float): 内容を右に動かすピクセル数
+            dy (float): 内容を下に動かすピクセル数
+        """
+        self.origin_x -= dx / self.scale
+        self.origin_y -= dy / self.scale
+
+
+class LayoutItem(NamedTuple):
+    """表示領域に描画する要素1つ分
+
+    Attributes:
+        hwnd (int): ウィンドウハンドル
+        class_name (str): ウィンドウクラス名
+        bounds (tuple): 表示領域上の (left, top, right, bottom)
+        label (Optional[str]): 表示するラベル。ラベルを付けない場合は None
+    """
+    hwnd: int
+    class_name: str
+    bounds: tuple
+    label: Optional[str]
+
+
+class ViewportLayout:
+    """表示範囲に入る要素だけを選び出すレイアウト計算
+
+    要素の矩形を空間インデックスに登録しておき、表示範囲と重なるものだけを取り出す。
+    表示サイズが小さすぎる要素は描画せず、ラベルは十分な大きさのものに件数を限って付ける。
+    """
+
+    def __init__(self, tree: WindowTree, snapshots: Optional[Iterable[WindowSnapshot]] = None):
+        """
+        Args:
+            tree (WindowTree): 対象とするスナップショット
+            snapshots (Optional[Iterable[WindowSnapshot]]): 表示する要素。None ならツリー全体
+        """
+        self.index = HitTestIndex(tree, snapshots=snapshots)
+
+    def visible_items(
+            self,
+            viewport: Viewport,
+            *,
+            min_pixels: float = 2.0,
+            label_min_pixels: float = 40.0,
+            max_labels: int = 300
+        ) -> list[LayoutItem]:
+        """表示範囲に描画する要素を取得する
+
+        Args:
+            viewport (Viewport): 表示範囲
+            min_pixels (float): 描画する要素の最小の幅・高さ (ピクセル)
+            label_min_pixels (float): ラベルを付ける要素の最小の幅 (ピクセル)
+            max_labels (int): ラベルの最大数 (大きい要素から優先)
+
+        Returns:
+            list[LayoutItem]: 描画する要素 (親が子より先)
+        """
+        items = []
+        labeled = []
+        for snapshot in self.index.query_rect(*viewport.visible_world):
+            bounds = viewport.to_screen(snapshot.rect)
+            width, height = bounds[2] - bounds[0], bounds[3] - bounds[1]
+            if width < min_pixels or height < min_pixels:
+                continue
+            if width >= label_min_pixels:
+                labeled.append((-width * height, len(items)))
+            items.append(LayoutItem(snapshot.hwnd, snapshot.class_name, bounds, None))
+        for _, position in sorted(labeled)[:max_labels]:
+            items[position] = items[position]._replace(label=str(items[position].hwnd))
+        return items
@@ -0,0 +1,244 @@
+"""ポーリングによる待機
+
+同じ `WindowPoller` で待っている全ての待機は1つのポーリングループを共有し、
+トップレベルウィンドウの列挙も1回の判定につき1度だけ行う。
+"""
+import threading
+import time
+from typing import Callable, Optional
+
+import win32gui
+
+from .window import Window
+from .query import WindowQuery
+
+
+class PollMetrics:
+    """ポーリングの統計
+
+    Attributes:
+        polls (int): 判定を行った回数 (ticks)
+        enumerations (int): トップレベルウィンドウを列挙した回数
+        checks (int): 待機条件を評価した回数 (待機ごとに数える)
+        slept (float): 次の判定まで待った秒数の合計
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """統計をリセットする"""
+        self.polls = 0
+        self.enumerations = 0
+        self.checks = 0
+        self.slept = 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"PollMetrics(polls={self.polls}, enumerations={self.enumerations}, "
+            f"checks={self.checks}, slept={self.slept:.3f})"
+        )
+
+
+class _Waiter:
+    __slots__ = ("check", "needs_windows", "deadline", "done", "result", "error")
+
+    def __init__(self, check: Callable[[Optional[list[int]]], object], needs_windows: bool, deadline: Optional[float]):
+        self.check = check
+        self.needs_windows = needs_windows
+        self.deadline = deadline
+        self.done = False
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class WindowPoller:
+    """条件が満たされるまでウィンドウを定期的に調べる
+
+    判定の間隔は `initial_interval` から始まり、条件が満たされない間は `factor` 倍ずつ `max_interval` まで伸びる。
+    新しい待機が加わったときや、トップレベルウィンドウの構成が変わったときは最初の間隔に戻す。
+    複数スレッドから同時に待機した場合は、いずれか1つのスレッドがまとめて判定を行う。
+    条件の評価で発生した例外は、判定を行ったスレッドではなくその条件で待機しているスレッドで送出する。
+
+    既定値は 0.5 秒間隔の固定ポーリングと比べて、1秒以内に現れるウィンドウを約半分の遅延で見つけ、
+    長い待機でも遅延は同程度、列挙の増加は待機の長さによらず数回で済むように選んでいる (`benchmark.py wait` の平均値を参照)。
+    長い待機の列挙を減らしたい場合は `max_interval` を、短い待機の遅延を縮めたい場合は `initial_interval` を調整する。
+
+        poller = WindowPoller()
+        dialog = poller.wait_for_window(WindowQuery(name_contains="保存"), timeout=10)
+    """
+
+    def __init__(
+            self,
+            *,
+            initial_interval: float = 0.05,
+            max_interval: float = 0.5,
+            factor: float = 1.5,
+            clock: Callable[[], float] = time.monotonic,
+            sleep: Callable[[float], None] = time.sleep
+        ):
+        """
+        Args:
+            initial_interval (float): 最初の判定間隔 (秒)
+            max_interval (float): 判定間隔の上限 (秒)
+            factor (float): 条件が満たされなかったときに間隔に掛ける倍率
+            clock (Callable[[], float]): 現在時刻 (秒) を返す関数
+            sleep (Callable[[float], None]): 待機に使う関数
+        """
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.clock = clock
+        self.sleep = sleep
+        self.metrics = PollMetrics()
+        self.__interval = initial_interval
+        self.__waiters: list[_Waiter] = []
+        self.__previous_hwnds: Optional[list[int]] = None
+        self.__driving = False
+        self.__condition = threading.Condition()
+
+    def wait_for_window(self, query: WindowQuery, timeout: Optional[float] = None) -> Optional[Window]:
+        """条件に合致するトップレベルウィンドウが現れるまで待つ
+
+        Args:
+            query (WindowQuery): 検索条件
+            timeout (Optional[float]): 待機する最大秒数。None なら無期限
+
+        Returns:
+            Optional[Window]: 最初に見つかったウィンドウ。タイムアウトした場合は None
+        """
+        def _check(hwnds: list[int]) -> Optional[Window]:
+            for hwnd in hwnds:
+                try:
+                    if query.matches(hwnd):
+                        return Window(hwnd)
+                except win32gui.error:
+                    # 判定中に破棄された
+                    continue
+            return None
+
+        return self.__wait(_check, True, timeout)
+
+    def wait_until(
+            self,
+            window: Window,
+            predicate: Callable[[Window], bool],
+            timeout: Optional[float] = None
+        ) -> bool:
+        """ウィンドウが条件を満たすまで待つ
+
+        判定のたびにウィンドウのキャッシュを破棄し、最新の属性で評価する。
+
+        Args:
+            window (Window): 対象のウィンドウ
+            predicate (Callable[[Window], bool]): 満たすべき条件
+            timeout (Optional[float]): 待機する最大秒数。None なら無期限
+
+        Raises:
+            Exception: `predicate` が送出した例外 (`win32gui.error` を除く)
+
+        Returns:
+            bool: 条件を満たしたか (タイムアウトした場合は False)
+        """
+        def _check(hwnds) -> Optional[bool]:
+            window.invalidate()
+            try:
+                return True if predicate(window) else None
+            except win32gui.error:
+                return None
+
+        return self.__wait(_check, False, timeout) is not None
+
+    def __wait(self, check, needs_windows: bool, timeout: Optional[float]):
+        waiter = _Waiter(check, needs_windows, None if timeout is None else self.clock() + timeout)
+        with self.__condition:
+            self.__waiters.append(waiter)
+            self.__interval = self.initial_interval
+            try:
+                while not waiter.done:
+                    if self.__driving:
+                        self.__condition.wait()
+                        continue
+                    self.__driving = True
+                    try:
+                        self.__drive(waiter)
+                    finally:
+                        self.__driving = False
+                        self.__condition.notify_all()
+            finally:
+                # 判定を行うスレッドで例外が発生した場合も、他の待機が評価し続けないよう取り除く
+                if waiter in self.__waiters:
+                    self.__waiters.remove(waiter)
+        if waiter.error is not None:
+            raise waiter.error
+        return waiter.result
+
+    def __drive(self, own: _Waiter) -> None:
+        # ロックを保持した状態で呼ばれ、列挙と待機の間だけロックを手放す
+        while True:
+            waiters = list(self.__waiters)
+            self.__condition.release()
+            try:
+                changed = self.__tick(waiters)
+            finally:
+                self.__condition.acquire()
+            self.__waiters = [waiter for waiter in self.__waiters if not waiter.done]
+            self.__condition.notify_all()
+            if own.done:
+                return
+            if changed:
+                self.__interval = self.initial_interval
+            delay = self.__interval
+            self.__interval = min(self.__interval * self.factor, self.max_interval)
+            deadlines = [waiter.deadline for waiter in self.__waiters if waiter.deadline is not None]
+            if deadlines:
+                delay = max(0.0, min(delay, min(deadlines) - self.clock()))
+            self.metrics.slept += delay
+            self.__condition.release()
+            try:
+                self.sleep(delay)
+            finally:
+                self.__condition.acquire()
+
+    def __tick(self, waiters: list[_Waiter]) -> bool:
+        # 全ての待機条件を1度ずつ評価し、トップレベルウィンドウの構成が変わったかを返す
+        now = self.clock()
+        hwnds = None
+        changed = False
+        if any(waiter.needs_windows for waiter in waiters):
+            hwnds = []
+            win32gui.EnumWindows(lambda hwnd, results: results.append(hwnd), hwnds)
+            self.metrics.enumerations += 1
+            changed = self.__previous_hwnds is not None and hwnds != self.__previous_hwnds
+            self.__previous_hwnds = hwnds
+        self.metrics.polls += 1
+        for waiter in waiters:
+            self.metrics.checks += 1
+            try:
+                result = waiter.check(hwnds)
+            except Exception as error:
+                # 判定を行っているスレッドではなく、待機しているスレッドで送出する
+                waiter.error = error
+                waiter.done = True
+                continue
+            if result is not None:
+                waiter.result = result
+                waiter.done = True
+            elif waiter.deadline is not None and now >= waiter.deadline:
+                waiter.done = True
+        return changed
+
+
+_default_poller: Optional[WindowPoller] = None
+
+
+def default_poller() -> WindowPoller:
+    """`Desktop.wait_for` などが既定で使うポーラーを取得する
+
+    Returns:
+        WindowPoller: 共有のポーラー
+    """
+    global _default_poller
+    if _default_poller is None:
+        _default_poller = WindowPoller()
+    return _default_poller
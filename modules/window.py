@@ -1,27 +1,67 @@
-from typing import Optional
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Optional
 
 import win32gui
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import tkinter as tk
-import itertools
 
 from modules.utils import SWPFlags, ShowWindowCommands, Win32Constants
+from modules.snapshot import WindowSnapshot, WindowTree
+from modules.records import WindowRecords
+from modules.export import Target, export_windows
+from modules.hit_test import HitTestIndex
+from modules.enumeration import iter_descendant_hwnds, iter_enum
+from modules.filtering import AttributeIndex
+from modules.cache import AttributeCache
+from modules.messages import resolve_message
+from modules.diff import WindowChange, watch
+from modules.events import EventKind, WindowEventStream
+from modules.locator import default_resolver
+
+if TYPE_CHECKING:
+    from modules.dispatcher import MessageDispatcher
+    from modules.waiting import WindowPoller
+
+
+RECURSIVE_FIELDS = frozenset({"children", "children_hwnds", "parent"})
+"""`to_dict` の出力のうち、他のウィンドウの列挙・参照や生成を伴うフィールド"""
+
+OPT_IN_FIELDS = frozenset({"level", "hwnd_path", "locator"})
+"""`to_dict` の `fields` で名前を指定した場合だけ出力するフィールド
+
+祖先や兄弟ウィンドウをたどるため高価であり、既定の出力のキーも従来のまま保つ。
+"""
+
+
+@lru_cache(maxsize=None)
+def _exported_fields(cls: type) -> tuple:
+    # クラス (と基底クラス) で定義されたプロパティ名を名前順に並べる
+    names = {name for klass in cls.__mro__ for name, value in vars(klass).items() if isinstance(value, property)}
+    return tuple(sorted(name for name in names if not name.startswith("_")))
 
 
 class Window:
-    def __init__(self, hwnd):
+    def __init__(
+            self,
+            hwnd,
+            tree: Optional[WindowTree] = None,
+            *,
+            cache: Optional[AttributeCache] = None,
+            cache_ttl: Optional[float] = None
+        ):
+        """
+        Args:
+            hwnd (int | str): ウィンドウハンドル (文字列の場合は16進数)
+            tree (Optional[WindowTree]): 属性の読み出し元とするスナップショット
+            cache (Optional[AttributeCache]): 属性のキャッシュ。複数の `Window` で共有できる
+            cache_ttl (Optional[float]): `cache` を指定しない場合に、この有効期限で専用のキャッシュを作る
+        """
         if isinstance(hwnd, str):
             hwnd = int(hwnd, 16)
+        if cache is None and cache_ttl is not None:
+            cache = AttributeCache(cache_ttl)
         self.__hwnd: int = hwnd
-        # parents_hwnds = []
-        # while True:
-        #     parents_hwnd = self.parent_hwnd
-        #     if parents_hwnd is None:
-        #         break
-        #     parents_hwnds.append(parents_hwnd)
-        # self.__level: int = len(parents_hwnds)
-        # self.__hwnd_path: str = "/".join(parents_hwnds[::-1]) + "/" + str(self.hwnd).lstrip('/')
+        self.__tree: Optional[WindowTree] = tree
+        self.__cache: Optional[AttributeCache] = cache
+        self.__hit_test_index: Optional[HitTestIndex] = None
 
     def __str__(self) -> str:
         return f'[{self.hwnd}] {self.text}'
@@ -29,13 +69,46 @@ class Window:
     def __repr__(self):
         return f'[{self.hwnd}] {self.text}'
 
-    def to_dict(self):
-        result = {}
-        for name in dir(self):
-            value = getattr(self, name)
-            if not name.startswith('__') and not callable(value) and isinstance(type(self).__dict__.get(name), property):
-                result[name] = value
-        return result
+    @classmethod
+    def field_names(cls, recursive: bool = True) -> tuple:
+        """`to_dict` が既定で出力するフィールド名
+
+        `OPT_IN_FIELDS` は含まない。
+
+        Args:
+            recursive (bool): 子・親など他のウィンドウの列挙や生成を伴うフィールドを含めるか
+
+        Returns:
+            tuple[str, ...]: フィールド名 (名前順)
+        """
+        fields = tuple(name for name in _exported_fields(cls) if name not in OPT_IN_FIELDS)
+        if recursive:
+            return fields
+        return tuple(name for name in fields if name not in RECURSIVE_FIELDS)
+
+    def to_dict(self, fields: Optional[Iterable[str]] = None, *, recursive: bool = True) -> dict:
+        """プロパティの値を dict にまとめる
+
+        フィールド名はクラスごとに1度だけ求め、指定されたフィールドのプロパティだけを評価する。
+
+        Args:
+            fields (Optional[Iterable[str]]): 出力するフィールド名。None なら `OPT_IN_FIELDS` 以外の全てのフィールド
+            recursive (bool): `fields` を省略したときに、子・親など他のウィンドウの列挙や生成を伴うフィールドを含めるか
+
+        Raises:
+            ValueError: 存在しないフィールド名が指定された場合
+
+        Returns:
+            dict: フィールド名と値の dict
+        """
+        if fields is None:
+            fields = self.field_names(recursive)
+        else:
+            fields = tuple(fields)
+            unknown = set(fields).difference(_exported_fields(type(self)))
+            if unknown:
+                raise ValueError(f"unknown fields: {sorted(unknown)}")
+        return {name: getattr(self, name) for name in fields}
 
     @property
     def hwnd(self) -> int:
@@ -46,23 +119,73 @@ class Window:
         """
         return self.__hwnd
 
-    # @property
-    # def level(self) -> int:
-    #     """ウィンドウの階層レベル
+    def __get_snapshot(self) -> Optional[WindowSnapshot]:
+        if self.__tree is None:
+            return None
+        return self.__tree.get(self.__hwnd)
+
+    def __read(self, name: str, fetch: Callable[[], Any]) -> Any:
+        # スナップショット → キャッシュ → win32gui の順に属性を読む
+        snapshot = self.__get_snapshot()
+        if snapshot is not None:
+            return getattr(snapshot, name)
+        if self.__cache is not None:
+            return self.__cache.get(self.__hwnd, name, fetch)
+        return fetch()
+
+    def __related(self, hwnd: int) -> "Window":
+        return Window(hwnd, tree=self.__tree, cache=self.__cache)
+
+    def invalidate(self, *names: str) -> None:
+        """キャッシュした属性を破棄する
+
+        Args:
+            *names (str): 破棄する属性名。省略時は全ての属性
+        """
+        if self.__cache is not None:
+            self.__cache.invalidate(self.__hwnd, *names)
+
+    def __ancestor_hwnds(self) -> tuple:
+        # 祖先の経路は共有のリゾルバーが覚えているため、同じ祖先を持つウィンドウでは親をたどり直さない
+        snapshot = self.__get_snapshot()
+        if snapshot is None:
+            return default_resolver().ancestors(self.hwnd)
+        chain = tuple(ancestor.hwnd for ancestor in reversed(self.__tree.ancestors_of(self.hwnd)))
+        top = chain[0] if chain else self.hwnd
+        if self.__tree[top].parent_hwnd is None:
+            return chain
+        # ツリーのルートより上は実際のウィンドウをたどる
+        return default_resolver().ancestors(top) + chain
+
+    @property
+    def level(self) -> int:
+        """ウィンドウの階層レベル
+
+        Returns:
+            int: ウィンドウの階層レベル (トップレベルウィンドウは0)
+        """
+        return len(self.__ancestor_hwnds())
+
+    @property
+    def hwnd_path(self) -> str:
+        """ウィンドウのハンドルパス
 
-    #     Returns:
-    #         int: ウィンドウの階層レベル
-    #     """
-    #     return self.__level
+        Returns:
+            str: トップレベルウィンドウからのハンドルを "/" で区切ったパス
+        """
+        return "/".join(str(hwnd) for hwnd in self.__ancestor_hwnds() + (self.hwnd,))
+
+    @property
+    def locator(self) -> str:
+        """実行ごとに変わらないウィンドウの指定 (クラス名と同じクラスの兄弟の中での順番の経路)
 
-    # @property
-    # def hwnd_path(self) -> str:
-    #     """ウィンドウのハンドルパス
+        `Desktop.locate` で再びウィンドウに解決できる。スナップショットがある場合はツリーの兄弟とクラス名から作る。
+        兄弟の列挙を伴うため、`to_dict` では名前を指定した場合だけ出力する。
 
-    #     Returns:
-    #         str: ウィンドウのハンドルパス
-    #     """
-    #     return self.__hwnd_path
+        Returns:
+            str: ロケーター (例: "Notepad/Edit")
+        """
+        return str(default_resolver().locate(self.hwnd, tree=self.__tree))
 
     @property
     def text(self) -> str:
@@ -71,7 +194,7 @@ class Window:
         Returns:
             str: ウィンドウタイトル
         """
-        return win32gui.GetWindowText(self.hwnd)
+        return self.__read("text", lambda: win32gui.GetWindowText(self.hwnd))
 
     @property
     def class_name(self) -> str:
@@ -80,7 +203,7 @@ class Window:
         Returns:
             str: ウィンドウクラス名
         """
-        return win32gui.GetClassName(self.hwnd)
+        return self.__read("class_name", lambda: win32gui.GetClassName(self.hwnd))
 
     @property
     def rect(self) -> tuple:
@@ -89,7 +212,7 @@ class Window:
         Returns:
             tuple: ウィンドウの位置とサイズ (left, top, right, bottom)
         """
-        return win32gui.GetWindowRect(self.hwnd)
+        return self.__read("rect", lambda: win32gui.GetWindowRect(self.hwnd))
 
     @property
     def is_iconic(self) -> bool:
@@ -98,7 +221,7 @@ class Window:
         Returns:
             bool: 最小化フラグ
         """
-        return bool(win32gui.IsIconic(self.hwnd))
+        return self.__read("is_iconic", lambda: bool(win32gui.IsIconic(self.hwnd)))
 
     @property
     def parent_hwnd(self) -> int | None:
@@ -107,10 +230,7 @@ class Window:
         Returns:
             int | None: 親ウィンドウのハンドル
         """
-        parent = win32gui.GetParent(self.hwnd)
-        if parent == 0:
-            return None
-        return parent
+        return self.__read("parent_hwnd", lambda: win32gui.GetParent(self.hwnd) or None)
 
     @property
     def parent(self) -> Optional["Window"]:
@@ -122,7 +242,7 @@ class Window:
         parent = self.parent_hwnd
         if parent is None:
             return None
-        return Window(parent)
+        return self.__related(parent)
 
     @property
     def children_hwnds(self) -> list[int]:
@@ -131,6 +251,8 @@ class Window:
         Returns:
             list[int]: 子ウィンドウのハンドル一覧
         """
+        if self.__get_snapshot() is not None:
+            return self.__tree.descendant_hwnds_of(self.hwnd)
         children = []
         win32gui.EnumChildWindows(self.hwnd, lambda hwnd, children: children.append(hwnd), children)
         return children
@@ -142,7 +264,46 @@ class Window:
         Returns:
             list[WindowObj]: 子ウィンドウ一覧
         """
-        return [Window(hwnd) for hwnd in self.children_hwnds]
+        return [self.__related(hwnd) for hwnd in self.children_hwnds]
+
+    def iter_children(self) -> Iterator["Window"]:
+        """子ウィンドウを列挙しながら逐次取得する
+
+        `children` と同じく全ての子孫を列挙順に返すが、一覧を作らずに1件ずつ yield する。
+        途中でイテレーションをやめると列挙も打ち切られる。
+
+        Yields:
+            Window: 子ウィンドウ
+        """
+        if self.__get_snapshot() is not None:
+            for hwnd in self.__tree.descendant_hwnds_of(self.hwnd):
+                yield self.__related(hwnd)
+            return
+        for hwnd in iter_enum(win32gui.EnumChildWindows, self.hwnd):
+            yield self.__related(hwnd)
+
+    def iter_descendants(self, max_depth: Optional[int] = None) -> Iterator["Window"]:
+        """指定した深さまでの子孫ウィンドウを列挙しながら逐次取得する
+
+        `max_depth` を指定した場合は子を1段ずつたどるため、それより深い階層は列挙しない。
+
+        Args:
+            max_depth (Optional[int]): 自身から数えた最大の深さ (1 なら直下の子のみ)。None なら制限なし
+
+        Yields:
+            Window: 子孫ウィンドウ (前順)
+        """
+        if max_depth is None:
+            yield from self.iter_children()
+            return
+        if self.__get_snapshot() is not None:
+            base = self.__tree[self.hwnd].depth
+            for hwnd in self.__tree.descendant_hwnds_of(self.hwnd):
+                if self.__tree[hwnd].depth - base <= max_depth:
+                    yield self.__related(hwnd)
+            return
+        for hwnd, _ in iter_descendant_hwnds(self.hwnd, max_depth):
+            yield self.__related(hwnd)
 
     @property
     def is_active(self) -> bool:
@@ -151,6 +312,8 @@ class Window:
         Returns:
             bool: アクティブフラグ
         """
+        if self.__get_snapshot() is not None:
+            return self.__tree.foreground_hwnd == self.hwnd
         return win32gui.GetForegroundWindow() == self.hwnd
 
     @property
@@ -160,7 +323,7 @@ class Window:
         Returns:
             tuple: クライアント領域の位置とサイズ (left, top, right, bottom)
         """
-        return win32gui.GetClientRect(self.hwnd)
+        return self.__read("client_rect", lambda: win32gui.GetClientRect(self.hwnd))
 
     @property
     def is_visible(self) -> bool:
@@ -169,41 +332,213 @@ class Window:
         Returns:
             bool: 表示フラグ
         """
-        return bool(win32gui.IsWindowVisible(self.hwnd))
+        return self.__read("is_visible", lambda: bool(win32gui.IsWindowVisible(self.hwnd)))
+
+    def snapshot(self) -> WindowTree:
+        """自身以下の階層を1回の列挙で取得する
+
+        Returns:
+            WindowTree: 自身をルートとするスナップショット
+        """
+        return WindowTree.capture(self.hwnd)
+
+    def records(self) -> WindowRecords:
+        """自身以下の階層を列指向のレコードとして取得する
+
+        Returns:
+            WindowRecords: 自身をルートとするレコード
+        """
+        return WindowRecords.capture(self.hwnd)
+
+    def export(self, target: Target, **kwargs) -> int:
+        """自身以下の階層を1行1ウィンドウで逐次書き出す
+
+        Args:
+            target (str | os.PathLike | IO): 書き出し先 (`.gz` なら gzip 圧縮、`.parquet` なら Parquet)
+            **kwargs: `modules.export.export_windows` のオプション (format, compress, batch_size)
+
+        Returns:
+            int: 書き出した行数
+        """
+        return export_windows([self.hwnd], target, **kwargs)
+
+    def watch(self, interval: float = 0.5, **kwargs) -> Iterator[list[WindowChange]]:
+        """自身以下の階層を定期的に取得し、変化があったときだけ差分を返す
+
+        Args:
+            interval (float): 取得間隔 (秒)
+            **kwargs: `modules.diff.watch` のオプション
+
+        Yields:
+            list[WindowChange]: 前回の取得からの変化
+        """
+        return watch(self.snapshot, interval, **kwargs)
+
+    def wait_for(
+            self,
+            condition,
+            timeout: Optional[float] = None,
+            *,
+            stream: Optional[WindowEventStream] = None
+        ) -> bool:
+        """自身のウィンドウイベントを待つ
+
+        `condition` に `EventKind` を渡すとその種類のイベントが届くまで待つ。
+        関数を渡すと最初に1度評価し、以降は自身のイベントが届くたびに最新の属性で評価し直す。
+
+            window.wait_for(lambda w: w.text == "完了", timeout=10)
+            window.wait_for(EventKind.DESTROYED)
+
+        Args:
+            condition (EventKind | Callable[[Window], bool]): 待つイベントの種類、または満たすべき条件
+            timeout (Optional[float]): 待機する最大秒数。None なら無期限
+            stream (Optional[WindowEventStream]): 使用するイベントストリーム。None なら WinEvent フックから作る。
+                開いていなければここで開き、戻る前に閉じる
+
+        Returns:
+            bool: 条件を満たしたか (タイムアウトした場合や、条件を満たす前にウィンドウが破棄された場合は False)
+        """
+        stream = WindowEventStream() if stream is None else stream
+        # ここで開いたストリームは戻る前に閉じる (呼び出し側が開いたものは開いたままにする)
+        owned = not stream.is_open
+        live = Window(self.hwnd) if self.__tree is not None else self
+        stream.open()
+        try:
+            if isinstance(condition, EventKind):
+                return stream.wait_for(lambda e: e.hwnd == self.hwnd and e.kind is condition, timeout) is not None
+
+            def _check() -> bool:
+                live.invalidate()
+                try:
+                    return bool(condition(live))
+                except win32gui.error:
+                    return False
+
+            if _check():
+                return True
+            destroyed = False
+
+            def _predicate(event) -> bool:
+                nonlocal destroyed
+                if event.hwnd != self.hwnd:
+                    return False
+                if event.kind is EventKind.DESTROYED:
+                    destroyed = True
+                    return True
+                return _check()
+
+            return stream.wait_for(_predicate, timeout) is not None and not destroyed
+        finally:
+            if owned:
+                stream.close()
+
+    def wait_until(
+            self,
+            predicate: Callable[["Window"], bool],
+            timeout: Optional[float] = None,
+            *,
+            poller: Optional["WindowPoller"] = None
+        ) -> bool:
+        """ポーリングでウィンドウが条件を満たすまで待つ
+
+        判定間隔は条件が満たされない間だけ伸びていき、満たされた時点ですぐに戻る。
+
+            window.wait_until(lambda w: w.is_visible, timeout=5)
+
+        Args:
+            predicate (Callable[[Window], bool]): 満たすべき条件
+            timeout (Optional[float]): 待機する最大秒数。None なら無期限
+            poller (Optional[WindowPoller]): 使用するポーラー。None なら共有のもの
+
+        Returns:
+            bool: 条件を満たしたか (タイムアウトした場合は False)
+        """
+        from modules.waiting import default_poller
+        live = Window(self.hwnd, cache=self.__cache) if self.__tree is not None else self
+        return (poller or default_poller()).wait_until(live, predicate, timeout)
+
+    def with_snapshot(self) -> "Window":
+        """スナップショットから属性を読む自身のコピーを取得する
+
+        Returns:
+            Window: スナップショットを参照する `Window`
+        """
+        return Window(self.hwnd, tree=self.snapshot())
 
     def get_filtered_children(self, **kwargs) -> list["Window"]:
         """条件に合致する子ウィンドウを取得する
 
+        各子ウィンドウの属性は条件に使うものだけを1度ずつ読み出す。
+        条件には値 (完全一致)、list / set (いずれかに一致)、`Prefix`、`re.Pattern`、述語関数を指定できる。
+
         Args:
             **kwargs: フィルター条件
 
         Returns:
-            list[WindowObj]: フィルターされた子ウィンドウ一覧
-        """
-        children = self.children
-        for key, value in kwargs.items():
-            if not isinstance(value, list):
-                value = [value]
-            joined_children = []
-            for v in value:
-                joined_children += [child for child in children if v == getattr(child, key)]
-            children = joined_children
-        return children
+            list[WindowObj]: フィルターされた子ウィンドウ一覧 (重複なし、列挙順)
+        """
+        return AttributeIndex(self.children).filter(**kwargs)
+
+    def hit_test_index(self, **kwargs) -> HitTestIndex:
+        """自身以下の階層を1回の列挙で取得し、座標検索用のインデックスを構築する
 
-    def get_children_in_hierarchy_on_coordinate(self, x: int, y: int) -> list:
-        options = []
+        ドラッグ中など同じ階層に繰り返し座標を問い合わせる場合はこれを使い回す。
+        スナップショットから生成した `Window` では列挙せずにそのスナップショットの部分木から構築し、
+        オプションを指定しなければ構築したインデックスを覚えておいて使い回す。
 
-        def recursive_callback(hwnd, param):
-            rect = win32gui.GetWindowRect(hwnd)
-            if rect[0] <= x <= rect[2] and rect[1] <= y <= rect[3]:
-                print(f"hit: {hwnd}")
-                window = Window(hwnd)
-                options.append(window)
-                win32gui.EnumChildWindows(hwnd, recursive_callback, 0)
-            return True
+        Args:
+            **kwargs: `HitTestIndex` に渡すオプション
+
+        Returns:
+            HitTestIndex: 座標検索用のインデックス
+        """
+        snapshot = self.__get_snapshot()
+        if snapshot is None:
+            return HitTestIndex(self.snapshot(), **kwargs)
+        if kwargs:
+            return HitTestIndex(self.__tree, snapshots=self.__subtree_snapshots(snapshot), **kwargs)
+        if self.__hit_test_index is None:
+            self.__hit_test_index = HitTestIndex(self.__tree, snapshots=self.__subtree_snapshots(snapshot))
+        return self.__hit_test_index
+
+    def __subtree_snapshots(self, snapshot: WindowSnapshot) -> list[WindowSnapshot]:
+        return [snapshot] + self.__tree.descendants_of(self.hwnd)
+
+    def get_children_in_hierarchy_on_coordinate(
+            self,
+            x: int,
+            y: int,
+            index: Optional[HitTestIndex] = None
+        ) -> list["Window"]:
+        """座標を含む子孫ウィンドウを取得する
+
+        `index` を指定しない場合、ライブの `Window` では呼び出しのたびに階層を取得し直す
+        (スナップショットから生成した `Window` では `hit_test_index` が覚えているインデックスを使う)。
+        同じ階層に繰り返し問い合わせる場合は `hit_test_index()` の結果を渡す。
+
+            index = window.hit_test_index()
+            for x, y in points:
+                hits = window.get_children_in_hierarchy_on_coordinate(x, y, index)
+
+        Args:
+            x (int): スクリーン座標のx
+            y (int): スクリーン座標のy
+            index (Optional[HitTestIndex]): 検索に使うインデックス。自身以外を含む場合は自身の子孫だけを返す
 
-        win32gui.EnumChildWindows(self.hwnd, recursive_callback, 0)
-        return options
+        Returns:
+            list[Window]: 座標を含む子孫ウィンドウ一覧 (親が子より先)。
+                この `Window` と同じく、ライブなら win32gui から、スナップショットならそこから属性を読む
+        """
+        if index is None:
+            index = self.hit_test_index()
+        tree = index.tree
+        windows = []
+        for hit in index.query(x, y):
+            if hit.hwnd == self.hwnd:
+                continue
+            if hit.depth > 0 and any(ancestor.hwnd == self.hwnd for ancestor in tree.ancestors_of(hit.hwnd)):
+                windows.append(self.__related(hit.hwnd))
+        return windows
 
     def set_text(self, text: str) -> None:
         """ウィンドウタイトルを設定する
@@ -212,6 +547,7 @@ class Window:
             text (str): ウィンドウタイトル
         """
         win32gui.SetWindowText(self.hwnd, text)
+        self.invalidate("text")
 
     def set_window_position(self, x: int, y: int, w: int, h: int, swp_flags: SWPFlags = SWPFlags.SWP_SHOWWINDOW) -> None:
         """ウィンドウの位置とサイズを設定する
@@ -223,6 +559,7 @@ class Window:
             h (int): 高さ
         """
         win32gui.SetWindowPos(self.hwnd, 0, x, y, w, h, swp_flags.value)
+        self.invalidate("rect", "client_rect", "is_visible")
 
     def to_top(self) -> None:
         """ウィンドウを最前面に表示する"""
@@ -234,7 +571,9 @@ class Window:
         Returns:
             bool: 以前に表示されていたかどうか
         """
-        return bool(win32gui.ShowWindow(self.hwnd, ShowWindowCommands.HIDE.value))
+        was_visible = bool(win32gui.ShowWindow(self.hwnd, ShowWindowCommands.HIDE.value))
+        self.invalidate("rect", "client_rect", "is_visible", "is_iconic")
+        return was_visible
 
     def show(self) -> bool:
         """ウィンドウを表示する
@@ -242,15 +581,21 @@ class Window:
         Returns:
             bool: 以前に表示されていたかどうか
         """
-        return bool(win32gui.ShowWindow(self.hwnd, ShowWindowCommands.SHOWNORMAL.value))
+        was_visible = bool(win32gui.ShowWindow(self.hwnd, ShowWindowCommands.SHOWNORMAL.value))
+        self.invalidate("rect", "client_rect", "is_visible", "is_iconic")
+        return was_visible
 
     def maximize(self) -> bool:
         """ウィンドウを最大化する"""
-        return bool(win32gui.ShowWindow(self.hwnd, ShowWindowCommands.MAXIMIZE.value))
+        was_visible = bool(win32gui.ShowWindow(self.hwnd, ShowWindowCommands.MAXIMIZE.value))
+        self.invalidate("rect", "client_rect", "is_visible", "is_iconic")
+        return was_visible
 
     def minimize(self) -> bool:
         """ウィンドウを最小化する"""
-        return bool(win32gui.ShowWindow(self.hwnd, ShowWindowCommands.MINIMIZE.value))
+        was_visible = bool(win32gui.ShowWindow(self.hwnd, ShowWindowCommands.MINIMIZE.value))
+        self.invalidate("rect", "client_rect", "is_visible", "is_iconic")
+        return was_visible
 
     def activate(self) -> None:
         """ウィンドウをアクティブにする"""
@@ -279,10 +624,7 @@ class Window:
         Returns:
             int: メッセージの戻り値
         """
-        if isinstance(act, Win32Constants):
-            act = act.value
-        if isinstance(act, str):
-            act = int(act, 16)
+        act = resolve_message(act)
         return win32gui.SendMessage(self.hwnd, act, word_param, long_param)
 
     def _post_message(
@@ -297,12 +639,37 @@ class Window:
             act (Win32Constants): win32conメッセージ
             word_param (Optional[int], optional): Defaults to None.
         """
-        if isinstance(act, Win32Constants):
-            act = act.value
-        if isinstance(act, str):
-            act = int(act, 16)
+        act = resolve_message(act)
         return bool(win32gui.PostMessage(self.hwnd, act, word_param))
 
+    async def asend(
+            self,
+            act: Win32Constants,
+            *,
+            word_param: Optional[int] = None,
+            long_param: Optional[int] = None,
+            timeout: Optional[float] = None,
+            dispatcher: Optional["MessageDispatcher"] = None
+        ) -> int:
+        """スレッドプール上でメッセージを送信し、タイムアウト付きで応答を待つ
+
+        Args:
+            act (Win32Constants): win32conメッセージ
+            word_param (Optional[int], optional): Defaults to None.
+            long_param (Optional[int], optional): Defaults to None.
+            timeout (Optional[float], optional): タイムアウト秒数。Defaults to None.
+            dispatcher (Optional[MessageDispatcher], optional): 使用するディスパッチャー。Defaults to None.
+
+        Raises:
+            TimeoutError: ウィンドウが時間内に応答しなかった場合
+
+        Returns:
+            int: メッセージの戻り値
+        """
+        from modules.dispatcher import default_dispatcher
+        dispatcher = dispatcher or default_dispatcher()
+        return await dispatcher.send(self, act, word_param=word_param, long_param=long_param, timeout=timeout)
+
     def click(self) -> None:
         """クリックする"""
         self._post_message(Win32Constants.WM_LBUTTONDOWN)
@@ -315,92 +682,19 @@ class Window:
             keys (str): キー入力文字列
         """
         self._send_message(Win32Constants.WM_SETTEXT, word_param=0, long_param=keys)
+        self.invalidate("text")
 
     def close(self) -> None:
         """ウィンドウを閉じる"""
         self._send_message(Win32Constants.WM_CLOSE)
-
-    def _draw_children(self, children: list["Window"], class_colors, colors, ax):
-        for child in children:
-            # print("==============")
-            # print(type(child))
-            # pprint(child.get("class_name"))
-            # print("==============")
-            class_name = child.class_name
-            cx1, cy1, cx2, cy2 = child.rect
-            hwnd = child.hwnd
-
-            if class_name not in class_colors:
-                class_colors[class_name] = next(colors)
-
-            color = class_colors[class_name]
-            rect = patches.Rectangle((cx1, cy1), cx2 - cx1, cy2 - cy1, linewidth=1, edgecolor=color, facecolor='none')
-            ax.add_patch(rect)
-            plt.text((cx1 + cx2) / 2, (cy1 + cy2) / 2, str(hwnd), ha='center', va='center', color=color)
-        # raise Exception("Not implemented")
-
-            if len(child.children) > 0:
-                self._draw_children(child.children, class_colors, colors, ax)
+        self.invalidate()
 
     def draw_window_obj(self, **kwargs) -> None:
-        """子要素とhwnd値の構成を描画する"""
-        children = self.get_filtered_children(**kwargs)
-        children = [child for child in children]
-
-        class_colors = {}
-        colors = iter(plt.cm.tab20.colors)
-
-        fig, ax = plt.subplots()
-
-        x1, y1, x2, y2 = self.rect
-        ax.set_xlim(x1, x2)
-        ax.set_ylim(y1, y2)
-
-        me_rect = patches.Rectangle((x1, y1), x2 - x1, y2 - y1, linewidth=2, edgecolor='black', facecolor='none')
-        ax.add_patch(me_rect)
-        class_colors['me'] = 'black'
-
-        self._draw_children(children, class_colors, colors, ax)
-
-        plt.gca().invert_yaxis()
-
-        handles = [patches.Patch(color=color, label=class_name) for class_name, color in class_colors.items()]
-        plt.legend(handles=handles)
-
-        plt.show()
+        """子要素とhwnd値の構成を描画する (matplotlib)"""
+        from modules import rendering
+        rendering.draw_window_obj(self, **kwargs)
 
     def draw_window_obj_tkinter(self, **kwargs) -> None:
-        children = self.get_filtered_children(**kwargs)
-        children_dict = [child.to_dict() for child in children]
-
-        class_colors = {}
-        colors = itertools.cycle(["red", "blue", "green", "purple", "orange"])
-
-        root = tk.Tk()
-
-        x1, y1, x2, y2 = self.rect
-        width, height = x2 - x1, y2 - y1
-        root.geometry(f"{width}x{height}")
-
-        legend_frame = tk.Frame(root)
-        legend_frame.pack(side=tk.TOP, fill=tk.X)
-
-        for child in children_dict:
-            cx1, cy1, cx2, cy2 = child['rect']
-            hwnd = child['hwnd']
-            class_name = child['class_name']
-
-            if class_name not in class_colors:
-                class_colors[class_name] = next(colors)
-
-            color = class_colors[class_name]
-            button_width = cx2 - cx1
-            button_height = cy2 - cy1
-            button = tk.Button(root, text=str(hwnd), bg=color, width=button_width, height=button_height)
-            button.place(x=cx1 - x1, y=height - (cy2 - y1))
-
-        for class_name, color in class_colors.items():
-            label = tk.Label(legend_frame, text=class_name, bg=color, fg="white")
-            label.pack(side=tk.LEFT)
-
-        root.mainloop()
+        """子要素とhwnd値の構成を描画する (tkinter)"""
+        from modules import rendering
+        rendering.draw_window_obj_tkinter(self, **kwargs)
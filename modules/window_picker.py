@@ -1,19 +1,127 @@
 import tkinter as tk
 from tkinter import ttk
-import win32gui
 from modules.window import Window
 from modules.desktop import Desktop
+from modules.hover import HoverTracker
+from modules.tree_view import LazyWindowTree, RowRecycler
+from modules.worker import BackgroundWorker
 from fire import Fire
 from PIL import Image, ImageTk
 
 
+HOVER_FRAME_MS = 16
+"""ドラッグ中にポインタ直下のウィンドウを判定する間隔 (ミリ秒)"""
+
+WORKER_POLL_MS = 16
+"""バックグラウンド処理の結果を受け取る間隔 (ミリ秒)"""
+
+TREE_HEIGHT = 12
+"""階層ペインに表示する行数"""
+
+
+class VirtualWindowTree(ttk.Frame):
+    """`LazyWindowTree` を決まった数の行で表示する Treeview
+
+    Treeview の行は `height` 個だけ作って使い回し、スクロールや展開のたびに内容が変わった行だけを書き換える。
+    クリックで選択、ダブルクリックで展開・畳みを切り替え、F5 で表示中の階層を取得し直す。
+    """
+
+    def __init__(self, master, height: int = TREE_HEIGHT, on_select=None):
+        super().__init__(master)
+        self.on_select = on_select
+        self.selected_hwnd = None
+        self.view = ttk.Treeview(self, show="tree", height=height, selectmode="none")
+        self.view.tag_configure("selected", background="#cce8ff")
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.view.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.columnconfigure(0, weight=1)
+        for slot in range(height):
+            self.view.insert("", tk.END, iid=str(slot), text="")
+        self.rows = RowRecycler(LazyWindowTree(()), height, self._render)
+
+        self.view.bind("<Button-1>", self._on_click)
+        self.view.bind("<Double-Button-1>", self._on_toggle)
+        self.view.bind("<MouseWheel>", lambda event: self._scroll(-1 if event.delta > 0 else 1))
+        self.view.bind("<Button-4>", lambda event: self._scroll(-1))
+        self.view.bind("<Button-5>", lambda event: self._scroll(1))
+        self.view.bind("<F5>", lambda event: self.refresh())
+
+    def set_model(self, model: LazyWindowTree, select=None):
+        self.rows.model = model
+        self.rows.first = 0
+        self.selected_hwnd = None
+        if select is not None and select in model:
+            self.rows.ensure_visible(model.index_of(select))
+            self.select(select)
+        else:
+            self.rows.update()
+        self._sync_scrollbar()
+
+    def select(self, hwnd):
+        previous, self.selected_hwnd = self.selected_hwnd, hwnd
+        for changed in (previous, hwnd):
+            slot = self.rows.slot_of(changed) if changed is not None else None
+            if slot is not None:
+                self._render(slot, self.rows.row_at(slot))
+        if self.on_select is not None and hwnd != previous:
+            self.on_select(hwnd)
+
+    def refresh(self):
+        self.rows.model.refresh()
+        self.rows.update()
+        self._sync_scrollbar()
+
+    def _render(self, slot, row):
+        if row is None:
+            self.view.item(str(slot), text="", tags=())
+            return
+        marker = "▾" if row.expanded else ("▸" if row.expandable is not False else " ")
+        tags = ("selected",) if row.hwnd == self.selected_hwnd else ()
+        self.view.item(str(slot), text=f"{'    ' * row.depth}{marker} {row.label}", tags=tags)
+
+    def _row_at_event(self, event):
+        slot = self.view.identify_row(event.y)
+        return self.rows.row_at(int(slot)) if slot else None
+
+    def _on_click(self, event):
+        row = self._row_at_event(event)
+        if row is not None:
+            self.select(row.hwnd)
+        self.view.focus_set()
+
+    def _on_toggle(self, event):
+        row = self._row_at_event(event)
+        if row is None:
+            return
+        self.rows.model.toggle(row.hwnd)
+        self.rows.update()
+        self._sync_scrollbar()
+
+    def _scroll(self, delta):
+        self.rows.scroll(delta)
+        self._sync_scrollbar()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == tk.MOVETO:
+            self.rows.scroll_to(round(float(value) * len(self.rows.model)))
+        elif unit == tk.PAGES:
+            self.rows.scroll(int(value) * self.rows.height)
+        else:
+            self.rows.scroll(int(value))
+        self._sync_scrollbar()
+
+    def _sync_scrollbar(self):
+        total = max(len(self.rows.model), 1)
+        self.scrollbar.set(self.rows.first / total, min((self.rows.first + self.rows.height) / total, 1.0))
+
+
 class WindowPicker(tk.Tk):
     def __init__(self, width: int = 450, height: int = 400, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.desktop = Desktop()
         self.title("Window Picker")
         self.geometry(f"{width}x{height}")
-        self.selected_handle = tk.StringVar()
         canvas_width, canvas_height = 80, 60
         self.canvas = tk.Canvas(self, width=canvas_width, height=canvas_height)
         self.canvas.pack()
@@ -34,67 +142,151 @@ class WindowPicker(tk.Tk):
         drag_window_label.pack()
         self.drag_window.withdraw()
 
-        self.dropdown_menu = tk.OptionMenu(self, self.selected_handle, "")
-        self.dropdown_menu.pack()
-
-        self.selected_handle.trace("w", self._on_handle_selected)
+        # ポイントしたウィンドウを含む階層。子ウィンドウは展開したときに取得する
+        self.hierarchy = VirtualWindowTree(self, on_select=self._on_handle_selected)
+        self.hierarchy.pack(fill=tk.X)
 
         self.info_table = ttk.Treeview(self, columns=("Property", "Value"), show="headings")
         self.info_table.heading("Property", text="Property")
         self.info_table.heading("Value", text="Value")
+        self.info_table.tag_configure("stale", foreground="gray")
         self.info_table.pack()
+        # 前に選んだウィンドウの値のまま、まだ書き換えていない行
+        self.__stale_properties = set()
+
+        self.highlight = tk.Toplevel(self)
+        self.highlight.overrideredirect(1)
+        self.highlight.attributes("-topmost", True)
+        self.highlight.attributes("-alpha", 0.3)
+        self.highlight.configure(background="red")
+        self.highlight.withdraw()
+
+        # ピッカー自身のウィンドウはホバー判定から除く
+        self.update_idletasks()
+        own_hwnds = [int(window.wm_frame(), 16) for window in (self, self.drag_window, self.highlight)]
+        self.hover = HoverTracker(
+            lambda: self.desktop.snapshot(visible_only=True),
+            frame_interval=HOVER_FRAME_MS / 1000,
+            exclude=lambda: own_hwnds,
+        )
+        self.hover.start()
+        self.__hover_job = None
+
+        # 列挙や属性の読み出しはワーカースレッドで行い、結果だけをこのスレッドで受け取る
+        self.worker = BackgroundWorker()
+        self.after(WORKER_POLL_MS, self._on_worker_poll)
+
+    def destroy(self):
+        # 取り直し中のスレッドはピッカー自身のウィンドウにも WM_GETTEXT を送るため、このスレッドで終了を待たない
+        self.hover.stop(wait=False)
+        self.worker.shutdown()
+        super().destroy()
 
-    def _get_handles_in_hierarchy(self, hwnd, x, y):
-        options = []
-        
-        def recursive_callback(handle, level):
-            rect = win32gui.GetWindowRect(handle)
-            if rect[0] <= x <= rect[2] and rect[1] <= y <= rect[3]:
-                window_text = win32gui.GetWindowText(handle)
-                indent = " " * level * 4
-                option = f"{indent}Handle: {handle}, Title: {window_text}"
-                options.append(option)
-                win32gui.EnumChildWindows(handle, recursive_callback, level + 1)
-
-        win32gui.EnumChildWindows(hwnd, recursive_callback, 0)
-        return options
+    def _on_worker_poll(self):
+        try:
+            self.worker.drain()
+        finally:
+            self.after(WORKER_POLL_MS, self._on_worker_poll)
 
     def _on_drop(self, event):
         self.drag_window.withdraw()
+        self.highlight.withdraw()
+        if self.__hover_job is not None:
+            self.after_cancel(self.__hover_job)
+            self.__hover_job = None
         x, y = self.winfo_pointerx(), self.winfo_pointery()
 
-        options = []
-        for window in self.desktop.get_all_top_visibile_windows():
-            rect = window.rect
-            if rect[0] <= x <= rect[2] and rect[1] <= y <= rect[3]:
-                options.append(window)
-                options.extend(window.get_children_in_hierarchy_on_coordinate(x, y))
-
-        self.dropdown_menu['menu'].delete(0, 'end')
-        self.selected_handle.set(options[0] if options else "")
-        for option in options:
-            self.dropdown_menu['menu'].add_command(label=option, command=tk._setit(self.selected_handle, option))
-
-    def _on_handle_selected(self, *args):
-        print(self.selected_handle.get())
-        selected_option = self.selected_handle.get()
-        handle_str = selected_option.split(" ")[0].replace("[", "").replace("]", "")
-        handle = int(handle_str)
+        self.worker.submit("hierarchy", self._build_hierarchy, x, y, on_done=self._show_hierarchy)
+
+    def _build_hierarchy(self, x, y):
+        # ワーカースレッドで実行される。ポイントしたウィンドウまでの経路だけを展開したモデルを作る
+        # ホバー判定の前回の結果は UI スレッドが更新するため、ここでは状態を持たない判定を使う
+        result, index = self.hover.lookup(x, y)
+        if result.target is None:
+            return None
+        tree = index.tree
+        path = [ancestor.hwnd for ancestor in reversed(tree.ancestors_of(result.target.hwnd))]
+        path.append(result.target.hwnd)
+        model = LazyWindowTree(path[:1])
+        try:
+            model.reveal(path)
+        except KeyError:
+            # 判定に使った階層の取得後にウィンドウが破棄された
+            pass
+        return model, path[-1]
+
+    def _show_hierarchy(self, built):
+        if built is None:
+            return
+        model, target = built
+        self.hierarchy.set_model(model, select=target)
+
+    def _on_handle_selected(self, handle):
+        if self.info_table.exists("error"):
+            self.info_table.delete("error")
+
+        # 行はプロパティ名ごとに使い回し、値だけを書き換える。書き換わるまでは古い値として灰色で表示する
+        self.__stale_properties = set(self.info_table.get_children())
+        for key in self.__stale_properties:
+            self.info_table.item(key, tags=("stale",))
+        self.worker.submit(
+            "properties", self._iter_properties, handle,
+            on_item=self._add_property,
+            on_done=lambda _: self._on_properties_done(),
+            on_error=self._on_properties_error,
+        )
+
+    @staticmethod
+    def _iter_properties(handle):
+        # ワーカースレッドで実行される。プロパティを1つ読むごとに表へ反映する
         selected_obj = Window(handle)
-        window_info_dict = selected_obj.to_dict()
+        for key in Window.field_names(recursive=False):
+            yield key, getattr(selected_obj, key)
+
+    def _add_property(self, item):
+        key, _ = item
+        self.__stale_properties.discard(key)
+        if self.info_table.exists(key):
+            self.info_table.item(key, values=item, tags=())
+        else:
+            self.info_table.insert("", tk.END, iid=key, values=item)
 
-        for row in self.info_table.get_children():
-            self.info_table.delete(row)
+    def _on_properties_done(self):
+        # 今回のウィンドウで読み出さなかったプロパティの行は消す
+        for key in self.__stale_properties:
+            self.info_table.delete(key)
+        self.__stale_properties = set()
 
-        for key, value in window_info_dict.items():
-            self.info_table.insert("", tk.END, values=(key, value))
+    def _on_properties_error(self, error):
+        # 読み出せなかったプロパティに前のウィンドウの値を残さない
+        for key in self.__stale_properties:
+            self.info_table.item(key, values=(key, "(取得できません)"), tags=("stale",))
+        self.__stale_properties = set()
+        self._add_property(("error", error))
 
     def _start_drag(self, event):
         self.drag_window.deiconify()
+        self.__hover_job = self.after(HOVER_FRAME_MS, self._on_hover_frame)
 
     def _on_drag(self, event):
         x, y = self.winfo_pointerx(), self.winfo_pointery()
         self.drag_window.geometry(f"+{x-16}+{y-16}")
+        self.hover.request(x, y)
+
+    def _on_hover_frame(self):
+        # マウス移動のたびではなく描画フレームごとに、最新のポインタ位置だけを判定する
+        result = self.hover.poll()
+        if result is not None and not result.reused:
+            self._highlight(result.target)
+        self.__hover_job = self.after(HOVER_FRAME_MS, self._on_hover_frame)
+
+    def _highlight(self, target):
+        if target is None:
+            self.highlight.withdraw()
+            return
+        x1, y1, x2, y2 = target.rect
+        self.highlight.geometry(f"{max(x2 - x1, 1)}x{max(y2 - y1, 1)}+{x1}+{y1}")
+        self.highlight.deiconify()
 
 
 def main(w: int = 450, h:int = 400):
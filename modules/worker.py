@@ -0,0 +1,173 @@
+"""GUI スレッドを塞がないためのバックグラウンド実行
+
+重い処理 (列挙や属性の読み出し) をワーカースレッドで実行し、結果はキューに積んでおく。
+GUI 側は `drain` を定期的に (Tk なら `after()` で) 呼び、自身のスレッドでコールバックを受け取る。
+Tk に依存しないため、ヘッドレスで検証できる。
+"""
+import inspect
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class WorkerRequest:
+    """`BackgroundWorker` に投入した処理1件
+
+    Attributes:
+        channel (str): 処理の種類。同じ種類の新しい処理が投入されると古いものは取り消される
+    """
+
+    def __init__(
+            self,
+            channel: str,
+            on_item: Optional[Callable[[Any], None]],
+            on_done: Optional[Callable[[Any], None]],
+            on_error: Optional[Callable[[BaseException], None]]
+        ):
+        self.channel = channel
+        self.on_item = on_item
+        self.on_done = on_done
+        self.on_error = on_error
+        self.finished = False
+        self.__cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        """取り消されたか
+
+        Returns:
+            bool: 取り消されたか
+        """
+        return self.__cancelled.is_set()
+
+    def cancel(self) -> None:
+        """処理を取り消す (実行中の処理は次の途中結果を返した時点で打ち切られる)"""
+        self.__cancelled.set()
+
+
+class BackgroundWorker:
+    """処理をワーカースレッドで実行し、結果を呼び出し側のスレッドに届ける
+
+    処理がジェネレーターを返す場合は、yield された値を途中結果として順に `on_item` に届ける。
+    チャンネルごとに最新の処理だけが有効で、古い処理の結果は届けずに捨てる。
+
+        worker.submit("info", read_properties, hwnd, on_item=insert_row)
+        root.after(16, lambda: worker.drain())
+    """
+
+    def __init__(self, max_workers: int = 2):
+        """
+        Args:
+            max_workers (int): ワーカースレッド数
+        """
+        self.stats: Counter = Counter()
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="picker-worker")
+        self.__results: queue.SimpleQueue = queue.SimpleQueue()
+        self.__current: dict[str, WorkerRequest] = {}
+
+    def submit(
+            self,
+            channel: str,
+            func: Callable,
+            *args,
+            on_item: Optional[Callable[[Any], None]] = None,
+            on_done: Optional[Callable[[Any], None]] = None,
+            on_error: Optional[Callable[[BaseException], None]] = None
+        ) -> WorkerRequest:
+        """処理を投入する (同じチャンネルの処理が残っていれば取り消す)
+
+        Args:
+            channel (str): 処理の種類
+            func (Callable): ワーカースレッドで実行する関数 (ジェネレーター関数も可)
+            *args: `func` の引数
+            on_item (Optional[Callable[[Any], None]]): 途中結果を受け取る関数
+            on_done (Optional[Callable[[Any], None]]): 完了時に戻り値を受け取る関数 (ジェネレーターの場合は None)
+            on_error (Optional[Callable[[BaseException], None]]): 例外を受け取る関数。None なら `drain` で送出する
+
+        Returns:
+            WorkerRequest: 投入した処理
+        """
+        self.cancel(channel)
+        request = WorkerRequest(channel, on_item, on_done, on_error)
+        self.__current[channel] = request
+        self.stats["submitted"] += 1
+        self.__executor.submit(self.__run, request, func, args)
+        return request
+
+    def cancel(self, channel: str) -> None:
+        """チャンネルの処理を取り消す
+
+        Args:
+            channel (str): 処理の種類
+        """
+        request = self.__current.pop(channel, None)
+        if request is not None and not request.finished:
+            request.cancel()
+            self.stats["cancelled"] += 1
+
+    def __run(self, request: WorkerRequest, func: Callable, args: tuple) -> None:
+        if request.cancelled:
+            return
+        try:
+            result = func(*args)
+            if inspect.isgenerator(result):
+                try:
+                    for item in result:
+                        if request.cancelled:
+                            return
+                        self.__results.put((request, "item", item))
+                finally:
+                    result.close()
+                result = None
+            self.__results.put((request, "done", result))
+        except Exception as e:
+            self.__results.put((request, "error", e))
+
+    def drain(self, max_items: Optional[int] = 200) -> int:
+        """届いた結果をコールバックに渡す (GUI のスレッドから呼ぶ)
+
+        Args:
+            max_items (Optional[int]): 1回に処理する結果の最大数。None なら全て
+
+        Returns:
+            int: 処理した結果の数 (取り消された処理の結果は含まない)
+        """
+        delivered = 0
+        while max_items is None or delivered < max_items:
+            try:
+                request, kind, value = self.__results.get_nowait()
+            except queue.Empty:
+                break
+            if request.cancelled or self.__current.get(request.channel) is not request:
+                self.stats["stale"] += 1
+                continue
+            delivered += 1
+            if kind == "item":
+                self.stats["items"] += 1
+                if request.on_item is not None:
+                    request.on_item(value)
+                continue
+            request.finished = True
+            del self.__current[request.channel]
+            if kind == "done":
+                self.stats["done"] += 1
+                if request.on_done is not None:
+                    request.on_done(value)
+            else:
+                self.stats["errors"] += 1
+                if request.on_error is None:
+                    raise value
+                request.on_error(value)
+        return delivered
+
+    def shutdown(self, wait: bool = False) -> None:
+        """全ての処理を取り消し、ワーカースレッドを停止する
+
+        Args:
+            wait (bool): 実行中の処理の終了を待つか
+        """
+        for channel in list(self.__current):
+            self.cancel(channel)
+        self.__executor.shutdown(wait=wait, cancel_futures=True)
@@ -50,7 +50,7 @@ def on_handle_selected(*args):
     handle_str = selected_option.split(",")[0].split(":")[1].strip()
     handle = int(handle_str)
     selected_obj = Window(handle)
-    window_info_dict = selected_obj.to_dict()
+    window_info_dict = selected_obj.to_dict(recursive=False)
 
     # テーブルの内容をクリア
     for row in info_table.get_children():
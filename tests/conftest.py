@@ -0,0 +1,32 @@
+"""テスト共通の設定
+
+win32gui などは import 時に参照されるため、モジュールを import する前にフェイク実装を登録しておく。
+各テストには新しいフェイクデスクトップを `fake_desktop` で渡す。
+"""
+import pytest
+
+from modules import fake_win32
+
+fake_win32.install()
+
+import win32gui  # noqa: E402 (フェイクの登録後に import する)
+
+
+@pytest.fixture
+def fake_desktop() -> fake_win32.FakeDesktop:
+    return fake_win32.install()
+
+
+@pytest.fixture
+def destroy_on_read(monkeypatch, fake_desktop):
+    """指定したウィンドウの属性を読み始めた時点で破棄する (取得中の破棄を再現する)"""
+    get_window_text = win32gui.GetWindowText
+    targets = set()
+
+    def _get_window_text(hwnd):
+        if hwnd in targets and hwnd in fake_desktop.windows:
+            fake_desktop.remove_window(hwnd)
+        return get_window_text(hwnd)
+
+    monkeypatch.setattr(win32gui, "GetWindowText", _get_window_text)
+    return targets.add
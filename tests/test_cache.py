@@ -0,0 +1,76 @@
+import pytest
+import win32con
+import win32gui
+
+from modules.cache import AttributeCache
+from modules.events import EventKind, SimulatedEventSource
+from modules.fake_win32 import FakeClock
+from modules.window import Window
+
+
+def test_class_name_of_reused_handle_expires(fake_desktop):
+    clock = FakeClock()
+    cache = AttributeCache(clock=clock)
+    hwnd = fake_desktop.add_window(class_name="Edit")
+    assert Window(hwnd, cache=cache).class_name == "Edit"
+
+    # 破棄されたハンドルが別のクラスのウィンドウに再利用された
+    fake_desktop.remove_window(hwnd)
+    fake_desktop.add_window(class_name="Button", hwnd=hwnd)
+    clock.sleep(cache.ttl_of("class_name"))
+
+    assert Window(hwnd, cache=cache).class_name == "Button"
+
+
+def test_destroy_event_invalidates_handle(fake_desktop):
+    source = SimulatedEventSource()
+    cache = AttributeCache(ttl=60)
+    source.subscribe(cache.on_event)
+    hwnd = fake_desktop.add_window(text="Before", class_name="Edit")
+    window = Window(hwnd, cache=cache)
+    assert (window.text, window.class_name) == ("Before", "Edit")
+
+    fake_desktop.remove_window(hwnd)
+    source.emit(EventKind.DESTROYED, hwnd)
+    fake_desktop.add_window(text="After", class_name="Button", hwnd=hwnd)
+
+    assert (window.text, window.class_name) == ("After", "Button")
+
+
+def test_hits_skip_backend_until_expiry(fake_desktop):
+    clock = FakeClock()
+    cache = AttributeCache(ttl=0.05, clock=clock)
+    window = Window(fake_desktop.add_window(text="Main"), cache=cache)
+    fake_desktop.reset_calls()
+
+    texts = [window.text for _ in range(3)]
+    clock.sleep(0.05)
+    texts.append(window.text)
+
+    assert texts == ["Main"] * 4
+    assert fake_desktop.calls["GetWindowText"] == 2
+    assert (cache.hits["text"], cache.misses["text"]) == (2, 2)
+
+
+@pytest.mark.parametrize("kind, change, name, expected", [
+    (EventKind.NAME_CHANGED, lambda hwnd: win32gui.SetWindowText(hwnd, "After"), "text", "After"),
+    (EventKind.LOCATION_CHANGED, lambda hwnd: win32gui.SetWindowPos(hwnd, 0, 10, 20, 30, 40, 0), "rect", (10, 20, 40, 60)),
+    (EventKind.HIDDEN, lambda hwnd: win32gui.ShowWindow(hwnd, win32con.SW_HIDE), "is_visible", False),
+    (EventKind.SHOWN, lambda hwnd: win32gui.ShowWindow(hwnd, win32con.SW_SHOW), "is_visible", True),
+])
+def test_events_invalidate_the_attributes_they_change(fake_desktop, kind, change, name, expected):
+    source = SimulatedEventSource()
+    cache = AttributeCache(ttl=60)
+    source.subscribe(cache.on_event)
+    hwnd = fake_desktop.add_window(text="Before", class_name="Edit", visible=kind is not EventKind.SHOWN)
+    window = Window(hwnd, cache=cache)
+    assert getattr(window, name) != expected and window.class_name == "Edit"
+    change(hwnd)
+    fake_desktop.reset_calls()
+
+    source.emit(kind, hwnd)
+
+    assert getattr(window, name) == expected
+    # 影響しない属性はキャッシュから読む
+    assert window.class_name == "Edit"
+    assert fake_desktop.call_count == 1
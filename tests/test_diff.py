@@ -0,0 +1,80 @@
+import itertools
+
+import win32con
+import win32gui
+
+from modules.diff import ChangeKind, diff_trees, watch
+from modules.snapshot import WindowTree
+
+
+def _kinds(changes) -> list[tuple]:
+    return [(change.kind, change.hwnd) for change in changes]
+
+
+def test_created_and_destroyed(fake_desktop):
+    root = fake_desktop.add_window(text="Main")
+    doomed = fake_desktop.add_window(root, text="Doomed")
+    before = WindowTree.capture_desktop()
+    fake_desktop.remove_window(doomed)
+    created = fake_desktop.add_window(root, text="New")
+
+    changes = diff_trees(before, WindowTree.capture_desktop())
+
+    assert _kinds(changes) == [(ChangeKind.DESTROYED, doomed), (ChangeKind.CREATED, created)]
+    assert changes[0].after is None and changes[1].before is None
+
+
+def test_moved_resized_renamed_and_visibility(fake_desktop):
+    moved = fake_desktop.add_window(text="Moved", rect=(0, 0, 100, 100))
+    resized = fake_desktop.add_window(text="Resized", rect=(0, 0, 100, 100))
+    renamed = fake_desktop.add_window(text="Before")
+    hidden = fake_desktop.add_window(text="Hidden")
+    unchanged = fake_desktop.add_window(text="Unchanged")
+    before = WindowTree.capture_desktop()
+
+    win32gui.SetWindowPos(moved, 0, 10, 20, 0, 0, 0x0001)
+    win32gui.SetWindowPos(resized, 0, 0, 0, 50, 60, 0x0002)
+    win32gui.SetWindowText(renamed, "After")
+    win32gui.ShowWindow(hidden, win32con.SW_HIDE)
+    changes = diff_trees(before, WindowTree.capture_desktop())
+
+    assert _kinds(changes) == [
+        (ChangeKind.MOVED, moved),
+        (ChangeKind.RESIZED, resized),
+        (ChangeKind.TITLE_CHANGED, renamed),
+        (ChangeKind.HIDDEN, hidden),
+    ]
+    assert unchanged not in {change.hwnd for change in changes}
+    assert (changes[2].before.text, changes[2].after.text) == ("Before", "After")
+
+
+def test_reused_handle_is_reported_as_destroy_and_create(fake_desktop):
+    hwnd = fake_desktop.add_window(class_name="Edit")
+    before = WindowTree.capture_desktop()
+    fake_desktop.remove_window(hwnd)
+    fake_desktop.add_window(class_name="Button", hwnd=hwnd)
+
+    assert _kinds(diff_trees(before, WindowTree.capture_desktop())) == [
+        (ChangeKind.DESTROYED, hwnd), (ChangeKind.CREATED, hwnd),
+    ]
+
+
+def test_watch_yields_only_deltas(fake_desktop):
+    hwnd = fake_desktop.add_window(text="Main")
+    steps = iter([
+        lambda: None,
+        lambda: win32gui.SetWindowText(hwnd, "Renamed"),
+        lambda: None,
+        lambda: fake_desktop.remove_window(hwnd),
+    ])
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        next(steps)()
+
+    deltas = list(itertools.islice(watch(WindowTree.capture_desktop, 0.1, sleep=sleep), 2))
+
+    assert [_kinds(delta) for delta in deltas] == [[(ChangeKind.TITLE_CHANGED, hwnd)], [(ChangeKind.DESTROYED, hwnd)]]
+    # 変化のなかった取得は yield しない
+    assert sleeps == [0.1] * 4
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import time
+
+import pytest
+import win32con
+import win32process
+
+from modules.dispatcher import MessageDispatcher
+from modules.window import Window
+
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = MessageDispatcher(max_workers=4, abort_if_hung=False)
+    yield dispatcher
+    dispatcher.shutdown(wait=True)
+
+
+def test_asend_times_out(fake_desktop, dispatcher):
+    window = Window(fake_desktop.add_window(text="Slow"))
+    fake_desktop.set_delay(window.hwnd, 1.0)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(window.asend(win32con.WM_GETTEXTLENGTH, timeout=0.05, dispatcher=dispatcher))
+
+
+def test_cancelled_send_keeps_process_slot_until_it_returns(fake_desktop, dispatcher):
+    hung = fake_desktop.add_window(text="Hung", pid=10)
+    sibling = fake_desktop.add_window(text="Sibling", pid=10)
+    other = fake_desktop.add_window(text="Other", pid=20)
+    fake_desktop.hang(hung)
+
+    async def _run():
+        task = asyncio.ensure_future(Window(hung).asend(win32con.WM_GETTEXTLENGTH, timeout=0.3, dispatcher=dispatcher))
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        cancelled_after = time.monotonic() - started
+        # 別のプロセスへの送信は待たされず、同じプロセスへの送信は取り消した送信が終わるまで待つ
+        await dispatcher.send(other, win32con.WM_GETTEXTLENGTH)
+        other_after = time.monotonic() - started
+        await dispatcher.send(sibling, win32con.WM_GETTEXTLENGTH)
+        sibling_after = time.monotonic() - started
+        return cancelled_after, other_after, sibling_after
+
+    cancelled_after, other_after, sibling_after = asyncio.run(_run())
+
+    assert cancelled_after < 0.1 and other_after < 0.1
+    assert sibling_after >= 0.2
+
+
+def test_pid_lookup_runs_off_the_event_loop_thread(monkeypatch, fake_desktop, dispatcher):
+    hwnd = fake_desktop.add_window(text="Main")
+    get_pid = win32process.GetWindowThreadProcessId
+    threads = []
+
+    def _get_pid(hwnd):
+        threads.append(threading.current_thread())
+        return get_pid(hwnd)
+
+    monkeypatch.setattr(win32process, "GetWindowThreadProcessId", _get_pid)
+    asyncio.run(dispatcher.send(hwnd, win32con.WM_GETTEXTLENGTH))
+
+    assert threads and threading.main_thread() not in threads
@@ -0,0 +1,48 @@
+from modules.enumeration import iter_descendant_hwnds
+from modules.window import Window
+
+
+def test_iter_descendants_matches_full_enumeration_order(fake_desktop):
+    root = fake_desktop.add_synthetic_tree(depth=3, breadth=3)
+    window = Window(root)
+    expected = [
+        child.hwnd for child in window.iter_children()
+        if child.parent_hwnd == root or fake_desktop.windows[child.parent_hwnd].parent == root
+    ]
+
+    assert [child.hwnd for child in window.iter_descendants(max_depth=2)] == expected
+    assert [child.hwnd for child in window.iter_descendants(max_depth=3)] == list(window.children_hwnds)
+
+
+def test_iter_descendants_does_not_walk_below_max_depth(fake_desktop):
+    root = fake_desktop.add_synthetic_tree(depth=4, breadth=5)
+    fake_desktop.reset_calls()
+
+    children = list(Window(root).iter_descendants(max_depth=1))
+
+    assert len(children) == 5
+    assert fake_desktop.calls["EnumChildWindows"] == 0
+    # GW_CHILD 1回と、兄弟をたどる GW_HWNDNEXT 5回
+    assert fake_desktop.calls["GetWindow"] == 6
+
+
+def test_iter_descendants_uses_snapshot_depths(fake_desktop):
+    root = fake_desktop.add_synthetic_tree(depth=3, breadth=2)
+    live = [child.hwnd for child in Window(root).iter_descendants(max_depth=2)]
+    tree = Window(root).snapshot()
+    fake_desktop.reset_calls()
+
+    assert [child.hwnd for child in tree.window(root).iter_descendants(max_depth=2)] == live
+    assert fake_desktop.call_count == 0
+
+
+def test_iter_descendant_hwnds_skips_destroyed_subtrees(fake_desktop):
+    root = fake_desktop.add_window(text="Main")
+    doomed = fake_desktop.add_window(root)
+    fake_desktop.add_window(doomed)
+    survivor = fake_desktop.add_window(root)
+    walk = iter_descendant_hwnds(root)
+
+    assert next(walk) == (doomed, 1)
+    fake_desktop.remove_window(doomed)
+    assert list(walk) == [(survivor, 1)]
@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+
+from modules.desktop import Desktop
+from modules.events import EventKind, SimulatedEventSource, WindowEventStream, WinEventHookSource
+from modules.window import Window
+
+
+def test_desktop_wait_for_closes_stream_it_opened(fake_desktop):
+    fake_desktop.add_window(text="Main")
+    source = SimulatedEventSource()
+    stream = WindowEventStream(source)
+
+    source.play([(0.01, EventKind.CREATED, lambda: fake_desktop.add_window(text="保存"))])
+    found = Desktop().wait_for(timeout=5, stream=stream, name_contains="保存")
+
+    assert found is not None and found.text == "保存"
+    assert not stream.is_open
+
+
+def test_desktop_wait_for_keeps_caller_opened_stream(fake_desktop):
+    fake_desktop.add_window(text="保存")
+    with WindowEventStream(SimulatedEventSource()) as stream:
+        assert Desktop().wait_for(timeout=0, stream=stream, name_contains="保存") is not None
+        assert stream.is_open
+
+
+def test_desktop_wait_for_stream_ignores_child_windows(fake_desktop):
+    main = fake_desktop.add_window(text="Main")
+    source = SimulatedEventSource()
+
+    source.play([
+        (0.01, EventKind.CREATED, lambda: fake_desktop.add_window(main, text="保存")),
+        (0.02, EventKind.CREATED, lambda: fake_desktop.add_window(text="保存")),
+    ])
+    found = Desktop().wait_for(timeout=5, stream=WindowEventStream(source), name_contains="保存")
+
+    # ポーリングと同じく、子ウィンドウではなくトップレベルウィンドウを返す
+    assert found is not None and found.parent_hwnd is None
+
+
+def test_window_wait_for_closes_stream_it_opened(fake_desktop):
+    hwnd = fake_desktop.add_window(text="Main")
+    stream = WindowEventStream(SimulatedEventSource())
+
+    assert not Window(hwnd).wait_for(EventKind.DESTROYED, timeout=0.01, stream=stream)
+    assert not stream.is_open
+
+
+def test_hook_start_failure_is_raised_instead_of_hanging():
+    # ctypes.windll のない環境ではフックの登録に失敗する
+    stream = WindowEventStream(WinEventHookSource())
+    errors = []
+
+    def _open():
+        try:
+            stream.open()
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=_open, daemon=True)
+    thread.start()
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert len(errors) == 1
+    assert not stream.is_open
+    # 失敗した購読は残らず、再度の open でも開始を試みる
+    with pytest.raises(Exception):
+        stream.open()
+
+
+def test_cancelled_aget_does_not_leave_a_blocked_reader(fake_desktop):
+    import asyncio
+    hwnd = fake_desktop.add_window(text="Main")
+    source = SimulatedEventSource()
+
+    async def _cancel_pending_get(stream):
+        task = asyncio.ensure_future(stream.aget())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.05)
+
+    with WindowEventStream(source) as stream:
+        asyncio.run(_cancel_pending_get(stream))
+        source.emit(EventKind.SHOWN, hwnd)
+        # 取り消した読み出しのスレッドがイベントを横取りしない
+        event = stream.get(timeout=1)
+
+    assert event is not None and event.hwnd == hwnd
@@ -0,0 +1,66 @@
+import io
+
+import pytest
+import win32gui
+
+from modules.desktop import Desktop
+from modules.export import export_windows, iter_rows, load_tree
+from modules.snapshot import WindowTree
+
+
+def test_ndjson_round_trip_matches_snapshot(fake_desktop, tmp_path):
+    root = fake_desktop.add_synthetic_tree(depth=2, breadth=3, text="App")
+    fake_desktop.add_window(text="Other", visible=False)
+    path = tmp_path / "inventory.ndjson.gz"
+
+    count = Desktop().export(path)
+    loaded = load_tree(path)
+    captured = WindowTree.capture_desktop()
+
+    assert count == len(captured) == len(fake_desktop.windows)
+    assert list(loaded) == list(captured)
+    assert loaded.roots == captured.roots and root in loaded.roots
+
+
+def test_window_destroyed_during_read_is_skipped_with_subtree(monkeypatch, fake_desktop):
+    root = fake_desktop.add_window(text="Main")
+    doomed = fake_desktop.add_window(root, text="Doomed")
+    fake_desktop.add_window(doomed, text="Grandchild")
+    survivor = fake_desktop.add_window(root, text="Survivor")
+    get_window_text = win32gui.GetWindowText
+
+    def _get_window_text(hwnd):
+        # 子が残ったまま、読み出し中に失敗する
+        if hwnd == doomed:
+            raise win32gui.error(1400, "GetWindowText", "Invalid window handle.")
+        return get_window_text(hwnd)
+
+    monkeypatch.setattr(win32gui, "GetWindowText", _get_window_text)
+
+    assert [row["hwnd"] for row in iter_rows([root])] == [root, survivor]
+
+
+def test_destroyed_root_is_skipped(fake_desktop):
+    root = fake_desktop.add_window(text="Main")
+    fake_desktop.add_window(root, text="Child")
+    other = fake_desktop.add_window(text="Other")
+    fake_desktop.remove_window(root)
+
+    assert [row["hwnd"] for row in iter_rows([root, other])] == [other]
+
+
+def test_load_tree_rejects_rows_without_root():
+    assert len(load_tree(io.StringIO(""))) == 0
+    row = '{"hwnd": 2, "parent_hwnd": 1, "depth": 1, "text": "", "class_name": "Static", ' \
+          '"rect": [0, 0, 1, 1], "client_rect": [0, 0, 1, 1], "is_visible": true, "is_iconic": false}\n'
+    with pytest.raises(ValueError):
+        load_tree(io.StringIO(row))
+
+
+def test_parquet_round_trip(fake_desktop, tmp_path):
+    pytest.importorskip("pyarrow")
+    root = fake_desktop.add_synthetic_tree(depth=2, breadth=3, text="App")
+    path = tmp_path / "inventory.parquet"
+
+    assert export_windows([root], path, batch_size=4) == len(fake_desktop.windows)
+    assert list(load_tree(path)) == list(WindowTree.capture(root))
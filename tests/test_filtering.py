@@ -0,0 +1,84 @@
+import re
+
+import pytest
+import win32gui
+
+from modules.filtering import Prefix
+from modules.window import Window
+
+
+def _filter_children_naive(window: Window, **kwargs) -> list[Window]:
+    # 以前の get_filtered_children: 条件ごとに子ウィンドウ全体を走査する
+    children = window.children
+    for key, value in kwargs.items():
+        if not isinstance(value, list):
+            value = [value]
+        joined_children = []
+        for v in value:
+            joined_children += [child for child in children if v == getattr(child, key)]
+        children = joined_children
+    return children
+
+
+def _root(fake_desktop) -> int:
+    root = fake_desktop.add_window(text="Main")
+    for i, (class_name, visible) in enumerate([
+        ("Button", True), ("Edit", True), ("Button", False), ("Static", True),
+        ("Edit", False), ("Button", True), ("ComboBox", True), ("Edit", True),
+    ]):
+        fake_desktop.add_window(root, text=f"OK {i}" if i % 3 == 0 else f"Item {i}", class_name=class_name, visible=visible)
+    return root
+
+
+@pytest.mark.parametrize("conditions", [
+    {"class_name": "Button"},
+    {"class_name": ["Button", "Edit"], "is_visible": True},
+    {"is_visible": True, "class_name": ["Edit", "Static"]},
+    {"class_name": ["Edit"], "is_visible": False, "text": "Item 4"},
+    {"class_name": "Missing"},
+])
+def test_indexed_filter_matches_naive_scan(fake_desktop, conditions):
+    window = Window(_root(fake_desktop))
+
+    expected = {child.hwnd for child in _filter_children_naive(window, **conditions)}
+    found = [child.hwnd for child in window.get_filtered_children(**conditions)]
+
+    assert set(found) == expected
+    # 列挙順を保ち、重複しない
+    assert found == [hwnd for hwnd in window.children_hwnds if hwnd in expected]
+
+
+def test_pattern_conditions_combine_with_indexed_ones(fake_desktop):
+    window = Window(_root(fake_desktop))
+
+    by_prefix = window.get_filtered_children(class_name=["Button", "Static"], text=Prefix("OK"))
+    by_regex = window.get_filtered_children(class_name=["Button", "Static"], text=re.compile(r"^OK"))
+    expected = [
+        child.hwnd for child in window.children
+        if child.class_name in ("Button", "Static") and child.text.startswith("OK")
+    ]
+
+    assert [child.hwnd for child in by_prefix] == [child.hwnd for child in by_regex] == expected
+
+
+def test_children_destroyed_during_read_are_skipped(monkeypatch, fake_desktop):
+    root = _root(fake_desktop)
+    doomed = fake_desktop.windows[root].children[1]
+    get_class_name = win32gui.GetClassName
+
+    def _get_class_name(hwnd):
+        if hwnd == doomed and hwnd in fake_desktop.windows:
+            fake_desktop.remove_window(hwnd)
+        return get_class_name(hwnd)
+
+    monkeypatch.setattr(win32gui, "GetClassName", _get_class_name)
+    window = Window(root)
+    children = window.children
+
+    found = window.get_filtered_children(class_name=["Button", "Edit"], is_visible=True)
+
+    assert doomed in [child.hwnd for child in children]
+    assert [child.hwnd for child in found] == [
+        child.hwnd for child in children
+        if child.hwnd != doomed and child.class_name in ("Button", "Edit") and child.is_visible
+    ]
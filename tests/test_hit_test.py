@@ -0,0 +1,55 @@
+from modules.desktop import Desktop
+from modules.hit_test import HitTestIndex
+from modules.window import Window
+
+
+def _desktop(fake_desktop) -> tuple[int, int, int, int]:
+    root = fake_desktop.add_window(text="Main", rect=(0, 0, 400, 300))
+    panel = fake_desktop.add_window(root, text="Panel", rect=(0, 0, 200, 200))
+    button = fake_desktop.add_window(panel, text="OK", rect=(10, 10, 60, 40))
+    other = fake_desktop.add_window(text="Other", rect=(0, 0, 400, 300))
+    return root, panel, button, other
+
+
+def test_live_window_returns_live_windows(fake_desktop):
+    root, panel, button, _ = _desktop(fake_desktop)
+
+    hits = Window(root).get_children_in_hierarchy_on_coordinate(20, 20)
+    fake_desktop.windows[button].text = "Cancel"
+
+    assert [hit.hwnd for hit in hits] == [panel, button]
+    assert hits[-1].text == "Cancel"
+
+
+def test_passed_index_is_reused_without_capturing(fake_desktop):
+    root, panel, button, _ = _desktop(fake_desktop)
+    window = Window(root)
+    index = window.hit_test_index()
+    fake_desktop.reset_calls()
+
+    hits = [window.get_children_in_hierarchy_on_coordinate(x, 20, index) for x in (20, 100, 300)]
+
+    assert [[hit.hwnd for hit in row] for row in hits] == [[panel, button], [panel], []]
+    assert fake_desktop.call_count == 0
+
+
+def test_desktop_wide_index_returns_only_descendants(fake_desktop):
+    root, panel, button, other = _desktop(fake_desktop)
+    index = HitTestIndex(Desktop().snapshot())
+
+    hits = Window(panel).get_children_in_hierarchy_on_coordinate(20, 20, index)
+
+    assert [hit.hwnd for hit in hits] == [button]
+
+
+def test_snapshot_window_keeps_its_index(fake_desktop):
+    root, panel, button, _ = _desktop(fake_desktop)
+    window = Window(root).with_snapshot()
+    fake_desktop.reset_calls()
+
+    first = window.get_children_in_hierarchy_on_coordinate(20, 20)
+    second = window.get_children_in_hierarchy_on_coordinate(20, 20)
+
+    assert [hit.hwnd for hit in first] == [hit.hwnd for hit in second] == [panel, button]
+    assert window.hit_test_index() is window.hit_test_index()
+    assert fake_desktop.call_count == 0
@@ -0,0 +1,87 @@
+import threading
+import time
+
+from modules.hover import HoverTracker
+from modules.snapshot import WindowTree
+
+
+def _tracker(fake_desktop, **kwargs) -> tuple[HoverTracker, int, int]:
+    root = fake_desktop.add_window(text="Main", rect=(0, 0, 400, 300))
+    child = fake_desktop.add_window(root, text="Child", rect=(10, 10, 100, 100))
+    return HoverTracker(WindowTree.capture_desktop, **kwargs), root, child
+
+
+def test_resolve_reuses_result_inside_stable_rect(fake_desktop):
+    tracker, root, child = _tracker(fake_desktop)
+
+    first = tracker.resolve(50, 50)
+    second = tracker.resolve(60, 60)
+    outside = tracker.resolve(200, 200)
+
+    assert first.target.hwnd == child and not first.reused
+    assert second.target.hwnd == child and second.reused
+    assert outside.target.hwnd == root and not outside.reused
+
+
+def test_lookup_does_not_touch_resolve_state(fake_desktop):
+    tracker, root, child = _tracker(fake_desktop)
+    tracker.resolve(50, 50)
+
+    result, index = tracker.lookup(200, 200)
+
+    assert result.target.hwnd == root and not result.reused
+    assert index is tracker.index
+    # lookup の後も resolve は前回 (50, 50) の結果を再利用できる
+    assert tracker.resolve(55, 55).reused
+    assert tracker.stats["resolves"] == 2
+
+
+def test_background_refresh_survives_capture_errors(fake_desktop):
+    failures = []
+
+    def _capture():
+        if not failures:
+            failures.append(True)
+            raise RuntimeError("capture failed")
+        return WindowTree.capture_desktop()
+
+    fake_desktop.add_window(text="Main")
+    tracker = HoverTracker(_capture, refresh_interval=0.01)
+    tracker.start()
+    try:
+        deadline = time.monotonic() + 5
+        while tracker.stats["refreshes"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        tracker.stop()
+
+    assert tracker.stats["refresh_errors"] == 1
+    assert tracker.stats["refreshes"] >= 1
+    assert tracker.index is not None
+
+
+def test_stop_without_wait_does_not_block_on_a_running_capture(fake_desktop):
+    fake_desktop.add_window(text="Main")
+    capturing, release = threading.Event(), threading.Event()
+
+    def _capture():
+        # ピッカー自身のウィンドウの応答待ちで止まっている取得
+        capturing.set()
+        release.wait(5)
+        return WindowTree.capture_desktop()
+
+    tracker = HoverTracker(_capture, refresh_interval=0.01)
+    tracker.start()
+    assert capturing.wait(5)
+
+    started = time.monotonic()
+    tracker.stop(wait=False)
+    assert time.monotonic() - started < 1
+    release.set()
+
+    deadline = time.monotonic() + 5
+    while any(thread.name == "hover-refresh" for thread in threading.enumerate()) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # 止めたスレッドは取得を終えたら再開せずに終わる
+    assert tracker.stats["refreshes"] == 1
+    assert not any(thread.name == "hover-refresh" for thread in threading.enumerate())
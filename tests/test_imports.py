@@ -0,0 +1,24 @@
+import subprocess
+import sys
+
+GUI_MODULES = ("matplotlib", "matplotlib.pyplot", "tkinter", "numpy", "PIL")
+"""コア (`Window` / `Desktop`) の import で読み込まれてはならないモジュール"""
+
+_SCRIPT = """
+import sys
+from modules import fake_win32
+fake_win32.install()
+import modules.window
+import modules.desktop
+print(" ".join(name for name in {gui_modules!r} if name in sys.modules))
+"""
+
+
+def test_core_import_does_not_load_gui_modules():
+    # テスト中に読み込まれたモジュールの影響を受けないよう、別プロセスで import する
+    process = subprocess.run(
+        [sys.executable, "-c", _SCRIPT.format(gui_modules=GUI_MODULES)],
+        capture_output=True, text=True, check=True,
+    )
+    assert process.stdout.split() == []
+
@@ -0,0 +1,97 @@
+import win32gui
+
+from modules.locator import LocatorResolver, default_resolver
+from modules.snapshot import WindowTree
+from modules.window import Window
+
+
+def _app(fake_desktop):
+    root = fake_desktop.add_window(text="Main", class_name="Notepad")
+    edits = [fake_desktop.add_window(root, class_name="Edit") for _ in range(3)]
+    button = fake_desktop.add_window(root, class_name="Button")
+    return root, edits, button
+
+
+def test_locate_round_trips_through_resolve(fake_desktop):
+    root, edits, button = _app(fake_desktop)
+    resolver = LocatorResolver()
+
+    assert str(resolver.locate(edits[2])) == "Notepad/Edit[2]"
+    assert [resolver.resolve(resolver.locate(hwnd)) for hwnd in edits + [button]] == edits + [button]
+
+
+def test_path_fields_are_opt_in_for_to_dict(fake_desktop):
+    root, edits, button = _app(fake_desktop)
+    window = Window(edits[1])
+
+    for name in ("level", "hwnd_path", "locator"):
+        assert name not in Window.field_names() and name not in window.to_dict()
+    default_resolver().invalidate()
+    assert window.to_dict(["level", "hwnd_path", "locator"]) == {
+        "level": 1, "hwnd_path": f"{root}/{edits[1]}", "locator": "Notepad/Edit[1]",
+    }
+
+
+def test_snapshot_locate_makes_no_backend_calls(fake_desktop):
+    root, edits, button = _app(fake_desktop)
+    tree = WindowTree.capture(root)
+    resolver = LocatorResolver()
+    resolver.locate(root)
+    fake_desktop.reset_calls()
+
+    assert [str(resolver.locate(hwnd, tree=tree)) for hwnd in edits] == ["Notepad/Edit", "Notepad/Edit[1]", "Notepad/Edit[2]"]
+    assert fake_desktop.call_count == 0
+
+
+def test_siblings_are_located_once(fake_desktop):
+    root, edits, button = _app(fake_desktop)
+    resolver = LocatorResolver()
+    resolver.locate(edits[0])
+    fake_desktop.reset_calls()
+
+    assert str(resolver.locate(button)) == "Notepad/Button"
+    # キャッシュ済みのため、生きているかの確認だけを行う
+    assert dict(fake_desktop.calls) == {"IsWindow": 1}
+    assert resolver.stats["locate_hits"] == 1
+
+
+def test_invalidate_drops_only_entries_through_the_handle(fake_desktop):
+    root, edits, button = _app(fake_desktop)
+    other = fake_desktop.add_window(text="Other", class_name="Other")
+    child = fake_desktop.add_window(other, class_name="Edit")
+    resolver = LocatorResolver()
+    texts = [str(resolver.locate(hwnd)) for hwnd in edits + [child]]
+    assert resolver.resolve_many(texts)
+
+    fake_desktop.remove_window(edits[0])
+    assert resolver.prune() > 0
+    fake_desktop.reset_calls()
+
+    # 残ったウィンドウは解決し直さない
+    assert resolver.resolve("Other/Edit") == child
+    assert dict(fake_desktop.calls) == {"IsWindow": 1}
+    assert resolver.invalidate(root) > 0 and resolver.invalidate(root) == 0
+
+
+def test_cache_is_bounded(fake_desktop):
+    root = fake_desktop.add_synthetic_tree(depth=1, breadth=20)
+    resolver = LocatorResolver(max_entries=8)
+    for hwnd in fake_desktop.windows[root].children:
+        resolver.locate(hwnd)
+
+    assert len(resolver) <= 8
+    assert resolver.stats["evicted"] > 0
+
+
+def test_sibling_destroyed_during_locate_is_skipped(monkeypatch, fake_desktop):
+    root, edits, button = _app(fake_desktop)
+    get_class_name = win32gui.GetClassName
+
+    def _get_class_name(hwnd):
+        if hwnd == edits[0] and hwnd in fake_desktop.windows:
+            fake_desktop.remove_window(hwnd)
+        return get_class_name(hwnd)
+
+    monkeypatch.setattr(win32gui, "GetClassName", _get_class_name)
+
+    assert str(LocatorResolver().locate(edits[2])) == "Notepad/Edit[1]"
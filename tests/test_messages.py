@@ -0,0 +1,66 @@
+import win32con
+import win32gui
+
+from modules.messages import MessageBatch
+
+
+def test_consecutive_set_text_is_coalesced(fake_desktop):
+    first = fake_desktop.add_window(class_name="Edit")
+    second = fake_desktop.add_window(class_name="Edit")
+    batch = MessageBatch()
+
+    batch.set_text(first, "a").set_text(second, "x").set_text(first, "b").set_text(first, "c")
+    assert len(batch) == 2
+    results = batch.flush()
+
+    assert [(result.hwnd, result.long_param) for result in results] == [(first, "c"), (second, "x")]
+    assert (win32gui.GetWindowText(first), win32gui.GetWindowText(second)) == ("c", "x")
+    assert len(batch) == 0
+
+
+def test_other_messages_in_between_are_not_coalesced(fake_desktop):
+    edit = fake_desktop.add_window(class_name="Edit")
+    batch = MessageBatch()
+
+    batch.set_text(edit, "a").click(edit).set_text(edit, "b").set_text(edit, "c")
+    batch.close(edit).close(edit)
+
+    assert [(result.msg, result.long_param) for result in batch.flush()] == [
+        (win32con.WM_SETTEXT, "a"),
+        (win32con.WM_LBUTTONDOWN, None),
+        (win32con.WM_LBUTTONUP, None),
+        (win32con.WM_SETTEXT, "c"),
+        (win32con.WM_CLOSE, None),
+        (win32con.WM_CLOSE, None),
+    ]
+
+
+def test_send_and_post_keep_queue_order(fake_desktop):
+    button = fake_desktop.add_window(class_name="Button")
+    edit = fake_desktop.add_window(class_name="Edit")
+    sleeps = []
+    batch = MessageBatch(interval=0.01, sleep=sleeps.append)
+
+    batch.post(button, win32con.WM_LBUTTONDOWN).set_text(edit, "hello").post(button, win32con.WM_LBUTTONUP)
+    batch.flush()
+
+    assert [(kind, hwnd, msg) for kind, hwnd, msg, _, _ in fake_desktop.messages] == [
+        ("post", button, win32con.WM_LBUTTONDOWN),
+        ("send", edit, win32con.WM_SETTEXT),
+        ("post", button, win32con.WM_LBUTTONUP),
+    ]
+    assert sleeps == [0.01, 0.01]
+
+
+def test_flush_on_dead_window_reports_error_and_continues(fake_desktop):
+    dead = fake_desktop.add_window(class_name="Edit")
+    alive = fake_desktop.add_window(class_name="Edit")
+    fake_desktop.remove_window(dead)
+
+    results = MessageBatch().set_text(dead, "x").set_text(alive, "y").flush()
+    assert isinstance(results[0].error, win32gui.error) and results[0].result is None
+    assert results[1].error is None and win32gui.GetWindowText(alive) == "y"
+
+    stopped = MessageBatch(stop_on_error=True).click(dead).set_text(alive, "z").flush()
+    assert len(stopped) == 1 and stopped[0].error is not None
+    assert win32gui.GetWindowText(alive) == "y"
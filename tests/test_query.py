@@ -0,0 +1,67 @@
+import win32gui
+import win32process
+
+from modules.desktop import Desktop
+from modules.query import WindowQuery
+
+
+def _desktop(fake_desktop) -> list[int]:
+    return [
+        fake_desktop.add_window(text="Notepad - memo.txt", class_name="Notepad", pid=10),
+        fake_desktop.add_window(text="保存", class_name="#32770", pid=10, visible=False),
+        fake_desktop.add_window(text="Notepad - todo.txt", class_name="Notepad", pid=20),
+        fake_desktop.add_window(text="Calculator", class_name="ApplicationFrameWindow", pid=30),
+        fake_desktop.add_window(text="", class_name="Shell_TrayWnd", pid=40),
+    ]
+
+
+def _scan(condition) -> list[int]:
+    # 以前の get_windows_by_* と同じ、1条件ごとの EnumWindows
+    results = []
+    win32gui.EnumWindows(lambda hwnd, results: results.append(hwnd) if condition(hwnd) else None, results)
+    return results
+
+
+def test_wrappers_match_linear_scans(fake_desktop):
+    _desktop(fake_desktop)
+    desktop = Desktop()
+
+    def hwnds(windows):
+        return [window.hwnd for window in windows]
+
+    assert hwnds(desktop.get_windows_by_name("Notepad")) == _scan(lambda hwnd: "Notepad" in win32gui.GetWindowText(hwnd))
+    assert hwnds(desktop.get_windows_by_name("")) == _scan(lambda hwnd: True)
+    assert hwnds(desktop.get_windows_by_class("Window")) == _scan(lambda hwnd: "Window" in win32gui.GetClassName(hwnd))
+    assert hwnds(desktop.get_windows_by_pid(10)) == _scan(lambda hwnd: win32process.GetWindowThreadProcessId(hwnd)[1] == 10)
+    assert hwnds(desktop.get_all_top_visibile_windows()) == _scan(lambda hwnd: win32gui.IsWindowVisible(hwnd))
+
+
+def test_cheap_conditions_short_circuit_later_ones(fake_desktop):
+    hwnds = _desktop(fake_desktop)
+    checked = []
+    query = Desktop().query(
+        visible=True, class_name="Notepad", name_contains="todo", pid=20,
+        predicate=lambda window: checked.append(window.hwnd) or True,
+    )
+    fake_desktop.reset_calls()
+
+    assert [window.hwnd for window in query.all()] == [hwnds[2]]
+    # 非表示のウィンドウはクラス名を、クラス名が違うウィンドウはタイトルを読まない
+    assert fake_desktop.calls["IsWindowVisible"] == 5
+    assert fake_desktop.calls["GetClassName"] == 4
+    assert fake_desktop.calls["GetWindowText"] == 2
+    assert fake_desktop.calls["GetWindowThreadProcessId"] == 1
+    assert checked == [hwnds[2]]
+
+
+def test_limit_stops_enumeration(fake_desktop):
+    hwnds = _desktop(fake_desktop)
+    query = WindowQuery(name_contains="Notepad", limit=1)
+    fake_desktop.reset_calls()
+
+    assert [window.hwnd for window in query.all()] == [hwnds[0]]
+    assert fake_desktop.calls["GetWindowText"] == 1
+    assert [window.hwnd for window in query] == [hwnds[0]]
+    assert query.first().hwnd == hwnds[0]
+    assert [window.hwnd for window in WindowQuery(name_contains="Notepad").all(limit=5)] == [hwnds[0], hwnds[2]]
+    assert WindowQuery(limit=0).all() == []
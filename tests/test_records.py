@@ -0,0 +1,40 @@
+from modules.collect import collect_applications
+from modules.records import WindowRecords
+
+
+def test_window_destroyed_during_capture_is_skipped_with_subtree(fake_desktop, destroy_on_read):
+    root = fake_desktop.add_window(text="Main")
+    doomed = fake_desktop.add_window(root, text="Doomed")
+    fake_desktop.add_window(doomed, text="Grandchild")
+    survivor = fake_desktop.add_window(root, text="Survivor")
+    destroy_on_read(doomed)
+
+    records = WindowRecords.capture(root)
+
+    assert list(records.hwnds) == [root, survivor]
+    assert [record.depth for record in records] == [0, 1]
+
+
+def test_collect_keeps_rest_of_application_when_window_is_destroyed(fake_desktop, destroy_on_read):
+    root = fake_desktop.add_synthetic_tree(depth=2, breadth=3, text="App")
+    other = fake_desktop.add_window(text="Other")
+    doomed = fake_desktop.windows[root].children[0]
+    expected = len(fake_desktop.windows) - 1 - 3
+    destroy_on_read(doomed)
+
+    records = collect_applications(workers=1)
+
+    assert len(records) == expected
+    assert root in records.hwnds and other in records.hwnds
+    assert doomed not in records.hwnds
+
+
+def test_collect_with_pids_keeps_enumeration_order(fake_desktop):
+    first = fake_desktop.add_window(text="A", pid=100)
+    second = fake_desktop.add_window(text="B", pid=200)
+    third = fake_desktop.add_window(text="C", pid=100)
+    fake_desktop.add_window(text="D", pid=300)
+
+    for workers in (1, 4):
+        records = collect_applications([100, 200], workers=workers)
+        assert list(records.hwnds) == [first, second, third]
@@ -0,0 +1,68 @@
+import pytest
+import win32gui
+import win32process
+
+from modules import fake_win32
+from modules.desktop import Desktop
+from modules.replay import Recorder, RecordingExhaustedError, ReplayDesktop
+from modules.window import Window
+
+
+def _session() -> list:
+    # 記録と再生で同じ順に同じ呼び出しを行う操作
+    desktop = Desktop()
+    apps = desktop.query(name_contains="Notepad").all()
+    results = [[app.hwnd for app in apps]]
+    for app in apps:
+        window = Window(app.hwnd)
+        results.append((window.text, window.class_name, window.rect, window.is_visible))
+        results.append([(child.hwnd, child.text) for child in window.children])
+    results.append([window.hwnd for window in desktop.get_windows_by_pid(20)])
+    return results
+
+
+def _record(fake_desktop, path) -> list:
+    root = fake_desktop.add_window(text="Notepad - memo.txt", class_name="Notepad", pid=10)
+    fake_desktop.add_window(root, text="本文", class_name="Edit", pid=10)
+    fake_desktop.add_window(text="Calculator", pid=20, visible=False)
+    fake_desktop.add_window(text="Notepad - todo.txt", class_name="Notepad", pid=20, rect=(5, 5, 50, 50))
+
+    with Recorder(win32gui, win32process) as recorder:
+        expected = _session()
+        recorder.capture_tree()
+    recorder.save(path)
+    return expected
+
+
+def test_replay_reproduces_recorded_session(fake_desktop, tmp_path):
+    path = tmp_path / "session.json.gz"
+    expected = _record(fake_desktop, path)
+
+    replay = fake_win32.install(ReplayDesktop.load(path, strict=True))
+
+    assert _session() == expected
+    assert replay.replayed == sum(replay.calls.values())
+
+
+def test_running_off_the_end_of_a_strict_recording_raises(fake_desktop, tmp_path):
+    path = tmp_path / "session.json"
+    _record(fake_desktop, path)
+    fake_win32.install(ReplayDesktop.load(path, strict=True))
+    _session()
+
+    with pytest.raises(RecordingExhaustedError):
+        _session()
+    with pytest.raises(RecordingExhaustedError):
+        win32gui.GetForegroundWindow()
+
+
+def test_non_strict_replay_falls_back_to_recorded_tree(fake_desktop, tmp_path):
+    path = tmp_path / "session.json"
+    expected = _record(fake_desktop, path)
+    replay = fake_win32.install(ReplayDesktop.load(path))
+    _session()
+    replayed = replay.replayed
+
+    # 記録を使い切った後は記録した階層から答える
+    assert _session() == expected
+    assert replay.replayed == replayed
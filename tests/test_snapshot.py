@@ -0,0 +1,51 @@
+import pytest
+import win32gui
+
+from modules.snapshot import WindowTree
+
+
+def test_window_destroyed_during_capture_is_dropped_with_subtree(fake_desktop, destroy_on_read):
+    root = fake_desktop.add_window(text="Main")
+    doomed = fake_desktop.add_window(root, text="Doomed")
+    grandchild = fake_desktop.add_window(doomed, text="Grandchild")
+    survivor = fake_desktop.add_window(root, text="Survivor")
+    destroy_on_read(doomed)
+
+    tree = WindowTree.capture_desktop()
+
+    assert tree.roots == (root,)
+    assert doomed not in tree and grandchild not in tree
+    assert [snapshot.hwnd for snapshot in tree.children_of(root)] == [survivor]
+
+
+def test_child_whose_parent_died_after_enumeration_is_dropped(fake_desktop):
+    root = fake_desktop.add_window(text="Main")
+    doomed = fake_desktop.add_window(root, text="Doomed")
+    orphan = fake_desktop.add_window(doomed, text="Orphan")
+    # 列挙後に親だけが破棄され、子は付け替えられずに残った状態
+    fake_desktop.windows.pop(doomed)
+    fake_desktop.windows[root].children.remove(doomed)
+
+    tree = WindowTree._build([(root, [doomed, orphan])])
+
+    assert list(tree.descendant_hwnds_of(root)) == []
+    assert orphan not in tree
+
+
+def test_root_destroyed_during_capture_is_dropped(fake_desktop, destroy_on_read):
+    doomed = fake_desktop.add_synthetic_tree(depth=2, breadth=2, text="Doomed")
+    survivor = fake_desktop.add_window(text="Survivor")
+    destroy_on_read(doomed)
+
+    tree = WindowTree.capture_desktop()
+
+    assert tree.roots == (survivor,)
+    assert len(tree) == 1
+
+
+def test_capture_of_destroyed_window_raises(fake_desktop):
+    hwnd = fake_desktop.add_window(text="Main")
+    fake_desktop.remove_window(hwnd)
+
+    with pytest.raises(win32gui.error):
+        WindowTree.capture(hwnd)
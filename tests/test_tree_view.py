@@ -0,0 +1,57 @@
+from modules.tree_view import LazyWindowTree, RowRecycler
+
+
+def _tree(fake_desktop):
+    root = fake_desktop.add_window(text="Main")
+    panel = fake_desktop.add_window(root, text="Panel")
+    button = fake_desktop.add_window(panel, text="OK")
+    edit = fake_desktop.add_window(root, text="Edit")
+    return root, panel, button, edit
+
+
+def test_children_are_fetched_only_when_expanded(fake_desktop):
+    root, panel, button, edit = _tree(fake_desktop)
+    model = LazyWindowTree([root])
+
+    assert len(model) == 1 and model.stats["fetches"] == 0
+    assert model.expand(root) == 2
+    assert [row.hwnd for row in model.rows(0, 10)] == [root, panel, edit]
+    assert model.stats["fetches"] == 1
+
+
+def test_collapse_keeps_descendant_expansion(fake_desktop):
+    root, panel, button, edit = _tree(fake_desktop)
+    model = LazyWindowTree([root])
+    model.reveal([root, panel, button])
+
+    assert model.collapse(root) == 3
+    assert model.expand(root) == 3
+    assert [(row.hwnd, row.depth) for row in model.rows(0, 10)] == [(root, 0), (panel, 1), (button, 2), (edit, 1)]
+    # 2度目の展開では子を取得し直さない (root と panel の1回ずつ)
+    assert model.stats["fetches"] == 2
+
+
+def test_refresh_rebuilds_only_changed_nodes(fake_desktop):
+    root, panel, button, edit = _tree(fake_desktop)
+    model = LazyWindowTree([root])
+    model.reveal([root, panel, button])
+    fake_desktop.remove_window(edit)
+
+    assert model.refresh() == 1
+    assert [row.hwnd for row in model.rows(0, 10)] == [root, panel, button]
+
+
+def test_recycler_renders_only_changed_slots(fake_desktop):
+    root = fake_desktop.add_synthetic_tree(depth=1, breadth=50)
+    model = LazyWindowTree([root])
+    model.expand(root)
+    rendered = []
+    rows = RowRecycler(model, height=10, render=lambda slot, row: rendered.append(slot))
+
+    assert rows.update() == 10
+    assert rows.update() == 0
+    assert rows.scroll(1) == 10
+    assert rows.scroll_to(len(model)) == 10 and rows.first == len(model) - 10
+    # 表示範囲に入った行 (先頭の11行と末尾の10行) のラベルだけを読み出す
+    assert model.stats["labels"] == 21
+    assert len(rendered) == 30
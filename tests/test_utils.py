@@ -0,0 +1,25 @@
+import pytest
+import win32con
+
+from modules.utils import Win32Constants
+
+
+def test_lookup_by_name_and_value():
+    assert Win32Constants.WM_CLOSE.value == win32con.WM_CLOSE
+    assert Win32Constants["WM_CLOSE"] is Win32Constants.WM_CLOSE
+    assert Win32Constants(win32con.WM_CLOSE) is Win32Constants.WM_CLOSE
+    assert Win32Constants(Win32Constants.WM_CLOSE) is Win32Constants.WM_CLOSE
+
+
+def test_unknown_value_raises_value_error():
+    with pytest.raises(ValueError):
+        Win32Constants(-123456789)
+
+
+def test_iteration_yields_one_member_per_value():
+    members = list(Win32Constants)
+    values = [member.value for member in members]
+
+    assert len(members) == len(Win32Constants) == len(set(values))
+    assert Win32Constants.WM_CLOSE in members
+    assert all(isinstance(member, Win32Constants) for member in members)
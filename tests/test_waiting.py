@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+
+from modules.fake_win32 import FakeClock
+from modules.query import WindowQuery
+from modules.waiting import WindowPoller
+from modules.window import Window
+
+
+def test_interval_backs_off_up_to_max(fake_desktop):
+    clock = FakeClock()
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock.sleep(seconds)
+
+    poller = WindowPoller(clock=clock, sleep=sleep)
+
+    assert poller.wait_for_window(WindowQuery(name="Dialog"), timeout=3) is None
+    assert sleeps[:3] == pytest.approx([0.05, 0.075, 0.1125])
+    assert max(sleeps) == poller.max_interval
+    assert clock.now == pytest.approx(3)
+
+
+def test_window_appearing_after_ticks_is_found_on_next_poll(fake_desktop):
+    clock = FakeClock()
+    appear_after = 4
+
+    def sleep(seconds):
+        clock.sleep(seconds)
+        if poller.metrics.polls == appear_after:
+            fake_desktop.add_window(text="Dialog")
+
+    poller = WindowPoller(clock=clock, sleep=sleep)
+    found = poller.wait_for_window(WindowQuery(name="Dialog"), timeout=10)
+
+    assert found is not None and found.text == "Dialog"
+    assert poller.metrics.polls == appear_after + 1
+    assert poller.metrics.enumerations == appear_after + 1
+
+
+def test_predicate_error_is_raised_in_owning_thread(fake_desktop):
+    poller = WindowPoller(initial_interval=0.001, max_interval=0.005)
+    window = Window(fake_desktop.add_window(text="Main"))
+    calls = []
+    other = []
+
+    def failing(window):
+        calls.append(window)
+        raise ValueError("boom")
+
+    thread = threading.Thread(target=lambda: other.append(poller.wait_for_window(WindowQuery(name="Never"), timeout=0.2)))
+    thread.start()
+    try:
+        with pytest.raises(ValueError):
+            poller.wait_until(window, failing, timeout=5)
+    finally:
+        thread.join(5)
+
+    # 他の待機は例外を受け取らず、失敗した条件を評価し続けない
+    assert other == [None]
+    assert len(calls) == 1
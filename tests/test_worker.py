@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+
+from modules.worker import BackgroundWorker
+
+
+@pytest.fixture
+def worker():
+    worker = BackgroundWorker()
+    yield worker
+    worker.shutdown(wait=True)
+
+
+def _drain_until(worker: BackgroundWorker, predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "worker did not deliver in time"
+        worker.drain()
+        time.sleep(0.001)
+
+
+def test_generator_items_are_delivered_in_order(worker):
+    items, done = [], []
+
+    def produce(count):
+        for i in range(count):
+            yield i
+
+    worker.submit("rows", produce, 5, on_item=items.append, on_done=done.append)
+    _drain_until(worker, lambda: done)
+
+    assert items == [0, 1, 2, 3, 4]
+    assert done == [None]
+
+
+def test_newer_request_on_same_channel_discards_older_results(worker):
+    release = threading.Event()
+    results = []
+
+    def slow():
+        release.wait(5)
+        return "old"
+
+    worker.submit("info", slow, on_done=results.append)
+    worker.submit("info", lambda: "new", on_done=results.append)
+    release.set()
+    _drain_until(worker, lambda: results)
+    time.sleep(0.05)
+    worker.drain()
+
+    assert results == ["new"]
+    assert worker.stats["cancelled"] == 1
+
+
+def test_errors_go_to_on_error_or_are_raised_by_drain(worker):
+    errors = []
+
+    def fail():
+        raise RuntimeError("boom")
+
+    worker.submit("a", fail, on_error=errors.append)
+    _drain_until(worker, lambda: errors)
+    assert isinstance(errors[0], RuntimeError)
+
+    worker.submit("b", fail)
+    with pytest.raises(RuntimeError):
+        _drain_until(worker, lambda: False)
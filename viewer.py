@@ -1,13 +1,12 @@
-import time
 from modules.desktop import Desktop
 
 
 desktop = Desktop()
-time.sleep(0.5)
 
 title_keyword = "" # ここにウィンドウのタイトルを入力
 
-apps = desktop.get_windows_by_name(str(title_keyword))
-app = apps[0]
+app = desktop.wait_for(timeout=10, name_contains=str(title_keyword))
+if app is None:
+    raise SystemExit(f"window not found: {title_keyword!r}")
 app.set_window_position(x=0, y=0, w=800, h=600)
-app.draw_window_obj()
\ No newline at end of file
+app.draw_window_obj()